@@ -0,0 +1,89 @@
+# -*- coding=utf-8 -*-
+"""
+BearEar 上报事件接收性能测试
+
+模拟 go-cqhttp 通过 keep-alive 连接持续上报群消息，
+分别测试 asyncio 与 flask 两种服务端的吞吐量 (events/sec) 与接收延迟 (p50/p99)。
+
+    python benchmark/ear_bench.py [events] [connections]
+"""
+
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cqbear.bear import BearEar  # noqa: E402
+
+EVENT = json.dumps({
+    "time": 1660000000,
+    "self_id": 2222,
+    "post_type": "message",
+    "message_type": "group",
+    "sub_type": "normal",
+    "message_id": -1588745453,
+    "group_id": 8888,
+    "user_id": 6666,
+    "anonymous": None,
+    "message": "[CQ:at,qq=2222] hello bear",
+    "raw_message": "[CQ:at,qq=2222] hello bear",
+    "font": 0,
+    "sender": {
+        "user_id": 6666, "nickname": "someone", "card": "",
+        "sex": "unknown", "age": 0, "area": "", "level": "1",
+        "role": "member", "title": ""
+    }
+}).encode("utf-8")
+
+
+def post_events(port: int, count: int, latency: list):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Content-Type": "application/json"}
+    for _ in range(count):
+        begin = time.perf_counter()
+        conn.request("POST", "/", body=EVENT, headers=headers)
+        conn.getresponse().read()
+        latency.append(time.perf_counter() - begin)
+    conn.close()
+
+
+def bench(server: str, port: int, events: int, connections: int):
+    ear = BearEar("127.0.0.1", port, "", server=server)
+    ear.start_listen()
+    time.sleep(0.5)
+
+    post_events(port, 200, [])  # warm up
+    ear.clear_sound()
+
+    latency = []
+    threads = [
+        threading.Thread(target=post_events,
+                         args=(port, events // connections, latency))
+        for _ in range(connections)
+    ]
+    begin = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cost = time.perf_counter() - begin
+
+    latency.sort()
+    print(f"{server:>8}: {len(latency) / cost:9.0f} events/sec  "
+          f"p50 {latency[len(latency) // 2] * 1000:6.2f} ms  "
+          f"p99 {latency[int(len(latency) * 0.99)] * 1000:6.2f} ms")
+    ear.clear_sound()
+    if server == BearEar.ASYNCIO:
+        ear.stop_listen()
+
+
+if __name__ == "__main__":
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    bench(BearEar.ASYNCIO, 15701, events, connections)
+    bench(BearEar.FLASK, 15702, events, connections)
+    os._exit(0)  # the flask server thread can not be stopped gracefully
@@ -0,0 +1,98 @@
+# -*- coding=utf-8 -*-
+"""
+BearMouth 吼叫发送性能测试
+
+在本地启动一个模拟 go-cqhttp 的 http 服务端 (支持 keep-alive)，
+连续发送 `SendGroupMessage`，对比每次调用都新建连接的 `requests.post`
+与使用连接池的 `BearMouth.speak` 的单次调用延迟 (p50/p99)、吞吐量和建立的 TCP 连接数。
+
+    python benchmark/mouth_bench.py [calls]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cqbear.bear import BearMouth  # noqa: E402
+from cqbear.roar import SendGroupMessage  # noqa: E402
+
+RESPONSE = json.dumps({
+    "status": "ok", "retcode": 0, "data": {"message_id": 1234}
+}).encode("utf-8")
+
+
+class FakeCqhttp(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # go-cqhttp (go net/http) sets TCP_NODELAY on every connection
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        FakeCqhttp.connections += 1
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def new_roar() -> SendGroupMessage:
+    return SendGroupMessage().set_group_id(8888).set_message("hello bear")
+
+
+def post_without_pool(base_url: str, roar: SendGroupMessage):
+    rcv = requests.post(url=f"{base_url}/{roar.extend_url}",
+                        data=roar.speak_data)
+    rcv.content
+    rcv.close()
+
+
+def bench(name: str, speak, calls: int):
+    for _ in range(50):  # warm up
+        speak(new_roar())
+
+    latency = []
+    FakeCqhttp.connections = 0
+    begin = time.perf_counter()
+    for _ in range(calls):
+        roar = new_roar()
+        t = time.perf_counter()
+        speak(roar)
+        latency.append(time.perf_counter() - t)
+    cost = time.perf_counter() - begin
+
+    latency.sort()
+    print(f"{name:>16}: {calls / cost:7.0f} calls/sec  "
+          f"p50 {latency[len(latency) // 2] * 1000:6.2f} ms  "
+          f"p99 {latency[int(len(latency) * 0.99)] * 1000:6.2f} ms  "
+          f"{FakeCqhttp.connections} new connections")
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    server = ThreadingHTTPServer(("127.0.0.1", 15700), FakeCqhttp)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base_url = "http://127.0.0.1:15700"
+    bench("requests.post", lambda roar: post_without_pool(base_url, roar),
+          calls)
+
+    mouth = BearMouth("127.0.0.1", 15700)
+    bench("BearMouth.speak", mouth.speak, calls)
+    mouth.close()
+    server.shutdown()
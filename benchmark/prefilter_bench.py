@@ -0,0 +1,56 @@
+# -*- coding=utf-8 -*-
+"""
+上报事件预筛选性能测试
+
+对比耳朵收到一个没有人关心的群消息时，解码 json 并创建声音的耗时，
+与从原始内容中找出类型和群号 (`RawSound`) 后直接丢弃的耗时。
+
+    python benchmark/prefilter_bench.py [number]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cqbear.sound import RawSound, SoundUnderstander  # noqa: E402
+
+BODY = json.dumps({
+    "time": 1650000000, "self_id": 10000, "post_type": "message",
+    "message_type": "group", "sub_type": "normal", "message_id": 42,
+    "group_id": 123456, "user_id": 10001, "anonymous": None,
+    "message": "[CQ:image,file=abc.image,url=https://example.com/abc] 早上好",
+    "raw_message": "[CQ:image,file=abc.image,url=https://example.com/abc] 早上好",
+    "font": 0,
+    "sender": {"user_id": 10001, "nickname": "bear", "card": "",
+               "sex": "unknown", "age": 0, "area": "", "level": "1",
+               "role": "member", "title": ""},
+}, ensure_ascii=False).encode("utf-8")
+
+understander = SoundUnderstander()
+
+
+def decode(body: bytes):
+    return understander.understand(json.loads(body))
+
+
+def prescan(body: bytes):
+    raw = RawSound(body)
+    return understander.classify(raw), raw.get("group_id")
+
+
+def bench(name: str, func, number: int) -> float:
+    cost = min(timeit.repeat(lambda: func(BODY), number=number, repeat=5))
+    per_event = cost / number * 1e6
+    print(f"{name:>16}: {per_event:6.2f} us/event")
+    return per_event
+
+
+if __name__ == "__main__":
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{len(BODY)} bytes/event")
+    full = bench("decode + Sound", decode, number)
+    scan = bench("RawSound", prescan, number)
+    print(f"rejecting before decode costs {scan / full:.0%} of decoding")
@@ -0,0 +1,83 @@
+# -*- coding=utf-8 -*-
+"""
+群成员名单内存占用测试
+
+生成 `groups` 个群、每群 `members` 个成员的 `GetGroupMemberList` json 响应
+(同一个用户会出现在多个群中)，使用 tracemalloc 对比解析后直接保存 json 字典列表
+与转换为 `Member` 后保存的内存占用。
+
+    python benchmark/roster_memory.py [groups] [members]
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cqbear.roster import Member  # noqa: E402
+
+ROLES = ["member"] * 50 + ["admin"] * 3 + ["owner"]
+LEVELS = [str(level) for level in range(1, 101)]
+TITLES = ["", "", "", "", "活跃分子", "潜水冠军", "群宠"]
+
+
+def fake_groups(groups: int, members: int) -> list:
+    """每个群的 json 响应，用户从 members * groups / 4 个用户中抽取"""
+    rnd = random.Random(20220401)
+    users = members * groups // 4
+    nicknames = [f"熊友{user_id}" for user_id in range(users)]
+    bodies = []
+    for group_id in range(100000, 100000 + groups):
+        member_list = []
+        for user_id in rnd.sample(range(users), members):
+            member_list.append({
+                "group_id": group_id,
+                "user_id": 10000000 + user_id,
+                "nickname": nicknames[user_id],
+                "card": rnd.choice(["", "", f"名片{user_id % 500}"]),
+                "sex": rnd.choice(["male", "female", "unknown"]),
+                "age": rnd.randint(0, 60),
+                "area": "",
+                "join_time": 1600000000 + rnd.randint(0, 10 ** 7),
+                "last_sent_time": 1640000000 + rnd.randint(0, 10 ** 7),
+                "level": rnd.choice(LEVELS),
+                "role": rnd.choice(ROLES),
+                "unfriendly": False,
+                "title": rnd.choice(TITLES),
+                "title_expire_time": 0,
+                "card_changeable": False,
+            })
+        bodies.append(json.dumps({
+            "status": "ok", "retcode": 0, "data": member_list
+        }).encode("utf-8"))
+    return bodies
+
+
+def measure(name: str, bodies: list, convert) -> int:
+    gc.collect()
+    tracemalloc.start()
+    kept = [convert(json.loads(body)["data"]) for body in bodies]
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = sum(len(members) for members in kept)
+    print(f"{name:>14}: {size / 2 ** 20:8.1f} MiB  "
+          f"{size / count:6.0f} bytes/member")
+    del kept
+    return size
+
+
+if __name__ == "__main__":
+    groups = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    members = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    print(f"{groups} groups x {members} members")
+    bodies = fake_groups(groups, members)
+
+    dicts = measure("list of dicts", bodies, lambda data: data)
+    records = measure("Member", bodies,
+                      lambda data: [Member(member) for member in data])
+    print(f"Member uses {records / dicts:.0%} of the memory")
@@ -0,0 +1,86 @@
+# -*- coding=utf-8 -*-
+"""
+声音创建性能测试
+
+对比原先复制上报数据的字典子类声音与现在使用 `__slots__`、不复制上报数据的声音：
+创建一个群消息声音的耗时，以及保留 `count` 个声音时每个声音占用的内存 (tracemalloc)。
+
+    python benchmark/sound_bench.py [count]
+"""
+
+import gc
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cqbear.sound import NormalGroupMessage  # noqa: E402
+
+BODY = json.dumps({
+    "time": 1650000000, "self_id": 10000, "post_type": "message",
+    "message_type": "group", "sub_type": "normal", "message_id": 42,
+    "group_id": 123456, "user_id": 10001, "anonymous": None,
+    "message": "[CQ:at,qq=10000] hello bear", "raw_message":
+    "[CQ:at,qq=10000] hello bear", "font": 0,
+    "sender": {"user_id": 10001, "nickname": "bear", "card": "",
+               "sex": "unknown", "age": 0, "area": "", "level": "1",
+               "role": "member", "title": ""},
+}).encode("utf-8")
+
+
+class DictSound(dict):
+    """与原先的声音布局相同：复制上报数据，包装对象缓存在实例字典中"""
+
+    def __init__(self, data: dict):
+        super(DictSound, self).__init__(data)
+
+
+class DictMessage(DictSound):
+    def __init__(self, data: dict):
+        super(DictMessage, self).__init__(data)
+
+
+class DictGroupMessage(DictMessage):
+    def __init__(self, data: dict):
+        super(DictGroupMessage, self).__init__(data)
+        self._sender = None
+        self._is_anony = None
+        self._anony = None
+
+
+class DictNormalGroupMessage(DictGroupMessage):
+    def __init__(self, data: dict):
+        super(DictNormalGroupMessage, self).__init__(data)
+
+
+def construct(name: str, cls, number: int) -> float:
+    data = json.loads(BODY)
+    cost = min(timeit.repeat(lambda: cls(data), number=number, repeat=5))
+    per_sound = cost / number * 1e9
+    print(f"{name:>18}: {per_sound:6.0f} ns/sound", end="  ")
+    return per_sound
+
+
+def memory(cls, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    kept = [cls(json.loads(BODY)) for _ in range(count)]
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    print(f"{size / count:6.0f} bytes/sound")
+    return size / count
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    old = construct("dict subclass", DictNormalGroupMessage, count), \
+        memory(DictNormalGroupMessage, count)
+    new = construct("slotted Sound", NormalGroupMessage, count), \
+        memory(NormalGroupMessage, count)
+    print(f"construction {new[0] / old[0]:.0%}, memory {new[1] / old[1]:.0%}"
+          f" of the dict subclass")
@@ -0,0 +1,51 @@
+# -*- coding=utf-8 -*-
+"""
+声音字段访问性能测试
+
+对比原先使用 `sys._getframe().f_code.co_name` 查找字段名的属性、
+`cqbear.sound.Field` 生成的属性以及直接 `dict.get` 的单次访问耗时。
+
+    python benchmark/sound_field_bench.py [number]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cqbear.sound import GroupMessage  # noqa: E402
+
+EVENT = {
+    "time": 1650000000, "self_id": 10000, "post_type": "message",
+    "message_type": "group", "sub_type": "normal", "message_id": 42,
+    "group_id": 123456, "user_id": 10001, "anonymous": None,
+    "message": "hello bear", "raw_message": "hello bear", "font": 0,
+    "sender": {"user_id": 10001, "nickname": "bear", "card": "",
+               "role": "member"},
+}
+
+
+class FrameGroupMessage(dict):
+    """字段访问方式与原先的 `GroupMessage` 相同"""
+
+    @property
+    def group_id(self) -> int:
+        return self.get(sys._getframe().f_code.co_name)
+
+
+def bench(name: str, stmt: str, message, number: int) -> float:
+    cost = min(timeit.repeat(stmt, globals={"message": message},
+                             number=number, repeat=5))
+    per_access = cost / number * 1e9
+    print(f"{name:>16}: {per_access:6.1f} ns/access")
+    return per_access
+
+
+if __name__ == "__main__":
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    frame = bench("sys._getframe", "message.group_id",
+                  FrameGroupMessage(EVENT), number)
+    field = bench("Field", "message.group_id", GroupMessage(EVENT), number)
+    bench("dict.get", "message.get('group_id')", GroupMessage(EVENT), number)
+    print(f"Field is {frame / field:.1f}x faster than sys._getframe")
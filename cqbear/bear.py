@@ -4,103 +4,289 @@ TODO:
 """
 
 import time
+import asyncio
+import inspect
+import collections
 from typing import (
-    Callable, Dict, List, Optional,
+    Callable, Dict, Hashable, Iterable, Iterator, List, Optional,
     Tuple, Union
 )
 import requests
+import requests.adapters
 import threading
-import socket
 import json
+import weakref
+import functools
+import random
+import copy
+from concurrent import futures
+from concurrent.futures import (
+    Future, InvalidStateError, ProcessPoolExecutor, ThreadPoolExecutor
+)
 
-from flask import Flask, request as flask_request
+from cqbear.health import HealthMonitor
 from cqbear.remember import Job, Remember
 from cqbear.roar import (
     CheckCanSendImage, CheckCanSendVoiceRecord,
-    CheckUrlSafely, GetFriendList, GetGroupList,
-    GetGroupMemberList, GetMessage, GetOnlineClient,
+    CheckUrlSafely, GetFriendList,
+    GetMessage, GetOnlineClient,
     GetStatus, GetVersionInfo, GetVipInfo,
-    RestartCqhttpServer, Roar, getLoginInfo
+    RestartCqhttpServer, Roar, SendGroupMessage, SendPrivateMessage,
+    getLoginInfo
+)
+from cqbear.sentence import At, Sentence
+from cqbear.server import SoundServer
+from cqbear.sound import (
+    GroupMessage, Message, MetaEvent, Notice, PrivateMessage, RawSound,
+    Sound, SoundUnderstander
 )
-from cqbear.sound import Sound, SoundUnderstander
+from cqbear.sound_queue import SoundQueue
+from cqbear.roar_cache import RoarCache, roar_key
+from cqbear.roster import Roster, RosterLoader
+from cqbear.traffic import CircuitBreaker, CircuitOpenError, SpeakScheduler
 from cqbear.util import stop_thread
 
 import logging
+try:
+    from flask import Flask, request as flask_request
+except ImportError:  # flask is only needed by the `flask` ear server
+    Flask = None
+    flask_request = None
 werkzeug = logging.getLogger('werkzeug')
 werkzeug.setLevel(logging.ERROR)
+logger = logging.getLogger(__name__)
 
 
 class BearEar(object):
+    """耳朵
+
+    - server: 接收上报事件所用的 http 服务端
+
+        `BearEar.ASYNCIO`: 内置的 asyncio 服务端 (默认，支持 HTTP/1.1 keep-alive)
+        `BearEar.FLASK`: 基于 Flask 的服务端 (需要安装 flask)
+    - capacity: 声音队列的容量
+    - high_water: 声音队列的高水位，排队数量超过高水位后按声音类型的溢出策略丢弃声音，
+        参考 `cqbear.sound_queue.SoundQueue`
+    - quick_deadline: 快速操作的等待时间(秒)，大于 0 时每个上报事件的 http 响应最多等待
+        quick_deadline 秒，在此期间反应回调通过 `CqBear.quick_operation` 给出的快速操作
+        会随响应返回给 go-cqhttp；默认为 0，即立即响应
+    - on_hear: 每收到一个上报事件(包括心跳等元事件)时调用的回调，参数为声音实体，
+        在入队之前调用，需要尽快返回
+    - sound_filter: 在解码 json 之前筛选上报事件的回调，参数为声音类型与尚未解码的
+        `cqbear.sound.RawSound`，返回 False 的事件不会被解码、创建声音和入队，
+        直接响应 go-cqhttp；默认不筛选。原始内容中的类型字段无法确定时不会筛选
+    - always_hear: on_hear 总是需要的声音类型，这些声音被 sound_filter 筛掉时仍会被解码
+        并交给 on_hear，但不会入队
+    - on_reject: 上报事件被 sound_filter 筛掉时调用的回调 (always_hear 中的声音在 on_hear
+        之后调用)，参数为声音类型与尚未解码的 `RawSound`，需要尽快返回
+    """
 
     LISTEN = True
     IGNORE = False
 
-    def __init__(self, addr, port, secret):
+    ASYNCIO = "asyncio"
+    FLASK = "flask"
+
+    def __init__(self, addr, port, secret, server: str = ASYNCIO,
+                 capacity: int = 4096, high_water: Optional[int] = None,
+                 quick_deadline: float = 0,
+                 on_hear: Optional[Callable[[Sound], None]] = None,
+                 sound_filter: Optional[
+                     Callable[[type, RawSound], bool]] = None,
+                 always_hear: Tuple[type, ...] = (),
+                 on_reject: Optional[
+                     Callable[[type, RawSound], None]] = None):
         self.addr = addr
         self.port = port
         self.secret = secret
         self.status = self.IGNORE
-
-        self.__sound_list = []
+        self.server = server
+        self.quick_deadline = quick_deadline
+        self.__on_hear = on_hear
+        self.__sound_filter = sound_filter
+        self.__always_hear = tuple(always_hear)
+        self.__on_reject = on_reject
+        self.__rejected_lock = threading.Lock()
+        self.__rejected = 0
+
+        self.__sound_queue = SoundQueue(capacity, high_water,
+                                        on_shed=_finish_quick)
         self.__understander = SoundUnderstander()
         self.__think_thread = None
 
-        # TODO:
-        # replace the flask http server to
-        # hand-write, socket-based http server
-        self._ear = Flask(__name__)
-        self._ear.add_url_rule(
-            rule="/",
-            endpoint=None,
-            view_func=self.__listen,
-            methods=['POST'])
+        if server == self.ASYNCIO:
+            self._ear = SoundServer(self.addr, self.port, self.__hear_body)
+        elif server == self.FLASK:
+            if Flask is None:
+                raise ImportError(
+                    "BearEar with server='flask' requires flask installed")
+            self._ear = Flask(__name__)
+            self._ear.add_url_rule(
+                rule="/",
+                endpoint=None,
+                view_func=self.__listen,
+                methods=['POST'])
+        else:
+            raise ValueError(f"unknown bear ear server: {server}")
 
     def __listen(self):
-        if self.is_listening:
-            request_json_data = flask_request.get_json()
-            sound = self.__understander.understand(request_json_data)
+        quick = self.__hear_raw(flask_request.get_data())
+        if quick is None:
+            return 'OK'
+        futures.wait([quick], timeout=self.quick_deadline)
+        return _quick_response(quick)
+
+    def __hear_body(self, body: bytes):
+        quick = self.__hear_raw(body)
+        if quick is None:
+            return 'OK'
+        return self.__wait_quick(quick)
+
+    def __hear_raw(self, body: bytes) -> Optional[Future]:
+        """筛选并解码上报事件的原始内容"""
+        if not self.is_listening:
+            return None
+        if self.__sound_filter is not None:
+            raw = RawSound(body)
+            rejected = self.__reject(raw)
+            if rejected is not None:
+                if issubclass(rejected, self.__always_hear):
+                    self.__hear(_loads(body), enqueue=False)
+                if self.__on_reject is not None:
+                    try:
+                        self.__on_reject(rejected, raw)
+                    except Exception:
+                        logger.exception(f"on_reject failed on {raw!r}")
+                return None
+        return self.__hear(_loads(body))
+
+    def __reject(self, raw: RawSound) -> Optional[type]:
+        """被 sound_filter 筛掉时返回声音类型"""
+        if raw.get("post_type") is None:
+            return None  # not a plain event, leave it to the full decode
+        sound_type = self.__understander.classify(raw)
+        try:
+            wanted = self.__sound_filter(sound_type, raw)
+        except Exception:
+            logger.exception(f"sound filter failed on {raw!r}")
+            return None
+        if wanted or raw.uncertain:
+            return None
+        with self.__rejected_lock:
+            self.__rejected += 1
+        return sound_type
+
+    async def __wait_quick(self, quick: Future):
+        await asyncio.wait([asyncio.wrap_future(quick)],
+                           timeout=self.quick_deadline)
+        return _quick_response(quick)
+
+    def __hear(self, data: Optional[dict],
+               enqueue: bool = True) -> Optional[Future]:
+        """声音入队，需要等待快速操作时返回快速操作的 Future"""
+        if self.is_listening and isinstance(data, dict):
+            sound = self.__understander.understand(data)
             if sound and isinstance(sound, Sound):
-                self.__sound_list.append(sound)
+                if self.__on_hear is not None:
+                    self.__on_hear(sound)
+                if not enqueue:
+                    return None
+                quick = None
+                if self.quick_deadline > 0:
+                    quick = sound._quick = Future()
+                if self.__sound_queue.put(sound):
+                    return quick
                 # print(f"insert a sound into list \n {sound}")
-        return 'OK'
+        return None
 
     def start_listen(self):
-        self.__think_thread = threading.Thread(
-            target=self._ear.run,
-            name="cqBear_ear_flask",
-            kwargs={
-                "host": self.addr,
-                "port": self.port,
-                "debug": False,
-                "use_reloader": False
-            }
-        )
+        self.__sound_queue.open()
+        if self.server == self.ASYNCIO:
+            self.__think_thread = threading.Thread(
+                target=self._ear.serve_forever,
+                name="cqBear_ear_asyncio"
+            )
+        else:
+            self.__think_thread = threading.Thread(
+                target=self._ear.run,
+                name="cqBear_ear_flask",
+                kwargs={
+                    "host": self.addr,
+                    "port": self.port,
+                    "debug": False,
+                    "use_reloader": False
+                }
+            )
 
         if self.__think_thread:
             self.__think_thread.start()
+        if self.server == self.ASYNCIO:
+            self._ear.wait_ready()
         self.status = self.LISTEN
         print(f"bear ear listen at {self.addr}:{self.port}")
 
     def stop_listen(self):
+        self.__sound_queue.close()
         if self.__think_thread.is_alive():
-            stop_thread(self)
+            if self.server == self.ASYNCIO:
+                self._ear.shutdown()
+                self.__think_thread.join()
+            else:
+                stop_thread(self.__think_thread)
         if not self.__think_thread.is_alive():
             self.status = self.IGNORE
             print("bear ear will ignore all sound")
 
     def clear_sound(self):
-        self.__sound_list.clear()
+        self.__sound_queue.clear()
 
     @property
     def is_listening(self):
         return self.status and self.__think_thread.is_alive()
 
-    def get_sound(self) -> Optional[Sound]:
-        if not len(self.__sound_list):
-            return None
-        sound = self.__sound_list[0]
-        del self.__sound_list[0]
-        return sound
+    @property
+    def sound_depth(self) -> int:
+        """声音队列中等待处理的声音数量"""
+        return self.__sound_queue.depth
+
+    @property
+    def sound_capacity(self) -> int:
+        return self.__sound_queue.capacity
+
+    @property
+    def sound_dropped(self) -> int:
+        """因声音队列过载而被丢弃的声音数量"""
+        return self.__sound_queue.dropped
+
+    @property
+    def sound_shed_stats(self) -> Dict[type, int]:
+        """各声音类型因声音队列过载而被丢弃的数量"""
+        return self.__sound_queue.shed_stats
+
+    @property
+    def sound_rejected(self) -> int:
+        """被 sound_filter 筛掉、没有入队的上报事件数量"""
+        return self.__rejected
+
+    def set_sound_policy(self, sound_type: type, policy: str):
+        """设置声音类型在声音队列过载时的溢出策略
+
+        - policy: `SoundQueue.DROP_OLDEST` / `SoundQueue.DROP_NEWEST` / `SoundQueue.KEEP`
+        """
+        self.__sound_queue.set_policy(sound_type, policy)
+
+    def get_sound(self, block: bool = False,
+                  timeout: Optional[float] = None) -> Optional[Sound]:
+        """从声音队列中获取一个声音，默认不等待，队列为空时返回 None"""
+        return self.__sound_queue.get(block, timeout)
+
+    def wait_sound(self, timeout: Optional[float] = None) -> Optional[Sound]:
+        """阻塞等待并获取一个声音，超时或停止监听时返回 None"""
+        return self.__sound_queue.get(True, timeout)
+
+    async def wait_sound_async(self) -> Optional[Sound]:
+        """在 asyncio 事件循环中等待并获取一个声音，停止监听时返回 None"""
+        return await self.__sound_queue.get_async()
 
     def ignore_sound(self):
         self.status = self.IGNORE
@@ -109,17 +295,118 @@ class BearEar(object):
         self.status = self.LISTEN
 
 
+def _loads(body: bytes) -> Optional[dict]:
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _finish_quick(sound: Sound):
+    """声音的反应已经执行完成(或声音被丢弃)，没有快速操作时让耳朵立即响应"""
+    quick = sound._quick
+    if quick is not None and not quick.done():
+        try:
+            quick.set_result(None)
+        except InvalidStateError:  # answered or expired meanwhile
+            pass
+
+
+def _quick_response(quick: Future):
+    if quick.cancel():  # the deadline passed without an answer
+        return 'OK'
+    return quick.result() or 'OK'
+
+
 class BearMouth(object):
+    """熊嘴，向 go-cqhttp 发送吼叫(API 调用)
+
+    使用带连接池的 `requests.Session` 发送请求，与 go-cqhttp 之间的 TCP 连接会被复用，
+    不再为每次调用建立新连接。
+
+    - pool_size: 连接池中保持的最大连接数
+    - connect_timeout: 建立连接的超时时间(秒)
+    - read_timeout: 等待响应的超时时间(秒)，`None` 为一直等待
+    - concurrency: `speak_nowait`/`speak_async` 同时发送的最大吼叫数，默认与 pool_size 相同
+    - scheduler: 发送消息的限速调度器，设置后发送群消息、私聊消息和合并转发的吼叫
+        会按令牌桶限速排队发出，参考 `cqbear.traffic.SpeakScheduler`
+    - retries: 幂等的吼叫 (`Roar.idempotent`) 连接失败、超时或 go-cqhttp 返回 5xx 时的重试次数，
+        非幂等的吼叫 (例如发送消息) 不会重试，避免重复发送
+    - backoff / backoff_max: 重试的指数退避基数与上限(秒)，每次等待
+        `[0, min(backoff_max, backoff * 2 ** n))` 之间的随机时间
+    - breaker: 熔断器，默认连续失败 5 次后断开 10 秒，断开期间的吼叫立即抛出
+        `CircuitOpenError`，参考 `cqbear.traffic.CircuitBreaker`
+    - on_speak_result: 每次调用 go-cqhttp 后调用的回调，参数为 go-cqhttp 是否可达：
+        得到 http 响应或读取超时 (已经连接上) 为 True，连接失败为 False，
+        其余异常不调用，参考 `cqbear.health.HealthMonitor.report_speak`
+    - cache: 查询类吼叫的结果缓存，参考 `cqbear.roar_cache.RoarCache`
+    - coalesce: 为 True 时合并同时发出的相同幂等吼叫 (API 与参数都相同)，
+        只调用一次 go-cqhttp，所有调用者得到相同的结果
+    """
 
     FREE = True
     SHUTUP = False
 
-    def __init__(self, addr, port):
+    RETRY_STATUS = (502, 503, 504)
+
+    def __init__(self, addr, port, pool_size: int = 10,
+                 connect_timeout: float = 3.05,
+                 read_timeout: Optional[float] = 30,
+                 concurrency: Optional[int] = None,
+                 scheduler: Optional[SpeakScheduler] = None,
+                 retries: int = 2, backoff: float = 0.2,
+                 backoff_max: float = 5.0,
+                 breaker: Optional[CircuitBreaker] = None,
+                 on_speak_result: Optional[Callable[[bool], None]] = None,
+                 cache: Optional[RoarCache] = None,
+                 coalesce: bool = True):
         self.addr = addr
         self.port = port
         self._base_url = f"http://{self.addr}:{self.port}"
 
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+
         self.__status = self.FREE
+        self.__session: Optional[requests.Session] = None
+        self.__session_lock = threading.Lock()
+        self.concurrency = concurrency or pool_size
+        self.__speak_pool: Optional[ThreadPoolExecutor] = None
+        self.__scheduler = scheduler
+
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.__breaker = breaker if breaker is not None else CircuitBreaker()
+        self.__on_speak_result = on_speak_result
+        self.__cache = cache
+
+        self.coalesce = coalesce
+        self.__inflight_lock = threading.Lock()
+        # roar key -> [future of the leading call, number of waiting calls]
+        self.__inflight: Dict[Hashable, list] = {}
+        self.__coalesced = 0
+
+    @property
+    def scheduler(self) -> Optional[SpeakScheduler]:
+        return self.__scheduler
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.__breaker
+
+    @property
+    def cache(self) -> Optional[RoarCache]:
+        return self.__cache
+
+    @property
+    def coalesce_stats(self) -> dict:
+        """正在调用的幂等吼叫数量以及被合并 (没有调用 go-cqhttp) 的吼叫数量"""
+        with self.__inflight_lock:
+            return {
+                "inflight": len(self.__inflight),
+                "coalesced": self.__coalesced,
+            }
 
     @property
     def speakable(self):
@@ -131,20 +418,220 @@ class BearMouth(object):
     def shut_up(self):
         self.__status = self.SHUTUP
 
-    def speak(self, roar: Roar) -> Tuple[
+    @property
+    def session(self) -> requests.Session:
+        """与 go-cqhttp 通信的 session，第一次使用时创建"""
+        session = self.__session
+        if session is None:
+            with self.__session_lock:
+                if self.__session is None:
+                    self.__session = self.__new_session()
+                session = self.__session
+        return session
+
+    def __new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self):
+        """关闭连接池中的所有连接，之后的吼叫会重新建立连接
+
+        限速调度器中还未发出的吼叫会被取消
+        """
+        if self.__scheduler is not None:
+            self.__scheduler.stop()
+        with self.__session_lock:
+            session, self.__session = self.__session, None
+            speak_pool, self.__speak_pool = self.__speak_pool, None
+        if speak_pool is not None:
+            speak_pool.shutdown(wait=False)
+        if session is not None:
+            session.close()
+
+    def speak_nowait(self, roar: Roar,
+                     priority: int = SpeakScheduler.NORMAL,
+                     delivery: Optional[str] = None,
+                     no_cache: bool = False) -> Future:
+        """不等待 go-cqhttp 响应，立即返回 `concurrent.futures.Future`
+
+        吼叫在发送线程池中发送，最多同时发送 `concurrency` 个吼叫，其余的排队等待。
+        Future 的结果与 `speak` 的返回值相同。
+
+        - priority: 设置了限速调度器时发送消息的吼叫的优先级，
+            参考 `SpeakScheduler.HIGH` / `NORMAL` / `LOW`
+        - delivery: 覆盖吼叫的调用方式，参考 `speak`
+        - no_cache: 不使用查询结果缓存，参考 `speak`
+        """
+        roar = _with_delivery(roar, delivery)
+        target = self.__scheduled_target(roar)
+        if target is not None:
+            self.__scheduler.start(self.__submit_speak)
+            return self.__scheduler.submit(roar, target, priority)
+        return self.__submit_speak(roar, no_cache)
+
+    def __scheduled_target(self, roar: Roar):
+        # go-cqhttp already throttles the rate_limited endpoints
+        if self.__scheduler is None or roar.delivery == Roar.RATE_LIMITED:
+            return None
+        return roar.target_key
+
+    def __submit_speak(self, roar: Roar, no_cache: bool = False) -> Future:
+        speak_pool = self.__speak_pool
+        if speak_pool is None:
+            with self.__session_lock:
+                if self.__speak_pool is None:
+                    self.__speak_pool = ThreadPoolExecutor(
+                        max_workers=self.concurrency,
+                        thread_name_prefix="cqBear_mouth")
+                speak_pool = self.__speak_pool
+        return speak_pool.submit(self.__speak_now, roar, no_cache)
+
+    async def speak_async(self, roar: Roar,
+                          priority: int = SpeakScheduler.NORMAL,
+                          delivery: Optional[str] = None,
+                          no_cache: bool = False) -> Tuple[
+        int,
+        Optional[Union[dict, list]]
+    ]:
+        """`speak` 的协程版本，在发送线程池中发送吼叫"""
+        return await asyncio.wrap_future(
+            self.speak_nowait(roar, priority, delivery, no_cache))
+
+    def speak(self, roar: Roar,
+              priority: int = SpeakScheduler.NORMAL,
+              delivery: Optional[str] = None,
+              no_cache: bool = False) -> Tuple[
+        int,
+        Optional[Union[dict, list]]
+    ]:
+        """发送吼叫并等待 go-cqhttp 的响应
+
+        设置了限速调度器时，发送消息的吼叫会等到调度器将其发出后才返回，
+        不希望等待时可以使用 `speak_nowait`
+
+        - delivery: 覆盖吼叫的调用方式 (`Roar.SYNC` / `Roar.ASYNC` / `Roar.RATE_LIMITED`)，
+            `ASYNC` 与 `RATE_LIMITED` 不等待 API 执行完成，go-cqhttp 收到后立即返回
+            `(1, None)`；`RATE_LIMITED` 由 go-cqhttp 限速，不经过限速调度器
+        - no_cache: 为 True 时查询类吼叫不使用结果缓存，直接调用 go-cqhttp
+        """
+        roar = _with_delivery(roar, delivery)
+        if self.__scheduled_target(roar) is not None:
+            return self.speak_nowait(roar, priority).result()
+        return self.__speak_now(roar, no_cache)
+
+    def __speak_now(self, roar: Roar, no_cache: bool = False) -> Tuple[
         int,
         Optional[Union[dict, list]]
     ]:
         if not self.speakable:
             return
 
+        cache_key = None
+        generation = ()
+        if self.__cache is not None:
+            # taken before the call, a notice heard during the call makes
+            # its result stale
+            generation = self.__cache.generation(roar)
+            if not no_cache:
+                cache_key = self.__cache.key_of(roar)
+        if cache_key is not None:
+            cached = self.__cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        ret = self.__call_coalesced(roar, generation)
+        if cache_key is not None and ret[0] == 0:
+            self.__cache.put(cache_key, roar, ret, generation)
+        return ret
+
+    def __call_coalesced(self, roar: Roar, generation: tuple = ()) -> Tuple[
+        int,
+        Optional[Union[dict, list]]
+    ]:
+        """相同的幂等吼叫同时只调用一次 go-cqhttp，之后的调用等待第一次调用的结果
+
+        - generation: 吼叫依赖的对象被清除缓存的次数 (`RoarCache.generation`)，
+            依赖的对象在第一次调用之后被清除过缓存时，之后的调用不会等待这个可能过时的结果
+        """
+        key = None
+        if self.coalesce and roar.idempotent and roar.delivery == Roar.SYNC:
+            key = roar_key(roar)
+        if key is None:
+            return self.__call(roar)
+        key = (key, generation)
+
+        with self.__inflight_lock:
+            inflight = self.__inflight.get(key)
+            if inflight is None:
+                inflight = self.__inflight[key] = [Future(), 0]
+                leader = True
+            else:
+                inflight[1] += 1
+                self.__coalesced += 1
+                leader = False
+        future = inflight[0]
+        if not leader:
+            # every caller gets its own copy of the shared result
+            return copy.deepcopy(future.result())
+
+        try:
+            ret = self.__call(roar)
+        except BaseException as e:
+            with self.__inflight_lock:
+                del self.__inflight[key]
+            future.set_exception(e)
+            raise
+        with self.__inflight_lock:
+            del self.__inflight[key]
+            waiting = inflight[1]
+        future.set_result(ret)
+        return copy.deepcopy(ret) if waiting else ret
+
+    def __call(self, roar: Roar) -> Tuple[
+        int,
+        Optional[Union[dict, list]]
+    ]:
         url = f'{self._base_url}/{roar.extend_url}'
         data = roar.speak_data
 
-        rcv = requests.post(url=url, data=data)
-        req_code = rcv.status_code
-        req_content = rcv.content
-        rcv.close()
+        attempts = self.retries + 1 if roar.idempotent else 1
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(random.uniform(
+                    0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+            if not self.__breaker.allow():
+                raise CircuitOpenError(
+                    f"bear mouth to {self._base_url} is open, "
+                    f"roar <{roar.extend_url}> is not sent")
+            try:
+                with self.session.post(url=url, data=data,
+                                       timeout=self.timeout) as rcv:
+                    req_code = rcv.status_code
+                    req_content = rcv.content
+            except requests.exceptions.RequestException as e:
+                self.__breaker.record_failure()
+                if self.__on_speak_result is not None:
+                    if isinstance(e, requests.exceptions.ConnectionError):
+                        self.__on_speak_result(False)
+                    elif isinstance(e, requests.exceptions.ReadTimeout):
+                        # connected but slow to answer, go-cqhttp is up
+                        self.__on_speak_result(True)
+                if attempt + 1 >= attempts:
+                    raise
+                continue
+            if self.__on_speak_result is not None:
+                self.__on_speak_result(True)
+            if req_code in self.RETRY_STATUS:
+                self.__breaker.record_failure()
+                if attempt + 1 < attempts:
+                    continue
+            else:
+                self.__breaker.record_success()
+            break
 
         if req_code != 200:
             return req_code, req_content
@@ -154,28 +641,184 @@ class BearMouth(object):
         j_req_status = j_req.get("status", "fail")
         j_req_data = j_req.get("data")
 
+        if j_req_status == "async":
+            # accepted by an `_async` / `_rate_limited` endpoint
+            return j_req_code, j_req_data
+
         if not j_req_code == 0 or not j_req_status == "ok":
             return j_req_code, j_req
 
         return j_req_code, j_req_data
 
 
+def _with_delivery(roar: Roar, delivery: Optional[str]) -> Roar:
+    if delivery is None or delivery == roar.delivery:
+        return roar
+    return copy.copy(roar).set_delivery(delivery)
+
+
+class ProcessReact(object):
+    """在进程池中执行的声音反应
+
+    声音会被 pickle 后传入工作进程，反应函数收到的 bear 参数是一个只能收集吼叫的替身：
+    `bear.speak(roar)` 不会立即发送而是返回 `(None, None)`，
+    反应函数结束后，收集到的吼叫以及反应函数返回的 `Roar` (或 `Roar` 列表)
+    会被传回主进程并由主进程的 `BearMouth` 依次发送。
+
+    因此反应函数需要是可以被 pickle 的模块级函数。
+    """
+    def __init__(self, func: Callable):
+        self.func = func
+        functools.update_wrapper(self, func)
+
+    def __call__(self, bear, sound: Sound):
+        return _process_react(self.func, sound, getattr(bear, "qq", None))
+
+
+class SubscribedReact(object):
+    """只订阅部分群或用户的声音反应
+
+    由 `CqBear.react(..., groups=..., users=...)` 创建。groups 不为 None 时只有这些群中的
+    声音会触发反应 (私聊等没有群号的声音不会)，users 不为 None 时只有这些用户的声音会触发反应。
+    耳朵在解码之前就会根据群号与 QQ 号丢弃没有反应订阅的声音，参考 `BearBrain.wants`
+    """
+    __slots__ = ("react", "groups", "users")
+
+    def __init__(self, react: Callable,
+                 groups: Optional[Iterable[int]] = None,
+                 users: Optional[Iterable[int]] = None):
+        self.react = react
+        self.groups = frozenset(int(group) for group in groups) \
+            if groups is not None else None
+        self.users = frozenset(int(user) for user in users) \
+            if users is not None else None
+
+    def accepts(self, group_id: Optional[int], user_id: Optional[int]) -> bool:
+        return (self.groups is None or group_id in self.groups) and \
+            (self.users is None or user_id in self.users)
+
+    def __repr__(self) -> str:
+        return f"SubscribedReact({self.react!r}, groups={self.groups}, " \
+            f"users={self.users})"
+
+
+class _ProcessBear(object):
+    """ProcessReact 在工作进程中收到的 bear 替身"""
+    def __init__(self, qq: Optional[int]):
+        self.qq = qq
+        self.roars: List[Roar] = []
+
+    def speak(self, roar: Roar):
+        self.roars.append(roar)
+        return None, None
+
+
+def _process_react(func: Callable, sound: Sound,
+                   qq: Optional[int]) -> List[Roar]:
+    bear = _ProcessBear(qq)
+    ret = func(bear, sound)
+    if isinstance(ret, Roar):
+        bear.roars.append(ret)
+    elif isinstance(ret, (list, tuple)):
+        bear.roars.extend(roar for roar in ret if isinstance(roar, Roar))
+    return bear.roars
+
+
 class BearBrain(object):
+    """大脑
+
+    声音反应按声音类型的 MRO 编译成 {声音类型: 反应回调元组} 的分发表，
+    分发一个声音只需要一次字典查找。分发表在 `add_react` 修改反应关系时失效。
+    同一个声音的反应回调按 MRO 顺序执行：子类的反应先于父类的反应，
+    同一声音类型的反应按添加顺序执行。
+
+    反应回调和记忆任务都可以是 `async def` 函数。
+
+    - workers: 执行反应回调的线程池大小，为 0 时在思考线程中依次执行。
+        使用线程池时，同一会话 (`Sound.conversation_key`，即同一个群或同一个用户)
+        的声音按到达顺序依次执行，不同会话的声音并行执行
+    - max_pending: 最多积压的声音数量 (默认为 workers 的 4 倍，asyncio 运行模式下为 1024)，
+        积压达到上限时大脑会等待，过载的声音留在声音队列中按溢出策略丢弃
+    - runtime: 运行模式
+
+        `BearBrain.THREAD`: 思考线程获取声音，记忆线程执行记忆任务 (默认)，
+            `async def` 反应回调在大脑的事件循环线程中执行，执行完成后才处理下一个声音
+        `BearBrain.ASYNCIO`: 获取声音、分发反应和执行记忆任务都由同一个事件循环驱动，
+            `async def` 反应回调作为协程并发执行 (同一会话中仍按顺序执行)，
+            普通反应回调在线程池中执行
+    - listen_cb: 获取声音的函数，返回 None 表示暂时没有声音。阻塞等待的 listen_cb 需要有超时
+        (例如 `functools.partial(ear.wait_sound, 0.5)`)，否则 `stop_think` 时思考线程
+        无法退出
+    - async_listen_cb: asyncio 运行模式下获取声音的协程函数，一般是 `BearEar.wait_sound_async`，
+        未设置时在线程中调用 listen_cb
+    - processes: 执行 `ProcessReact` 反应的进程池大小，默认为 CPU 核数
+    """
     THINKING = True
     REST = False
 
-    __react_map = {}
+    THREAD = "thread"
+    ASYNCIO = "asyncio"
+    PROCESS = "process"
+
     __remember: Optional[Remember] = None
 
     def __init__(self, bear, listen_cb: Callable,
                  speak_cb: Callable,
                  react_map: Dict[Sound, List[Callable]],
-                 remember_map: Dict[Job, Callable]):
+                 remember_map: Dict[Job, Callable],
+                 workers: int = 0, max_pending: Optional[int] = None,
+                 runtime: str = THREAD,
+                 async_listen_cb: Optional[Callable] = None,
+                 processes: Optional[int] = None):
+        if runtime not in (self.THREAD, self.ASYNCIO):
+            raise ValueError(f"unknown bear brain runtime: {runtime}")
+
         self.__bear = bear
         self.__listen = listen_cb
+        self.__async_listen = async_listen_cb
         self.__speak = speak_cb
-        self.__react_map.update(react_map)
+        self.__react_map: Dict[type, List[Callable]] = {
+            sound: list(reacts) for sound, reacts in react_map.items()
+        }
+        self.__react_lock = threading.Lock()
+        # sound type -> (reacts, whether any of them is a SubscribedReact)
+        self.__dispatch: Dict[type, Tuple[Tuple[Callable, ...], bool]] = {}
+        # sound type -> [(instinct, wants)], wants is None for every sound
+        self.__instincts: Dict[type, List[
+            Tuple[Callable, Optional[Callable]]]] = {}
+        self.__instinct_dispatch: Dict[type, Tuple[Callable, ...]] = {}
+        self.__raw_instinct_dispatch: Dict[type, Tuple[
+            Tuple[Callable, Optional[Callable]], ...]] = {}
+
+        self.__runtime = runtime
+        self.__workers = max(0, workers)
+        self.__react_pool: Optional[ThreadPoolExecutor] = None
+        self.__processes = processes
+        self.__process_pool: Optional[ProcessPoolExecutor] = None
+        self.__process_lock = threading.Lock()
+        # conversation key -> sounds waiting behind the running one
+        self.__lanes: Dict[tuple, collections.deque] = {}
+        self.__lane_lock = threading.Lock()
+        if max_pending:
+            self.__max_pending = max_pending
+        elif runtime == self.ASYNCIO:
+            self.__max_pending = 1024
+        else:
+            self.__max_pending = max(1, self.__workers * 4)
+        self.__react_slots = threading.BoundedSemaphore(self.__max_pending)
+        self.__stats_lock = threading.Lock()
+        self.__pending = 0
+        self.__in_flight = 0
+        self.__done = 0
+        self.__failed = 0
+
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__loop_thread: Optional[threading.Thread] = None
+        self.__loop_lock = threading.Lock()
+        self.__think_task: Optional[asyncio.Task] = None
+
         self.__think_thread = None
+        self.__think_end = False
         self.__remember_thread = None
         self.__status = self.REST
         self.__remember = Remember()
@@ -183,34 +826,384 @@ class BearBrain(object):
         for job, func in remember_map.items():
             self.add_remember(job, func)
 
+    @property
+    def runtime(self) -> str:
+        return self.__runtime
+
     @property
     def is_thinking(self):
+        if self.__runtime == self.ASYNCIO:
+            return self.__status and self.__loop_thread.is_alive()
         return self.__status and \
                self.__think_thread.is_alive() and \
                self.__remember_thread.is_alive()
 
+    @property
+    def react_stats(self) -> Dict[str, int]:
+        """反应回调的执行情况
+
+        - workers: 线程池大小
+        - pending: 已提交、等待执行的声音数量
+        - in_flight: 正在执行反应回调的声音数量
+        - done: 已执行完成的声音数量
+        - failed: 抛出异常的反应回调数量
+        - conversations: 正在执行反应回调的会话数量
+        """
+        return {
+            "workers": self.__workers,
+            "conversations": len(self.__lanes),
+            "pending": self.__pending,
+            "in_flight": self.__in_flight,
+            "done": self.__done,
+            "failed": self.__failed,
+        }
+
+    def __instinct(self, sound: Sound):
+        instincts = self.__instinct_dispatch.get(type(sound))
+        if instincts is None:
+            with self.__react_lock:
+                instincts = tuple(
+                    instinct
+                    for cls in type(sound).__mro__
+                    for instinct, _ in self.__instincts.get(cls, ())
+                )
+                self.__instinct_dispatch[type(sound)] = instincts
+        self.__run_instincts(instincts, sound)
+
+    @staticmethod
+    def __run_instincts(instincts: Iterable[Callable], sound: Sound):
+        for instinct in instincts:
+            try:
+                instinct(sound)
+            except Exception:
+                logger.exception(
+                    f"instinct {getattr(instinct, '__qualname__', instinct)} "
+                    f"failed on sound <{sound.type_short}>")
+
+    def instinct_raw(self, sound_type: type, raw: RawSound) -> Optional[Sound]:
+        """对没有反应、不会入队的声音执行本能，在调用者 (耳朵) 的线程中执行
+
+        只有 wants 接受这个尚未解码的声音的本能会被执行 (参考 `add_instinct`)，
+        没有这样的本能时不会解码，返回 None；否则返回解码后的声音
+        """
+        compiled = self.__raw_instinct_dispatch.get(sound_type)
+        if compiled is None:
+            with self.__react_lock:
+                compiled = tuple(
+                    pair
+                    for cls in sound_type.__mro__
+                    for pair in self.__instincts.get(cls, ())
+                )
+                self.__raw_instinct_dispatch[sound_type] = compiled
+        instincts = [instinct for instinct, wants in compiled
+                     if wants is None or wants(sound_type, raw)]
+        if not instincts:
+            return None
+        try:
+            data = json.loads(raw.body)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        sound = sound_type(data)
+        self.__run_instincts(instincts, sound)
+        return sound
+
+    def wants(self, sound_type: type, raw: RawSound) -> bool:
+        """是否有反应会处理这个尚未解码的声音
+
+        声音类型有反应时需要，只订阅部分群或用户的反应 (`SubscribedReact`) 根据群号与
+        QQ 号判断。作为耳朵的 sound_filter 使用，没有反应的声音不会被解码和入队，
+        只有本能关心的声音由 `instinct_raw` 在耳朵的线程中处理
+        """
+        compiled = self.__dispatch.get(sound_type)
+        if compiled is None:
+            compiled = self.__compile_reacts(sound_type)
+        reacts, subscribed = compiled
+        if reacts and not subscribed:
+            return True
+        if reacts:
+            group_id, user_id = raw.get("group_id"), raw.get("user_id")
+            for react in reacts:
+                if not isinstance(react, SubscribedReact) or \
+                        react.accepts(group_id, user_id):
+                    return True
+        return False
+
+    def __reacts_of(self, sound: Sound) -> Tuple[Callable, ...]:
+        self.__instinct(sound)
+        try:
+            print(f"[GOT] [{type(sound)}] <{sound.type_short}>: {sound.message}")
+        except Exception:
+            pass
+        compiled = self.__dispatch.get(type(sound))
+        if compiled is None:
+            compiled = self.__compile_reacts(type(sound))
+        reacts, subscribed = compiled
+        if subscribed:
+            group_id, user_id = sound.get("group_id"), sound.get("user_id")
+            reacts = tuple(
+                react.react if isinstance(react, SubscribedReact) else react
+                for react in reacts
+                if not isinstance(react, SubscribedReact)
+                or react.accepts(group_id, user_id)
+            )
+        return reacts
+
     def _think(self):
-        while True:
-            time.sleep(0.1)
+        while not self.__think_end:
+            # listen_cb may block until a sound comes (BearEar.wait_sound),
+            # a polling listen_cb returning None at once falls back to sleeping
+            started = time.monotonic()
             sound = self.__listen()
-            if sound and type(sound) != Sound:
+            if sound is None:
+                if time.monotonic() - started < 0.1:
+                    time.sleep(0.1)
+                continue
+            react_cb_lst = self.__reacts_of(sound)
+            if not react_cb_lst:
+                _finish_quick(sound)
+                continue
+            if self.__react_pool is None:
+                self.__react(sound, react_cb_lst)
+            else:
+                self.__submit_react(sound, react_cb_lst)
+
+    async def _think_async(self):
+        loop = asyncio.get_running_loop()
+        react_slots = asyncio.Semaphore(self.__max_pending)
+        remember = loop.create_task(self.__remember.async_run())
+        try:
+            while not self.__think_end:
+                if self.__async_listen is not None:
+                    sound = await self.__async_listen()
+                else:
+                    sound = await loop.run_in_executor(None, self.__listen)
+                if sound is None:
+                    await asyncio.sleep(0.1)
+                    continue
+                react_cb_lst = self.__reacts_of(sound)
+                if not react_cb_lst:
+                    _finish_quick(sound)
+                    continue
+
+                await react_slots.acquire()
+                with self.__stats_lock:
+                    self.__pending += 1
+                key = sound.conversation_key
+                if key is None:
+                    loop.create_task(self.__react_async(
+                        sound, react_cb_lst, react_slots))
+                elif key in self.__lanes:
+                    self.__lanes[key].append((sound, react_cb_lst))
+                else:
+                    self.__lanes[key] = collections.deque()
+                    loop.create_task(self.__lane_react_async(
+                        key, sound, react_cb_lst, react_slots))
+        finally:
+            remember.cancel()
+
+    def __submit_react(self, sound: Sound, reacts: Tuple[Callable, ...]):
+        self.__react_slots.acquire()
+        with self.__stats_lock:
+            self.__pending += 1
+
+        key = sound.conversation_key
+        if key is not None:
+            with self.__lane_lock:
+                lane = self.__lanes.get(key)
+                if lane is not None:
+                    # the conversation is busy, its running worker
+                    # will take this sound after the previous ones
+                    lane.append((sound, reacts))
+                    return
+                self.__lanes[key] = collections.deque()
+
+        try:
+            if key is None:
+                self.__react_pool.submit(self.__pool_react, sound, reacts)
+            else:
+                self.__react_pool.submit(
+                    self.__lane_react, key, sound, reacts)
+        except RuntimeError:  # the pool is shutting down
+            _finish_quick(sound)
+            if key is not None:
+                with self.__lane_lock:
+                    self.__lanes.pop(key, None)
+            with self.__stats_lock:
+                self.__pending -= 1
+            self.__react_slots.release()
+
+    def __lane_react(self, key: tuple, sound: Sound,
+                     reacts: Tuple[Callable, ...]):
+        while True:
+            self.__pool_react(sound, reacts)
+            with self.__lane_lock:
+                lane = self.__lanes[key]
+                if not lane:
+                    del self.__lanes[key]
+                    return
+                sound, reacts = lane.popleft()
+
+    def __pool_react(self, sound: Sound, reacts: Tuple[Callable, ...]):
+        with self.__stats_lock:
+            self.__pending -= 1
+            self.__in_flight += 1
+        try:
+            self.__react(sound, reacts)
+        finally:
+            with self.__stats_lock:
+                self.__in_flight -= 1
+            self.__react_slots.release()
+
+    def __react(self, sound: Sound, reacts: Tuple[Callable, ...]):
+        for cb in reacts:
+            try:
+                if isinstance(cb, ProcessReact):
+                    for roar in self.__submit_process(cb, sound).result():
+                        self.__speak(roar)
+                    continue
+                ret = cb(self.__bear, sound)
+                if inspect.isawaitable(ret):
+                    self.__run_coroutine(ret)
+            except Exception:
+                self.__react_failed(cb, sound)
+        _finish_quick(sound)
+        with self.__stats_lock:
+            self.__done += 1
+
+    async def __lane_react_async(self, key: tuple, sound: Sound,
+                                 reacts: Tuple[Callable, ...],
+                                 react_slots: asyncio.Semaphore):
+        while True:
+            await self.__react_async(sound, reacts, react_slots)
+            lane = self.__lanes[key]
+            if not lane:
+                del self.__lanes[key]
+                return
+            sound, reacts = lane.popleft()
+
+    async def __react_async(self, sound: Sound, reacts: Tuple[Callable, ...],
+                            react_slots: asyncio.Semaphore):
+        with self.__stats_lock:
+            self.__pending -= 1
+            self.__in_flight += 1
+        loop = asyncio.get_running_loop()
+        try:
+            for cb in reacts:
                 try:
-                    print(f"[GOT] [{type(sound)}] <{sound.type_short}>: {sound.message}")
+                    if isinstance(cb, ProcessReact):
+                        roars = await asyncio.wrap_future(
+                            self.__submit_process(cb, sound))
+                        for roar in roars:
+                            await loop.run_in_executor(
+                                self.__react_pool, self.__speak, roar)
+                    elif asyncio.iscoroutinefunction(cb):
+                        await cb(self.__bear, sound)
+                    else:
+                        ret = await loop.run_in_executor(
+                            self.__react_pool, cb, self.__bear, sound)
+                        if inspect.isawaitable(ret):
+                            await ret
                 except Exception:
+                    self.__react_failed(cb, sound)
+            with self.__stats_lock:
+                self.__done += 1
+        finally:
+            _finish_quick(sound)
+            with self.__stats_lock:
+                self.__in_flight -= 1
+            react_slots.release()
+
+    def __submit_process(self, react: ProcessReact, sound: Sound) -> Future:
+        with self.__process_lock:
+            if self.__process_pool is None:
+                self.__process_pool = ProcessPoolExecutor(
+                    max_workers=self.__processes)
+            pool = self.__process_pool
+        return pool.submit(_process_react, react.func, sound,
+                           getattr(self.__bear, "qq", None))
+
+    def __react_failed(self, cb: Callable, sound: Sound):
+        with self.__stats_lock:
+            self.__failed += 1
+        logger.exception(
+            f"react {getattr(cb, '__qualname__', cb)} failed "
+            f"on sound <{sound.type_short}>")
+
+    def __run_coroutine(self, coro):
+        """在大脑的事件循环中执行协程并等待其完成"""
+        with self.__loop_lock:
+            if self.__loop is None:
+                self.__loop = asyncio.new_event_loop()
+                self.__loop_thread = threading.Thread(
+                    target=self.__run_loop,
+                    name="cqBear_brain_loop",
+                    daemon=True
+                )
+                self.__loop_thread.start()
+            loop = self.__loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def __run_loop(self):
+        loop = self.__loop
+        asyncio.set_event_loop(loop)
+        try:
+            if self.__think_task is not None:
+                try:
+                    loop.run_until_complete(self.__think_task)
+                except asyncio.CancelledError:
                     pass
-                react_cb_lst = []
-                for key in self.__react_map.keys():
-                    if isinstance(sound, key):
-                        react_cb_lst.extend(self.__react_map[key])
-                if react_cb_lst:
-                    for cb in react_cb_lst:
-                        try:
-                            cb(self.__bear, sound)
-                        except Exception as e:
-                            print(e)
+            else:
+                loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(
+                asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+            with self.__loop_lock:
+                self.__loop = None
+                self.__think_task = None
+
+    def __compile_reacts(self, sound_type: type) -> Tuple[
+            Tuple[Callable, ...], bool]:
+        with self.__react_lock:
+            reacts = tuple(
+                react
+                for cls in sound_type.__mro__
+                for react in self.__react_map.get(cls, ())
+            )
+            compiled = self.__dispatch[sound_type] = (reacts, any(
+                isinstance(react, SubscribedReact) for react in reacts))
+        return compiled
 
     def start_think(self):
-        if self.is_thinking:
+        if self.__status and self.is_thinking:
+            return
+
+        self.__think_end = False
+        if self.__workers and self.__react_pool is None:
+            self.__react_pool = ThreadPoolExecutor(
+                max_workers=self.__workers,
+                thread_name_prefix="cqBear_brain_react")
+
+        if self.__runtime == self.ASYNCIO:
+            with self.__loop_lock:
+                self.__loop = asyncio.new_event_loop()
+                self.__think_task = self.__loop.create_task(
+                    self._think_async())
+                self.__loop_thread = threading.Thread(
+                    target=self.__run_loop,
+                    name="cqBear_brain_loop"
+                )
+                self.__loop_thread.start()
+            if not self.__loop_thread.is_alive():
+                raise Exception("bear event loop thread running failed")
+            self.__status = self.THINKING
+            print("bear brain start think")
             return
 
         self.__think_thread = threading.Thread(
@@ -236,23 +1229,92 @@ class BearBrain(object):
             raise Exception("bear remember thread running failed")
         print("bear brain start think")
 
+    def __stop_loop(self):
+        with self.__loop_lock:
+            loop = self.__loop
+            think_task = self.__think_task
+        if loop is not None:
+            try:
+                if think_task is not None:
+                    loop.call_soon_threadsafe(think_task.cancel)
+                else:
+                    loop.call_soon_threadsafe(loop.stop)
+            except RuntimeError:  # the loop is already closed
+                pass
+        if self.__loop_thread is not None and \
+           self.__loop_thread is not threading.current_thread():
+            self.__loop_thread.join()
+
+    def __shutdown_process_pool(self):
+        with self.__process_lock:
+            if self.__process_pool is not None:
+                self.__process_pool.shutdown(wait=False)
+                self.__process_pool = None
+
     def stop_think(self):
+        self.__think_end = True
+        self.__shutdown_process_pool()
+        if self.__runtime == self.ASYNCIO:
+            self.__stop_loop()
+            if self.__react_pool is not None:
+                self.__react_pool.shutdown(wait=False)
+                self.__react_pool = None
+            if not self.__loop_thread.is_alive():
+                self.__status = self.REST
+                print("bear brain stop think")
+            return
+
+        if self.__think_thread.is_alive():
+            self.__think_thread.join(1)
         if self.__think_thread.is_alive():
             stop_thread(self.__think_thread)
+        if self.__react_pool is not None:
+            self.__react_pool.shutdown(wait=False)
+            self.__react_pool = None
         if self.__remember_thread.is_alive():
             self.__remember.pause()
-            self.__remember_thread.join()
+            self.__remember_thread.join(1)
+        if self.__remember_thread.is_alive():
             stop_thread(self.__remember_thread)
+        self.__stop_loop()
         if not self.__think_thread.is_alive() and \
            not self.__remember_thread.is_alive():
             self.__status = self.REST
             print("bear brain stop think")
 
-    def add_react(self, sound: Sound, react: Callable):
-        if sound not in self.__react_map.keys():
-            self.__react_map[sound] = [react]
-        else:
-            self.__react_map[sound].append(react)
+    def add_react(self, sound: Sound, react: Callable,
+                  executor: Optional[str] = None,
+                  groups: Optional[Iterable[int]] = None,
+                  users: Optional[Iterable[int]] = None):
+        """添加声音反应
+
+        - executor: 为 `BearBrain.PROCESS` 时反应在进程池中执行，参考 `ProcessReact`
+        - groups / users: 只对这些群 / 用户的声音做出反应，参考 `SubscribedReact`
+        """
+        react = _as_react(react, executor, groups, users)
+        with self.__react_lock:
+            if sound not in self.__react_map.keys():
+                self.__react_map[sound] = [react]
+            else:
+                self.__react_map[sound].append(react)
+            self.__dispatch.clear()
+
+    def add_instinct(self, sound: Sound, instinct: Callable[[Sound], None],
+                     wants: Optional[Callable[[type, RawSound], bool]] = None):
+        """添加本能
+
+        本能是在声音的所有反应之前同步执行的轻量回调，参数只有声音，
+        用于维护缓存等熊自身的状态 (例如听到群成员变化时清除群成员列表的缓存)，
+        需要尽快返回。有反应的声音的本能在思考线程中执行；没有反应的声音不会入队，
+        本能在耳朵的线程中执行 (参考 `instinct_raw`)，因此本能需要是线程安全的
+
+        - wants: 本能是否关心一个没有反应的、尚未解码的声音，参数为声音类型与 `RawSound`，
+            返回 False 时这个声音不会为了本能而被解码；默认关心 sound 类型的所有声音
+        """
+        with self.__react_lock:
+            self.__instincts.setdefault(sound, []).append((instinct, wants))
+            self.__instinct_dispatch.clear()
+            self.__raw_instinct_dispatch.clear()
 
     def add_remember(self, job: Job, func: Optional[Callable] = None):
         if not self.__remember:
@@ -267,6 +1329,25 @@ class BearBrain(object):
             job.bind_remember(self.__remember)
 
 
+def _as_react(react: Callable, executor: Optional[str],
+              groups: Optional[Iterable[int]] = None,
+              users: Optional[Iterable[int]] = None) -> Callable:
+    if groups is not None or users is not None:
+        return SubscribedReact(_as_react(react, executor), groups, users)
+    if executor is None or executor == BearBrain.THREAD:
+        return react
+    if executor == BearBrain.PROCESS:
+        return react if isinstance(react, ProcessReact) \
+            else ProcessReact(react)
+    raise ValueError(f"unknown react executor: {executor}")
+
+
+def _notify_health(bear_ref: "weakref.ref", listener: Callable, online: bool):
+    bear = bear_ref()
+    if bear is not None:
+        listener(bear, online)
+
+
 class CqBear(object):
     """
     CqBear:
@@ -279,9 +1360,61 @@ class CqBear(object):
     """
     __react_map = {}
     __remember_list = {}
+    __bears = weakref.WeakSet()
+
+    # seconds the think thread waits for a sound before checking for stop
+    LISTEN_TIMEOUT = 0.5
 
     def __init__(self, addr: str = "localhost", port: int = 5701, secret="",
-                 cq_addr: str = "localhost", cq_port: int = 5700, qq: int = None):
+                 cq_addr: str = "localhost", cq_port: int = 5700, qq: int = None,
+                 server: str = BearEar.ASYNCIO, sound_capacity: int = 4096,
+                 sound_high_water: Optional[int] = None, workers: int = 0,
+                 runtime: str = BearBrain.THREAD,
+                 processes: Optional[int] = None,
+                 mouth_pool_size: int = 10,
+                 mouth_timeout: Tuple[float, Optional[float]] = (3.05, 30),
+                 speak_concurrency: Optional[int] = None,
+                 speak_scheduler: Optional[SpeakScheduler] = None,
+                 quick_deadline: float = 0,
+                 mouth_retries: int = 2,
+                 mouth_breaker: Optional[CircuitBreaker] = None,
+                 health_probe_interval: float = 30,
+                 roar_cache_ttl: float = 60,
+                 roar_cache_size: int = 1024,
+                 mouth_coalesce: bool = True,
+                 roster_concurrency: int = 8,
+                 sound_prefilter: bool = True):
+        """
+        - server: 接收 go-cqhttp 上报事件的 http 服务端，
+            可选 `BearEar.ASYNCIO` (默认) 或 `BearEar.FLASK`
+        - sound_capacity: 声音队列的容量
+        - sound_high_water: 声音队列的高水位，默认为容量的 80%
+        - workers: 执行声音反应的线程池大小，为 0 时在思考线程中依次执行
+        - runtime: 大脑的运行模式，`BearBrain.THREAD` (默认) 或 `BearBrain.ASYNCIO`，
+            参考 `BearBrain`
+        - processes: 执行 `executor="process"` 反应的进程池大小，默认为 CPU 核数
+        - mouth_pool_size: 与 go-cqhttp 之间保持的最大连接数
+        - mouth_timeout: 调用 go-cqhttp API 的 (连接超时, 读取超时)，单位为秒
+        - speak_concurrency: `speak_nowait`/`speak_async` 同时发送的最大吼叫数，
+            默认与 mouth_pool_size 相同
+        - speak_scheduler: 发送消息的限速调度器，默认不限速，
+            参考 `cqbear.traffic.SpeakScheduler`
+        - quick_deadline: 快速操作的等待时间(秒)，为 0 时不使用快速操作，
+            参考 `CqBear.quick_operation`
+        - mouth_retries: 查询类(幂等)吼叫失败时的重试次数
+        - mouth_breaker: go-cqhttp 不可达时断开熊嘴的熔断器，
+            参考 `cqbear.traffic.CircuitBreaker`
+        - health_probe_interval: 多少秒没有收到 go-cqhttp 的上报或调用结果时
+            主动探测一次 go-cqhttp 是否在线，参考 `cqbear.health.HealthMonitor`
+        - roar_cache_ttl: 群信息、群成员列表、好友列表等查询结果的缓存时间(秒)，
+            为 0 时不缓存，参考 `cqbear.roar_cache.RoarCache`
+        - roar_cache_size: 最多缓存多少个查询结果
+        - mouth_coalesce: 合并同时发出的相同查询类吼叫，只调用一次 go-cqhttp
+        - roster_concurrency: `get_group_list` 同时拉取成员列表的群数量
+        - sound_prefilter: 在解码之前丢弃没有反应或本能关心的上报事件，参考 `BearBrain.wants`；
+            元事件总是会被解码用于判断 go-cqhttp 是否在线，但没有反应时不会入队。
+            通过 `ear_get_sound` 自行获取声音时需要设为 False
+        """
         self.addr = addr
         self.port = port
         self.secret = secret
@@ -290,33 +1423,95 @@ class CqBear(object):
         self.cq_port = cq_port
 
         self.qq = qq
-
-        self.__ear = BearEar(self.addr, self.port, self.secret)
-        self.__mouth = BearMouth(self.cq_addr, self.cq_port)
-        self.__brain = BearBrain(self, self.__ear.get_sound,
+        self.__friend_list = None
+        self.__group_list = None
+
+        self.__health = HealthMonitor(self.cq_addr, self.cq_port,
+                                      health_probe_interval)
+        self.__roar_cache = RoarCache(roar_cache_ttl, roar_cache_size) \
+            if roar_cache_ttl > 0 else None
+        self.__ear = BearEar(self.addr, self.port, self.secret, server,
+                             sound_capacity, sound_high_water,
+                             quick_deadline, on_hear=self.__health.hear,
+                             sound_filter=self.__wants_sound
+                             if sound_prefilter else None,
+                             always_hear=(MetaEvent,),
+                             on_reject=self.__hear_rejected)
+        self.__mouth = BearMouth(self.cq_addr, self.cq_port,
+                                 mouth_pool_size, *mouth_timeout,
+                                 concurrency=speak_concurrency,
+                                 scheduler=speak_scheduler,
+                                 retries=mouth_retries,
+                                 breaker=mouth_breaker,
+                                 on_speak_result=self.__health.report_speak,
+                                 cache=self.__roar_cache,
+                                 coalesce=mouth_coalesce)
+        # a bounded wait lets the think thread see stop_think
+        self.__brain = BearBrain(self, functools.partial(
+                                     self.__ear.wait_sound,
+                                     self.LISTEN_TIMEOUT),
                                  self.__mouth.speak,
-                                 self.__react_map, self.__remember_list)
+                                 self.__react_map, self.__remember_list,
+                                 workers, runtime=runtime,
+                                 async_listen_cb=self.__ear.wait_sound_async,
+                                 processes=processes)
+        if self.__roar_cache is not None:
+            self.__brain.add_instinct(Notice, self.__roar_cache.hear,
+                                      self.__roar_cache.wants)
+        self.__roster = Roster(self.qq)
+        self.__roster_loader = RosterLoader(self.__mouth.speak_nowait,
+                                            roster_concurrency,
+                                            roster=self.__roster)
+        self.__brain.add_instinct(Notice, self.__roster.hear,
+                                  self.__roster.wants)
+        self.__brain.add_instinct(GroupMessage, self.__roster.hear,
+                                  self.__roster.wants)
+        self.__bears.add(self)
+
+    def __wants_sound(self, sound_type: type, raw: RawSound) -> bool:
+        return self.__brain.wants(sound_type, raw)
+
+    def __hear_rejected(self, sound_type: type, raw: RawSound):
+        # sounds without reacts are not queued, their instincts run right here
+        self.__health.hear_raw(sound_type, raw)
+        self.__brain.instinct_raw(sound_type, raw)
 
     def start(self):
         self.__mouth.free()
         self.__ear.start_listen()
         self.__brain.start_think()
+        self.__health.start()
 
     def stop(self):
         self.__mouth.shut_up()
         self.__ear.stop_listen()
         self.__brain.stop_think()
+        self.__mouth.close()
+        self.__health.stop()
 
     # TODO: looking for the reason of reset method
 
     # decorator func
     @classmethod
-    def react(cls, sound_type: type):
+    def react(cls, sound_type: type, executor: Optional[str] = None,
+              groups: Optional[Iterable[int]] = None,
+              users: Optional[Iterable[int]] = None):
+        """注册声音反应
+
+        - executor: 为 `"process"` 时反应在进程池中执行，适合 CPU 密集的反应，
+            参考 `cqbear.bear.ProcessReact`
+        - groups / users: 只对这些群 / 用户的声音做出反应，其余的声音在解码之前就会被丢弃，
+            参考 `cqbear.bear.SubscribedReact`
+        """
         def warpper(react):
+            brain_react = _as_react(react, executor, groups, users)
             if sound_type not in cls.__react_map.keys():
-                cls.__react_map[sound_type] = [react]
+                cls.__react_map[sound_type] = [brain_react]
             else:
-                cls.__react_map[sound_type].append(react)
+                cls.__react_map[sound_type].append(brain_react)
+            # bears created before the decorator also learn the react
+            for bear in list(cls.__bears):
+                bear.add_react(sound_type, brain_react)
             return react
         return warpper
 
@@ -338,6 +1533,18 @@ class CqBear(object):
     def ear_get_sound(self):
         return self.__ear.get_sound()
 
+    def ear_sound_depth(self) -> int:
+        return self.__ear.sound_depth
+
+    def ear_shed_stats(self) -> Dict[type, int]:
+        return self.__ear.sound_shed_stats
+
+    def ear_sound_rejected(self) -> int:
+        return self.__ear.sound_rejected
+
+    def ear_set_sound_policy(self, sound_type: type, policy: str):
+        self.__ear.set_sound_policy(sound_type, policy)
+
     def ear_ignore_sound(self):
         self.__ear.ignore_sound()
 
@@ -348,8 +1555,19 @@ class CqBear(object):
     def brain_is_thinking(self):
         return self.__brain.is_thinking
 
-    def add_react(self, sound: Sound, react: Callable):
-        self.__brain.add_react(sound, react)
+    def brain_react_stats(self) -> Dict[str, int]:
+        return self.__brain.react_stats
+
+    def add_react(self, sound: Sound, react: Callable,
+                  executor: Optional[str] = None,
+                  groups: Optional[Iterable[int]] = None,
+                  users: Optional[Iterable[int]] = None):
+        self.__brain.add_react(sound, react, executor, groups, users)
+
+    def add_instinct(self, sound: Sound, instinct: Callable[[Sound], None],
+                     wants: Optional[Callable[[type, RawSound], bool]] = None):
+        """添加本能，参考 `BearBrain.add_instinct`"""
+        self.__brain.add_instinct(sound, instinct, wants)
 
     def add_remember(self, job: Job, react: Optional[Callable] = None):
         self.__brain.add_remember(job, react)
@@ -362,13 +1580,114 @@ class CqBear(object):
             self.__brain.start_think()
 
     # the mouth encapsulat
-    def speak(self, roar: Roar):
+    def speak(self, roar: Roar, priority: int = SpeakScheduler.NORMAL,
+              delivery: Optional[str] = None, no_cache: bool = False):
         """
+        - delivery: 调用方式，`Roar.ASYNC` / `Roar.RATE_LIMITED` 时
+            go-cqhttp 收到后立即返回，参考 `BearMouth.speak`
+        - no_cache: 为 True 时查询类吼叫不使用结果缓存
+
         Return:
             int: response code
             data: json-loaded dict data
         """
-        return self.__mouth.speak(roar)
+        return self.__mouth.speak(roar, priority, delivery, no_cache)
+
+    def speak_nowait(self, roar: Roar,
+                     priority: int = SpeakScheduler.NORMAL,
+                     delivery: Optional[str] = None,
+                     no_cache: bool = False) -> Future:
+        """不等待 go-cqhttp 响应，立即返回 `concurrent.futures.Future`，
+        适合在反应回调中同时发送多个吼叫
+
+        Return:
+            Future: 结果为 (response code, json-loaded dict data)
+        """
+        return self.__mouth.speak_nowait(roar, priority, delivery, no_cache)
+
+    async def speak_async(self, roar: Roar,
+                          priority: int = SpeakScheduler.NORMAL,
+                          delivery: Optional[str] = None,
+                          no_cache: bool = False):
+        """`speak` 的协程版本，可在 `async def` 反应回调中使用
+
+        Return:
+            int: response code
+            data: json-loaded dict data
+        """
+        return await self.__mouth.speak_async(roar, priority, delivery,
+                                              no_cache)
+
+    def mouth_cache_stats(self) -> Optional[dict]:
+        """查询结果缓存的命中情况，未开启缓存时返回 None"""
+        if self.__roar_cache is None:
+            return None
+        return self.__roar_cache.stats
+
+    def mouth_coalesce_stats(self) -> dict:
+        """正在调用的查询类吼叫数量以及被合并的吼叫数量"""
+        return self.__mouth.coalesce_stats
+
+    def quick_operation(self, sound: Sound, operation: dict) -> bool:
+        """对声音执行快速操作，操作随上报事件的 http 响应返回给 go-cqhttp，
+        不需要再调用一次 API
+
+        需要在创建熊时设置 `quick_deadline`，并在 quick_deadline 秒内调用，
+        例如 `{"reply": "收到", "at_sender": True}`、`{"approve": True}`，
+        可用的操作参考 go-cqhttp 文档中的“快速操作”
+
+        Return:
+            bool: 快速操作是否会随响应返回，超过等待时间、声音已被执行过快速操作
+                或未开启快速操作时返回 False
+        """
+        quick = sound._quick
+        if quick is None:
+            return False
+        try:
+            quick.set_result(dict(operation))
+        except InvalidStateError:
+            return False
+        return True
+
+    def quick_reply(self, sound: Message,
+                    message: Union[str, Sentence, list],
+                    at_sender: Optional[bool] = None,
+                    auto_escape: bool = False):
+        """快速回复消息，无法通过快速操作回复时改为发送群消息/私聊消息
+
+        - at_sender: 是否在回复中 @ 发送者，只对群消息有效
+
+        Return:
+            快速回复成功时返回 None，否则返回 `speak` 的返回值
+        """
+        if isinstance(message, list):
+            message = "".join(str(msg) for msg in message)
+        operation = {"reply": str(message), "auto_escape": auto_escape}
+        if at_sender is not None:
+            operation["at_sender"] = at_sender
+        if self.quick_operation(sound, operation):
+            return None
+
+        if isinstance(sound, GroupMessage):
+            if at_sender:
+                message = str(At().set_user_id(sound.user_id)) + str(message)
+            roar = SendGroupMessage().set_group_id(sound.group_id)
+        elif isinstance(sound, PrivateMessage):
+            roar = SendPrivateMessage().set_user_id(sound.user_id)
+        else:
+            raise TypeError(
+                f"quick_reply only replies to messages, got {type(sound)}")
+        roar.set_message(message).set_auto_escape(auto_escape)
+        return self.speak(roar)
+
+    def mouth_speak_stats(self) -> Optional[dict]:
+        """限速调度器的排队数量与排队等待时间，未设置限速调度器时返回 None"""
+        scheduler = self.__mouth.scheduler
+        return scheduler.stats if scheduler is not None else None
+
+    def mouth_breaker_stats(self) -> dict:
+        """熔断器的状态：{'state': 'closed', 'failures': 0, 'opened': 1, 'rejected': 12}"""
+        return self.__mouth.breaker.stats
 
     def mouth_shutup(self):
         self.__mouth.shut_up()
@@ -384,13 +1703,28 @@ class CqBear(object):
     def gocqhttp_online(self):
         """check the cqhttp server online status
 
+        在线状态由 `cqbear.health.HealthMonitor` 根据上报事件、心跳、
+        熊嘴的调用结果和定期探测维护，查询不会再建立新的连接
+
         Return:
             -> bool: `True` online `False` offline
         """
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        result = sock.connect_ex((self.cq_addr, int(self.cq_port)))
-        sock.close()
-        return result == 0
+        return self.__health.online
+
+    def gocqhttp_health(self) -> dict:
+        """go-cqhttp 在线状态的详细信息，参考 `HealthMonitor.stats`"""
+        return self.__health.stats
+
+    def add_health_listener(self, listener: Callable[["CqBear", bool], None]):
+        """订阅 go-cqhttp 上线/离线的变化，也可以作为装饰器使用::
+
+            @bear.add_health_listener
+            def on_change(bear: CqBear, online: bool):
+                ...
+        """
+        self.__health.subscribe(
+            functools.partial(_notify_health, weakref.ref(self), listener))
+        return listener
 
     def login_info(self):
         """get login bear basic info::
@@ -421,23 +1755,48 @@ class CqBear(object):
     def friend_list(self):
         return self.__friend_list if self.__friend_list else self.get_friend_list()
 
-    def get_group_list(self):
+    def get_group_list(self, force: bool = False):
+        """拉取群列表与所有群的成员列表，再次调用时只拉取成员数量变化了的群
+
+        成员列表由 `RosterLoader` 并发拉取，需要逐个处理拉取完成的群时使用 `load_roster`；
+        返回的是名单的字典副本 (`member_list` 中为成员字典)，可以直接 `json.dumps`
+        """
         if self.gocqhttp_online():
-            roar_group_list = GetGroupList()
-            _, groups = self.speak(roar_group_list)
-            if groups:
-                for group in groups:
-                    group_id = int(group.get("group_id", 0))
-                    if group_id:
-                        roar_group_members = GetGroupMemberList().set_group_id(group_id)
-                        _, members = self.speak(roar_group_members)
-                        group['member_list'] = members
-                self.__group_list = groups
-                return groups
+            for _ in self.load_roster(force):
+                pass
+            self.__group_list = self.__roster_loader.groups
+            return self.__roster_loader.to_list()
+
+    def load_roster(self, force: bool = False) -> Iterator[
+        Tuple[dict, Optional[list]]
+    ]:
+        """并发拉取群成员列表，每个群拉取完成后产出 (群信息, 成员列表)，
+        参考 `cqbear.roster.RosterLoader.load`::
+
+            for group, members in bear.load_roster():
+                print(group["group_id"], bear.roster_progress())
+        """
+        return self.__roster_loader.load(force)
+
+    @property
+    def roster(self) -> Roster:
+        """群成员名单索引，`get_group_list`/`load_roster` 拉取成员列表后
+        根据提醒与群消息增量更新，查询不调用 go-cqhttp::
+
+            bear.roster.is_admin(group_id, user_id)
+            bear.roster.groups_of(user_id)
+        """
+        return self.__roster
+
+    def roster_progress(self) -> dict:
+        """群成员列表的拉取进度：{'total': 300, 'done': 120, 'failed': 0, 'skipped': 0}"""
+        return self.__roster_loader.progress
 
     @property
     def group_list(self):
-        return self.__group_list if self.__group_list else self.get_group_list()
+        if not self.__group_list:
+            return self.get_group_list()
+        return self.__roster_loader.to_list()
 
     @property
     def can_send_image(self):
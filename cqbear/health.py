@@ -0,0 +1,237 @@
+# -*- coding=utf-8 -*-
+"""
+health.py
+
+  go-cqhttp 在线状态监测。
+
+  `HealthMonitor` 根据以下信息维护 go-cqhttp 是否在线，查询在线状态为 O(1)，
+  不再为每次查询建立一次 TCP 连接：
+
+  - 上报的事件：收到任何上报 (包括在解码之前就被耳朵丢弃的上报) 都说明 go-cqhttp 在线，心跳 (`HeartbeatMetaEvent`)
+      同时给出了下一次心跳的时间，超过两个心跳间隔没有收到上报时主动探测
+  - 熊嘴的调用结果：得到响应说明在线，连接失败说明离线
+  - 探测：一段时间内没有任何消息时，探测线程尝试连接 go-cqhttp 的端口
+
+  在线状态变化时依次调用订阅的回调函数。
+
+Expect usage::
+
+    monitor = HealthMonitor("127.0.0.1", 5700)
+    monitor.subscribe(lambda online: print("go-cqhttp", online))
+    monitor.start()
+
+    monitor.online   # -> bool
+    monitor.stats    # {'state': 'up', 'since': 12.3, 'last_seen': 0.4, ...}
+    monitor.stop()
+"""
+
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from cqbear.sound import (
+    DisableLifecycleMetaEvent, HeartbeatMetaEvent, MetaEvent, RawSound, Sound
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """go-cqhttp 在线状态监测
+
+    - addr / port: go-cqhttp 监听的地址与端口
+    - probe_interval: 多少秒没有收到上报或调用结果时主动探测一次
+    - probe_timeout: 探测连接的超时时间(秒)
+    - retry_interval: 离线时查询 `online` 最多每隔多少秒同步探测一次，
+        go-cqhttp 恢复后不需要等待探测线程
+    """
+
+    UNKNOWN = "unknown"
+    UP = "up"
+    DOWN = "down"
+
+    def __init__(self, addr: str, port: int, probe_interval: float = 30,
+                 probe_timeout: float = 1, retry_interval: float = 3):
+        self.addr = addr
+        self.port = port
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.retry_interval = retry_interval
+
+        self.__lock = threading.Lock()
+        self.__state = self.UNKNOWN
+        self.__since = time.monotonic()
+        self.__last_seen = 0.0
+        self.__heartbeat_interval: Optional[float] = None
+        self.__probes = 0
+        self.__last_probe = 0.0
+
+        self.__listeners: List[Callable[[bool], None]] = []
+        # listeners run one by one off the ear/mouth threads
+        self.__notifier: Optional[ThreadPoolExecutor] = None
+        self.__wakeup = threading.Event()
+        self.__stopping = False
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def state(self) -> str:
+        return self.__state
+
+    @property
+    def online(self) -> bool:
+        """go-cqhttp 是否在线
+
+        状态未知时 (例如刚创建) 会同步探测一次；离线时距离上次探测超过
+        retry_interval 秒也会同步探测一次，一次短暂的连接失败不会让熊一直认为它离线
+        """
+        state = self.__state
+        if state == self.UNKNOWN or state == self.DOWN and \
+                time.monotonic() - self.__last_probe >= self.retry_interval:
+            self.probe()
+        return self.__state == self.UP
+
+    @property
+    def stats(self) -> dict:
+        """当前状态、持续时间、距离上次收到消息的时间、心跳间隔(秒)与探测次数"""
+        now = time.monotonic()
+        with self.__lock:
+            return {
+                "state": self.__state,
+                "since": now - self.__since,
+                "last_seen": now - self.__last_seen
+                if self.__last_seen else None,
+                "heartbeat_interval": self.__heartbeat_interval,
+                "probes": self.__probes,
+            }
+
+    def subscribe(self, listener: Callable[[bool], None]):
+        """订阅在线状态的变化，listener 参数为变化后是否在线"""
+        with self.__lock:
+            self.__listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener: Callable[[bool], None]):
+        with self.__lock:
+            if listener in self.__listeners:
+                self.__listeners.remove(listener)
+
+    def hear(self, sound: Sound):
+        """收到了 go-cqhttp 的上报"""
+        if isinstance(sound, HeartbeatMetaEvent) and sound.interval:
+            self.__heartbeat_interval = sound.interval / 1000
+        if isinstance(sound, DisableLifecycleMetaEvent):
+            self.mark_down()
+        else:
+            self.mark_up()
+
+    def hear_raw(self, sound_type: type, raw: RawSound):
+        """收到了在解码之前就被耳朵丢弃的上报，同样说明 go-cqhttp 在线
+
+        生命周期等元事件总是会被解码后交给 `hear`，这里忽略
+        """
+        if not issubclass(sound_type, MetaEvent):
+            self.mark_up()
+
+    def report_speak(self, ok: bool):
+        """熊嘴调用 go-cqhttp 的结果，ok 为是否连接上了 go-cqhttp
+
+        响应慢导致的读取超时不代表 go-cqhttp 离线，只有连接失败时 ok 为 False
+        """
+        if ok:
+            self.mark_up()
+        else:
+            self.mark_down()
+
+    def mark_up(self):
+        self.__last_seen = time.monotonic()
+        if self.__state != self.UP:
+            self.__transit(self.UP)
+
+    def mark_down(self):
+        if self.__state != self.DOWN:
+            self.__transit(self.DOWN)
+
+    def __transit(self, state: str):
+        with self.__lock:
+            if self.__state == state:
+                return
+            was = self.__state
+            self.__state = state
+            self.__since = time.monotonic()
+            listeners = list(self.__listeners)
+            if was == self.UNKNOWN and state == self.UP:
+                listeners = []  # coming up for the first time is no news
+            if listeners and self.__notifier is None:
+                self.__notifier = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="cqBear_health")
+            notifier = self.__notifier
+        online = state == self.UP
+        for listener in listeners:
+            notifier.submit(self.__notify, listener, online)
+
+    @staticmethod
+    def __notify(listener: Callable[[bool], None], online: bool):
+        try:
+            listener(online)
+        except Exception:
+            logger.exception(
+                f"health listener {getattr(listener, '__qualname__', listener)}"
+                f" failed")
+
+    def probe(self) -> bool:
+        """立即探测 go-cqhttp 的端口是否可以连接"""
+        self.__probes += 1
+        self.__last_probe = time.monotonic()
+        try:
+            with socket.create_connection((self.addr, int(self.port)),
+                                          timeout=self.probe_timeout):
+                pass
+        except OSError:
+            self.mark_down()
+            return False
+        self.mark_up()
+        return True
+
+    def __next_probe(self) -> float:
+        """距离下次需要探测的秒数"""
+        if self.__state != self.UP:
+            return 0
+        quiet = self.probe_interval
+        if self.__heartbeat_interval:
+            quiet = min(quiet, self.__heartbeat_interval * 2)
+        return self.__last_seen + quiet - time.monotonic()
+
+    def __run(self):
+        while not self.__stopping:
+            wait = self.__next_probe()
+            if wait > 0:
+                self.__wakeup.wait(wait)
+                self.__wakeup.clear()
+                continue
+            self.probe()
+            if self.__state != self.UP:
+                # retry an offline go-cqhttp every probe interval
+                self.__wakeup.wait(self.probe_interval)
+                self.__wakeup.clear()
+
+    def start(self):
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__stopping = False
+        self.__thread = threading.Thread(
+            target=self.__run, name="cqBear_health_probe", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopping = True
+        self.__wakeup.set()
+        if self.__thread is not None:
+            self.__thread.join(self.probe_timeout + 1)
+            self.__thread = None
+        with self.__lock:
+            notifier, self.__notifier = self.__notifier, None
+        if notifier is not None:
+            notifier.shutdown(wait=False)
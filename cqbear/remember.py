@@ -31,15 +31,24 @@ Expect usage::
     r.every(2).month_day(5).at("8:15:00").to_do(foo, *args, **kwargs)
 
     r.parallel_run()  # or r.padding_run
+
+    # or run on an asyncio event loop, `async def` job functions are
+    # executed as tasks of the loop
+    await r.async_run()
 """
 
 import time
+import asyncio
+import inspect
 import calendar
 import datetime
 import threading
 import functools
+import logging
 from typing import Callable, List, Optional
 
+logger = logging.getLogger(__name__)
+
 
 class RememberException(Exception):
     pass
@@ -70,10 +79,12 @@ class Remember:
     - run the all binded jobs
 
         1. run on one by one mode
-        2. run all job at same time(depends on multi-thread)::
+        2. run all job at same time(depends on multi-thread)
+        3. run all job on a running asyncio event loop::
 
             remember.padding_run()
             remember.parallel_run()
+            await remember.async_run()
 
     - get the running status::
 
@@ -126,7 +137,7 @@ class Remember:
                     if self.__run_end:
                         break
                     if job.is_time_to_run():
-                        job.run()
+                        _run_job(job)
                 if self.__run_end:
                     break
         finally:
@@ -159,7 +170,7 @@ class Remember:
 
                     if not job.is_time_to_run():
                         continue
-                    t = threading.Thread(target=job.run)
+                    t = threading.Thread(target=_run_job, args=(job,))
                     self.__job_thread.append(t)
                     t.run()
 
@@ -173,6 +184,41 @@ class Remember:
         finally:
             self.__running = False
 
+    async def async_run(self):
+        """execute the job if the job is time to run *on the running event
+        loop*.
+
+        `async def` job functions run as tasks of the loop, other job
+        functions run in the default executor of the loop.
+        """
+        if self.__running:
+            raise RememberException(f"Remember<{self}> is already running")
+
+        loop = asyncio.get_running_loop()
+        running = {}  # job -> task, a job is not started twice at once
+        self.__run_end = False
+        self.__running = True
+        try:
+            while not self.__run_end:
+                await asyncio.sleep(self.__interval if self.__interval else 0.5)
+                for job in self.__jobs:
+                    if self.__run_end:
+                        break
+                    if job in running or not job.is_time_to_run():
+                        continue
+                    if job.is_coroutine:
+                        task = loop.create_task(job.run())
+                    else:
+                        task = asyncio.ensure_future(
+                            loop.run_in_executor(None, job.run))
+                    running[job] = task
+                    task.add_done_callback(
+                        functools.partial(_forget_job_task, running, job))
+            if running:
+                await asyncio.gather(*running.values(), return_exceptions=True)
+        finally:
+            self.__running = False
+
     @property
     def is_running(self):
         return self.__running
@@ -273,6 +319,11 @@ class Job:
     def runable(self):
         return True if self.__func else False
 
+    @property
+    def is_coroutine(self) -> bool:
+        """whether the job function is an `async def` function"""
+        return inspect.iscoroutinefunction(self.__func)
+
     def run(self):
         if not self.runable:
             raise RememberException(
@@ -493,6 +544,18 @@ class Job:
         return wrapper
 
 
+def _run_job(job: Job):
+    ret = job.run()
+    if inspect.iscoroutine(ret):
+        asyncio.run(ret)
+
+
+def _forget_job_task(running: dict, job: Job, task: asyncio.Future):
+    running.pop(job, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"{job} failed", exc_info=task.exception())
+
+
 def every(interval=1):
     """create a job for the remember and return it for configuring
 
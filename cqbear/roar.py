@@ -14,19 +14,75 @@ from cqbear.util import allSubclasses
 
 class Roar(dict):
     """发送消息基类
+
+    go-cqhttp 的每个 API 都有三种调用方式，可通过 `set_delivery` 选择：
+
+    - `Roar.SYNC`: 等待 API 执行完成并返回结果 (默认)
+    - `Roar.ASYNC`: 调用 `_async` 后缀的 API，go-cqhttp 收到后立即返回，
+        不返回执行结果 (例如 message_id)
+    - `Roar.RATE_LIMITED`: 调用 `_rate_limited` 后缀的 API，
+        由 go-cqhttp 按照其配置的速率排队执行，同样立即返回
     """
     _extend_url = None
 
+    SYNC = "sync"
+    ASYNC = "async"
+    RATE_LIMITED = "rate_limited"
+
+    _delivery_suffix = {
+        SYNC: "",
+        ASYNC: "_async",
+        RATE_LIMITED: "_rate_limited",
+    }
+
+    delivery = SYNC
+
+    # read-only APIs can be safely retried by `BearMouth`
+    _idempotent = False
+
+    @property
+    def idempotent(self) -> bool:
+        """吼叫是否可以安全地重复发送，发送失败时 `BearMouth` 只会重试幂等的吼叫"""
+        return self._idempotent
+
+    def set_idempotent(self, idempotent: bool):
+        """标记吼叫是否可以安全地重复发送 (默认只有查询类的吼叫是幂等的)"""
+        self._idempotent = idempotent
+        return self
+
     @property
     def extend_url(self) -> str:
+        return self.delivery_url(self.delivery)
+
+    def delivery_url(self, delivery: str) -> str:
         if not self._extend_url:
             raise NotImplementedError
-        return self._extend_url
+        return self._extend_url + self._delivery_suffix[delivery]
+
+    def set_delivery(self, delivery: str):
+        """设置调用方式：`Roar.SYNC` / `Roar.ASYNC` / `Roar.RATE_LIMITED`"""
+        if delivery not in self._delivery_suffix:
+            raise ValueError(f"unknown roar delivery: {delivery}")
+        self.delivery = delivery
+        return self
 
     @property
     def speak_data(self) -> dict:
         return dict(self)
 
+    @property
+    def target_key(self):
+        """发送目标，用于发送消息的限速 (参考 `cqbear.traffic.SpeakScheduler`)，
+        不发送消息的吼叫为 None"""
+        return None
+
+    @property
+    def cache_tags(self):
+        """可以被缓存的查询吼叫的结果所依赖的对象 (例如 `(("group", group_id),)`)，
+        对象发生变化时相应的缓存会被清除，参考 `cqbear.roar_cache.RoarCache`；
+        不可缓存的吼叫为 None"""
+        return None
+
 
 class SendPrivateMessage(Roar):
     """发送私聊消息
@@ -54,6 +110,10 @@ class SendPrivateMessage(Roar):
     def __init__(self):
         self['auto_escape'] = False
 
+    @property
+    def target_key(self):
+        return ("user", self.get('user_id'))
+
     def set_auto_escape(self, auto_escape: bool):
         """消息内容是否作为纯文本发送 ( 即不解析 CQ 码 ) ,
         只在 `message` 字段是字符串时有效"""
@@ -101,6 +161,10 @@ class SendGroupMessage(Roar):
     def __init__(self):
         self['auto_escape'] = False
 
+    @property
+    def target_key(self):
+        return ("group", self.get('group_id'))
+
     def set_auto_escape(self, auto_escape: bool):
         """消息内容是否作为纯文本发送 ( 即不解析 CQ 码) ,
         只在 `message` 字段是字符串时有效"""
@@ -138,6 +202,10 @@ class SendGroupForwardMassage(Roar):
     """
     _extend_url = "send_group_forward_msg"
 
+    @property
+    def target_key(self):
+        return ("group", self.get('group_id'))
+
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
         return self
@@ -201,6 +269,7 @@ class GetMessage(Roar):
     | `raw_message`| message  | 原始消息内容 |
     """
     _extend_url = "get_msg"
+    _idempotent = True
 
     def set_message_id(self, message_id: int):
         self['message_id'] = message_id
@@ -224,6 +293,7 @@ class GetForwardMessage(Roar):
     | `messages` | forward message[] | 消息列表 |
     """
     _extend_url = "get_forward_msg"
+    _idempotent = True
 
     def set_message_id(self, message_id: int):
         self['message_id'] = message_id
@@ -249,6 +319,7 @@ class GetImageInfo(Roar):
     | `url`      | string | 图片下载地址   |
     """
     _extend_url = "get_image"
+    _idempotent = True
 
     def set_file(self, file: str):
         """图片缓存文件名"""
@@ -549,6 +620,7 @@ class getLoginInfo(Roar):
     | `nickname` | string | QQ 昵称 |
     """
     _extend_url = "get_login_info"
+    _idempotent = True
 
 
 # TODO: 获取企点账号信息 _extend_url = "qidian_get_account_info"
@@ -573,6 +645,11 @@ class getStrangerInfo(Roar):
     | `qid` | string | qid ID身份卡 |
     """
     _extend_url = "get_stranger_info"
+    _idempotent = True
+
+    @property
+    def cache_tags(self):
+        return (("user", self.get('user_id')),)
 
     def set_user_id(self, user_id: int):
         self['user_id'] = user_id
@@ -598,6 +675,11 @@ class GetFriendList(Roar):
     | `remark` | string | 备注名 |
     """
     _extend_url = "get_friend_list"
+    _idempotent = True
+
+    @property
+    def cache_tags(self):
+        return (("friends",),)
 
 
 class DeleteFriend(Roar):
@@ -646,6 +728,11 @@ class GetGroupInfo(Roar):
     https://p.qlogo.cn/gh/{group_id}/{group_id}/100
     """
     _extend_url = "get_group_info"
+    _idempotent = True
+
+    @property
+    def cache_tags(self):
+        return (("group", self.get('group_id')),)
 
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
@@ -675,6 +762,11 @@ class GetGroupList(Roar):
     | `max_member_count` | int32 | 最大成员数（群容量） |
     """
     _extend_url = "get_group_list"
+    _idempotent = True
+
+    @property
+    def cache_tags(self):
+        return (("groups",),)
 
 
 class GetGroupMembersInfo(Roar):
@@ -709,6 +801,11 @@ class GetGroupMembersInfo(Roar):
     | `card_changeable` | boolean | 是否允许修改群名片 |
     """
     _extend_url = "get_group_member_info"
+    _idempotent = True
+
+    @property
+    def cache_tags(self):
+        return (("group", self.get('group_id')),)
 
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
@@ -757,6 +854,11 @@ class GetGroupMemberList(Roar):
     | `card_changeable` | boolean | 是否允许修改群名片 |
     """
     _extend_url = "get_group_member_list"
+    _idempotent = True
+
+    @property
+    def cache_tags(self):
+        return (("group", self.get('group_id')),)
 
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
@@ -804,6 +906,7 @@ class GetGroupHonorInfo(Roar):
     | `description` | string | 荣誉描述 |
     """
     _extend_url = "get_group_honor_info"
+    _idempotent = True
 
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
@@ -831,6 +934,7 @@ class CheckCanSendImage(Roar):
     | `yes` | boolean | 是或否 |
     """
     _extend_url = "can_send_image"
+    _idempotent = True
 
 
 class CheckCanSendVoiceRecord(Roar):
@@ -843,6 +947,7 @@ class CheckCanSendVoiceRecord(Roar):
     | `yes` | boolean | 是或否 |
     """
     _extend_url = "can_send_record"
+    _idempotent = True
 
 
 class GetVersionInfo(Roar):
@@ -868,6 +973,7 @@ class GetVersionInfo(Roar):
     | `protocol` | int | `0/1/2/3/-1` | 当前登陆使用协议类型 |
     """
     _extend_url = "get_version_info"
+    _idempotent = True
 
 
 class RestartCqhttpServer(Roar):
@@ -951,6 +1057,7 @@ class GetChineseWordSlices(Roar):
 
     """
     _extend_url = ".get_word_slices"
+    _idempotent = True
 
     def set_content(self, content: str):
         """内容"""
@@ -983,6 +1090,7 @@ class OcrImage(Roar):
     | `coordinates` | vector2 | 坐标   |
     """
     _extend_url = "ocr_image"
+    _idempotent = True
 
     def set_image_id(self, image_id: str):
         """图片ID"""
@@ -1030,6 +1138,7 @@ class GetGroupSystemMessage(Roar):
     | `actor`          | int64  | 处理者, 未处理为0 |
     """
     _extend_url = "get_group_system_msg"
+    _idempotent = True
 
 
 class UploadGroupFile(Roar):
@@ -1089,6 +1198,7 @@ class GetGroupFileSystemInfo(Roar):
     | `total_space` | int64 | 空间上限   |
     """
     _extend_url = "get_group_file_system_info"
+    _idempotent = True
 
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
@@ -1138,6 +1248,7 @@ class GetGroupRootFiles(Roar):
     | `total_file_count` | int32  | 子文件数量 |
     """
     _extend_url = "get_group_root_files"
+    _idempotent = True
 
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
@@ -1188,6 +1299,7 @@ class GetGroupFilesByFolder(Roar):
     | `total_file_count` | int32  | 子文件数量 |
     """
     _extend_url = "get_group_files_by_folder"
+    _idempotent = True
 
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
@@ -1243,6 +1355,7 @@ class GetGroupFileUrl(Roar):
     | `total_file_count` | int32  | 子文件数量 |
     """
     _extend_url = "get_group_file_url"
+    _idempotent = True
 
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
@@ -1287,6 +1400,7 @@ class GetStatus(Roar):
     | `lost_times`       | uint32 | 账号掉线次数     |
     """
     _extend_url = "get_status"
+    _idempotent = True
 
 
 class GetGroupAtallRemain(Roar):
@@ -1307,6 +1421,7 @@ class GetGroupAtallRemain(Roar):
     | `remain_at_all_count_for_uin`   | int16      | Bot 当天剩余 @全体成员 次数      |
     """
     _extend_url = "get_group_at_all_remain"
+    _idempotent = True
 
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
@@ -1335,6 +1450,7 @@ class GetVipInfo(Roar):
     | `vip_growth_total` | int64   | 会员成长总值 |
     """
     _extend_url = "_get_vip_info"
+    _idempotent = True
 
     def set_user_id(self, user_id: int):
         self['user_id'] = user_id
@@ -1461,6 +1577,7 @@ class GetOnlineClient(Roar):
     | `device_kind`    | string       |  设备类型 |
     """
     _extend_url = "get_online_clients"
+    _idempotent = True
 
     def set_no_cache(self, no_cache: bool):
         """是否无视缓存"""
@@ -1486,6 +1603,7 @@ class GetGroupMsgHistory(Roar):
     | `messages`    | []Message       |  从起始序号开始的前19条消息  |
     """
     _extend_url = "get_group_msg_history"
+    _idempotent = True
 
     def set_message_seq(self, message_seq: int):
         """ 起始消息序号, 可通过 `get_msg` 获得"""
@@ -1553,6 +1671,7 @@ class GetEssenceMessageList(Roar):
     | `message_id`    | int32    | 消息ID       |
     """
     _extend_url = "get_essence_msg_list"
+    _idempotent = True
 
     def set_group_id(self, group_id: int):
         self['group_id'] = group_id
@@ -1575,6 +1694,7 @@ class CheckUrlSafely(Roar):
     | `level`    | int       |  安全等级： 1安全 2未知 3危险  |
     """
     _extend_url = "check_url_safely"
+    _idempotent = True
 
     def set_url(self, url: str):
         self['url'] = url
@@ -1604,6 +1724,7 @@ class GetModelShow(Roar):
     | `need_pay` | boolean | 是否需要付费使用 |
     """
     _extend_url = "_get_model_show"
+    _idempotent = True
 
     def set_model(self, model: str):
         self['model'] = model
@@ -0,0 +1,207 @@
+# -*- coding=utf-8 -*-
+"""
+roar_cache.py
+
+  查询类吼叫的结果缓存。
+
+  群信息、群成员列表、好友列表等查询 (`Roar.cache_tags` 不为 None 的吼叫) 的结果
+  会以 (API, 参数) 为键缓存一段时间 (TTL)，缓存数量超过上限时淘汰最久未使用的结果 (LRU)。
+
+  缓存的结果依赖于群、用户等对象 (`Roar.cache_tags`)，大脑听到群名片变更、
+  群成员增减、群管理员变动、好友添加等提醒时，相关的缓存会被立即清除。
+
+Expect usage::
+
+    cache = RoarCache(ttl=60, max_entries=1024)
+    mouth = BearMouth("127.0.0.1", 5700, cache=cache)
+
+    mouth.speak(GetGroupMemberList().set_group_id(123))                  # 发出请求
+    mouth.speak(GetGroupMemberList().set_group_id(123))                  # 命中缓存
+    mouth.speak(GetGroupMemberList().set_group_id(123), no_cache=True)   # 跳过缓存
+
+    cache.invalidate(("group", 123))
+    cache.stats  # {'entries': 0, 'hits': 1, 'misses': 1, 'evictions': 0, 'invalidations': 1}
+"""
+
+import collections
+import json
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+from cqbear.roar import Roar
+from cqbear.sound import (
+    FriendAddNotice, GroupAdminNotice, GroupCardNotice,
+    GroupDecreaseNotice, GroupIncreaseNotice, RawSound, Sound
+)
+
+# notices heard by `RoarCache.hear`
+_HEARD = (GroupCardNotice, GroupAdminNotice, GroupIncreaseNotice,
+          GroupDecreaseNotice, FriendAddNotice)
+
+
+def _id(value):
+    # ids come as int from go-cqhttp but are often set as str on roars
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return value
+
+
+def _tag(*parts) -> tuple:
+    return tuple(_id(part) for part in parts)
+
+
+def roar_key(roar: Roar, exclude: Tuple[str, ...] = ()) -> Optional[Hashable]:
+    """由 API 与参数组成的吼叫键，相同的键调用 go-cqhttp 会得到相同的结果，
+    参数不可哈希时返回 None
+    """
+    params = tuple(sorted(
+        (name, _id(value)) for name, value in roar.speak_data.items()
+        if name not in exclude))
+    key = (roar.extend_url, params)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class RoarCache:
+    """查询类吼叫的 TTL + LRU 缓存
+
+    - ttl: 结果的缓存时间(秒)
+    - max_entries: 最多缓存多少个结果
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 1024):
+        if ttl <= 0 or max_entries <= 0:
+            raise ValueError(
+                "RoarCache ttl and max_entries must greater than 0")
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.__lock = threading.Lock()
+        # key -> (expires at, result, tags), in LRU order
+        self.__entries: "collections.OrderedDict[Hashable, tuple]" = \
+            collections.OrderedDict()
+        self.__tagged: Dict[tuple, Set[Hashable]] = {}
+        # tag -> times it has been invalidated, lets a call that started
+        # before an invalidation tell that its result is stale
+        self.__generations: Dict[tuple, int] = {}
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__invalidations = 0
+
+    @property
+    def stats(self) -> dict:
+        """缓存数量、命中、未命中、因容量淘汰以及因提醒清除的次数"""
+        with self.__lock:
+            return {
+                "entries": len(self.__entries),
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "evictions": self.__evictions,
+                "invalidations": self.__invalidations,
+            }
+
+    def key_of(self, roar: Roar) -> Optional[Hashable]:
+        """吼叫的缓存键，不可缓存的吼叫返回 None
+
+        要求 go-cqhttp 不使用缓存 (`no_cache` 参数为 True) 的吼叫同样不使用此缓存
+        """
+        if roar.cache_tags is None or roar.delivery != Roar.SYNC \
+                or roar.get("no_cache"):
+            return None
+        return roar_key(roar, exclude=("no_cache",))
+
+    def generation(self, roar: Roar) -> tuple:
+        """吼叫依赖的各对象被清除缓存的次数
+
+        在调用 go-cqhttp 之前记录，传给 `put`：调用期间依赖的对象被清除过缓存时，
+        调用结果可能是变化之前的，不会被缓存
+        """
+        if not roar.cache_tags:
+            return ()
+        generations = self.__generations
+        return tuple(generations.get(_tag(*tag), 0) for tag in roar.cache_tags)
+
+    def get(self, key: Hashable) -> Optional[Tuple[int, Any]]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self.__drop(key)
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            result = entry[1]
+        # results came from json, a json round trip is a cheap deep copy
+        # that keeps callers from mutating the cached result
+        code, data = json.loads(result)
+        return code, data
+
+    def put(self, key: Hashable, roar: Roar, result: Tuple[int, Any],
+            generation: Optional[tuple] = None):
+        """缓存吼叫的结果
+
+        - generation: 调用 go-cqhttp 之前的 `generation(roar)`，之后吼叫依赖的对象
+            被清除过缓存时不缓存这个结果
+        """
+        tags = tuple(_tag(*tag) for tag in roar.cache_tags)
+        data = json.dumps(result)
+        with self.__lock:
+            if generation is not None and generation != tuple(
+                    self.__generations.get(tag, 0) for tag in tags):
+                return
+            if key in self.__entries:
+                self.__drop(key)
+            self.__entries[key] = (time.monotonic() + self.ttl, data, tags)
+            for tag in tags:
+                self.__tagged.setdefault(tag, set()).add(key)
+            while len(self.__entries) > self.max_entries:
+                self.__drop(next(iter(self.__entries)))
+                self.__evictions += 1
+
+    def __drop(self, key: Hashable):
+        _, _, tags = self.__entries.pop(key)
+        for tag in tags:
+            keys = self.__tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__tagged[tag]
+
+    def invalidate(self, *tags: tuple):
+        """清除依赖于指定对象的缓存，例如 `invalidate(("group", 123))`"""
+        with self.__lock:
+            for tag in tags:
+                tag = _tag(*tag)
+                self.__generations[tag] = self.__generations.get(tag, 0) + 1
+                for key in list(self.__tagged.get(tag, ())):
+                    self.__drop(key)
+                    self.__invalidations += 1
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__tagged.clear()
+
+    def wants(self, sound_type: type, raw: RawSound) -> bool:
+        """尚未解码的声音是否会清除缓存"""
+        return issubclass(sound_type, _HEARD)
+
+    def hear(self, sound: Sound):
+        """根据提醒清除相关的缓存，由大脑在执行反应之前调用"""
+        if isinstance(sound, (GroupCardNotice, GroupAdminNotice)):
+            self.invalidate(("group", sound.group_id))
+        elif isinstance(sound, (GroupIncreaseNotice, GroupDecreaseNotice)):
+            self.invalidate(("group", sound.group_id))
+            if sound.user_id == sound.get("self_id"):
+                self.invalidate(("groups",))
+        elif isinstance(sound, FriendAddNotice):
+            self.invalidate(("friends",), ("user", sound.user_id))
@@ -0,0 +1,535 @@
+# -*- coding=utf-8 -*-
+"""
+roster.py
+
+  群成员名单。
+
+  `RosterLoader` 并发拉取所有群的成员列表：
+
+  - 同时最多拉取 `concurrency` 个群，不会一次向 go-cqhttp 发出几百个请求
+  - 每个群拉取完成后立即产出，调用者不需要等待所有群都拉取完成
+  - 随时可以查询进度 (`progress`)，也可以设置进度回调
+  - 再次加载时只重新拉取成员数量 (`member_count`) 发生变化的群，
+      没有变化的群沿用上一次的成员列表
+
+  `Roster` 是内存中的名单索引 (群→成员、用户→群、成员的角色与名片)，
+  加载成员列表后根据群成员增减、管理员变动、名片变更的提醒以及群消息的 `sender`
+  增量更新，查询不需要调用 go-cqhttp。
+
+  成员以 `Member` 保存：使用 `__slots__`，昵称、名片、头衔等字符串被驻留 (intern)，
+  同一个用户在多个群中的昵称只保存一份，内存占用约为 json 字典的几分之一，
+  同时保留了字典式的访问 (`member["card"]`、`member.get("role")`)。
+
+Expect usage::
+
+    loader = RosterLoader(mouth.speak_nowait, concurrency=8)
+
+    for group, members in loader.load():
+        print(group["group_id"], len(members), loader.progress)
+
+    loader.groups     # [{'group_id': 123, ..., 'member_list': [Member, ...]}, ...]
+    loader.to_list()  # 同上，成员为字典，可以 json.dumps
+    loader.load()     # 只拉取成员数量变化了的群
+
+    roster = Roster()
+    loader = RosterLoader(mouth.speak_nowait, roster=roster)
+    brain.add_instinct(Notice, roster.hear, roster.wants)
+    brain.add_instinct(GroupMessage, roster.hear, roster.wants)
+
+    roster.is_admin(123, 10001)   # -> bool
+    roster.groups_of(10001)       # -> frozenset({123, 456})
+"""
+
+import collections.abc
+import logging
+import sys
+import threading
+from concurrent import futures
+from typing import (
+    Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+)
+
+from cqbear.roar import GetGroupList, GetGroupMemberList, Roar
+from cqbear.sound import (
+    AnonymousGroupMessage, GroupCardNotice, GroupDecreaseNotice, GroupIncreaseNotice, GroupMessage,
+    KickMeGroupDecreaseNotice, RawSound, SetGroupAdminNotice, Sound,
+    UnsetGroupAdminNotice
+)
+
+logger = logging.getLogger(__name__)
+
+_intern = sys.intern
+
+# sounds heard by `Roster.hear`
+_HEARD = (GroupMessage, GroupIncreaseNotice, GroupDecreaseNotice,
+          SetGroupAdminNotice, UnsetGroupAdminNotice, GroupCardNotice)
+
+
+class Member(collections.abc.Mapping):
+    """群成员信息，字段与 `GetGroupMemberList` 响应中的成员相同
+
+    可以像字典一样访问 (`member["card"]`、`member.get("role")`、`dict(member)`)，
+    也可以作为属性访问 (`member.card`)。值为 None 的字段视为不存在。
+    """
+
+    FIELDS = (
+        "group_id", "user_id", "nickname", "card", "sex", "age", "area",
+        "join_time", "last_sent_time", "level", "role", "unfriendly",
+        "title", "title_expire_time", "card_changeable", "shut_up_timestamp",
+    )
+    _FIELD_SET = frozenset(FIELDS)
+    # repeated across members and groups, kept once in memory
+    _INTERNED = frozenset((
+        "nickname", "card", "sex", "area", "level", "role", "title",
+    ))
+
+    __slots__ = FIELDS + ("_extra",)
+
+    def __init__(self, data: Optional[dict] = None, **fields):
+        if fields:
+            data = dict(data, **fields) if data else fields
+        elif data is None:
+            data = {}
+        get = data.get
+        interned = self._INTERNED
+        known = 0
+        # members are built by the thousand, set the slots directly
+        for name in self.FIELDS:
+            value = get(name)
+            if value is not None:
+                known += 1
+                if type(value) is str and name in interned:
+                    value = _intern(value)
+            object.__setattr__(self, name, value)
+        self._extra: Optional[Dict[str, Any]] = None
+        if known < len(data):
+            self._extra = {name: value for name, value in data.items()
+                           if name not in self._FIELD_SET} or None
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self._FIELD_SET:
+            value = getattr(self, name)
+        elif self._extra is not None:
+            value = self._extra.get(name)
+        else:
+            value = None
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name: str, value: Any):
+        if name in self._FIELD_SET:
+            if name in self._INTERNED and type(value) is str:
+                value = _intern(value)
+            object.__setattr__(self, name, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[name] = value
+
+    def __iter__(self):
+        for name in self.FIELDS:
+            if getattr(self, name) is not None:
+                yield name
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, name) -> bool:
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def update(self, data=(), **fields):
+        for name, value in dict(data, **fields).items():
+            self[name] = value
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"Member({self.to_dict()})"
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state: dict):
+        self.__init__(state)
+
+
+# fields of a message sender that describe the member in the group
+_SENDER_FIELDS = ("nickname", "card", "role", "title", "level", "sex", "age",
+                  "area")
+
+
+class Roster:
+    """群成员名单索引
+
+    - self_id: 登录号，省略时使用提醒中的 `self_id`；登录号退群或被踢出群时整个群被移除
+
+    所有查询都只读取内存中的索引，可以在反应中频繁调用
+    """
+
+    OWNER = "owner"
+    ADMIN = "admin"
+    MEMBER = "member"
+
+    def __init__(self, self_id: Optional[int] = None):
+        self.self_id = self_id
+        self.__lock = threading.Lock()
+        # group id -> {user id: member info}
+        self.__members: Dict[int, Dict[int, Member]] = {}
+        # user id -> ids of the groups the user is in
+        self.__groups_of: Dict[int, Set[int]] = {}
+
+    @property
+    def stats(self) -> dict:
+        """索引中的群数量、用户数量与成员数量"""
+        with self.__lock:
+            return {
+                "groups": len(self.__members),
+                "users": len(self.__groups_of),
+                "members": sum(len(members)
+                               for members in self.__members.values()),
+            }
+
+    # queries
+
+    @property
+    def groups(self) -> FrozenSet[int]:
+        with self.__lock:
+            return frozenset(self.__members)
+
+    def has_group(self, group_id: int) -> bool:
+        return int(group_id) in self.__members
+
+    def members_of(self, group_id: int) -> List[Member]:
+        with self.__lock:
+            return list(self.__members.get(int(group_id), {}).values())
+
+    def member(self, group_id: int, user_id: int) -> Optional[Member]:
+        """群成员信息，字段与 `GetGroupMemberList` 的响应相同，不在群中时返回 None"""
+        members = self.__members.get(int(group_id))
+        if members is None:
+            return None
+        return members.get(int(user_id))
+
+    def in_group(self, group_id: int, user_id: int) -> bool:
+        return self.member(group_id, user_id) is not None
+
+    def groups_of(self, user_id: int) -> FrozenSet[int]:
+        """用户所在的 (登录号也在的) 群"""
+        with self.__lock:
+            return frozenset(self.__groups_of.get(int(user_id), ()))
+
+    def role(self, group_id: int, user_id: int) -> Optional[str]:
+        """群成员的角色，`owner` / `admin` / `member`，不在群中时返回 None"""
+        member = self.member(group_id, user_id)
+        return member.get("role") if member is not None else None
+
+    def card(self, group_id: int, user_id: int) -> Optional[str]:
+        """群名片，没有设置名片时为空字符串，不在群中时返回 None"""
+        member = self.member(group_id, user_id)
+        return member.get("card") if member is not None else None
+
+    def is_owner(self, group_id: int, user_id: int) -> bool:
+        return self.role(group_id, user_id) == self.OWNER
+
+    def is_admin(self, group_id: int, user_id: int) -> bool:
+        """是否为群管理员，群主也是管理员"""
+        return self.role(group_id, user_id) in (self.OWNER, self.ADMIN)
+
+    # updates
+
+    def load_group(self, group_id: int, members: List[Member]):
+        """用拉取的成员列表替换群的成员，字典会被转换为 `Member`"""
+        group_id = int(group_id)
+        with self.__lock:
+            self.__drop_group(group_id)
+            group = self.__members[group_id] = {}
+            for member in members:
+                user_id = int(member.get("user_id", 0))
+                if user_id:
+                    if not isinstance(member, Member):
+                        member = Member(member)
+                    group[user_id] = member
+                    self.__groups_of.setdefault(user_id, set()).add(group_id)
+
+    def drop_group(self, group_id: int):
+        with self.__lock:
+            self.__drop_group(int(group_id))
+
+    def __drop_group(self, group_id: int):
+        for user_id in self.__members.pop(group_id, ()):
+            self.__unlink(group_id, user_id)
+
+    def __unlink(self, group_id: int, user_id: int):
+        groups = self.__groups_of.get(user_id)
+        if groups is not None:
+            groups.discard(group_id)
+            if not groups:
+                del self.__groups_of[user_id]
+
+    def add_member(self, group_id: int, user_id: int, create: bool = True,
+                   **info) -> Optional[Member]:
+        """加入或更新群成员
+
+        - create: 为 False 时只更新已加载的群，群未加载 (或刚被移除) 时返回 None，
+            不会创建只有部分成员的群
+        """
+        group_id, user_id = int(group_id), int(user_id)
+        with self.__lock:
+            group = self.__members.get(group_id)
+            if group is None:
+                if not create:
+                    return None
+                group = self.__members[group_id] = {}
+            member = group.get(user_id)
+            if member is None:
+                member = group[user_id] = Member(
+                    group_id=group_id, user_id=user_id,
+                    nickname="", card="", role=self.MEMBER)
+                self.__groups_of.setdefault(user_id, set()).add(group_id)
+            member.update(info)
+            return member
+
+    def remove_member(self, group_id: int, user_id: int):
+        group_id, user_id = int(group_id), int(user_id)
+        with self.__lock:
+            group = self.__members.get(group_id)
+            if group is not None and group.pop(user_id, None) is not None:
+                self.__unlink(group_id, user_id)
+
+    def update_member(self, group_id: int, user_id: int, **info):
+        """更新已知群中成员的信息，未加载的群不会被加入索引"""
+        self.add_member(group_id, user_id, create=False, **info)
+
+    def wants(self, sound_type: type, raw: RawSound) -> bool:
+        """尚未解码的声音是否可能改变索引
+
+        未加载的群中的声音不会；群消息只有在发送者不在索引中，或 `sender` 中的名片、
+        角色等与索引中的不同时才会。`sender` 的字段直接从原始内容中查找，
+        群消息中只有 `sender` 带有这些字段，不需要解码
+        """
+        if not issubclass(sound_type, _HEARD) or \
+                issubclass(sound_type, AnonymousGroupMessage):
+            return False
+        group_id = raw.get("group_id")
+        if group_id is None:
+            return True
+        if not issubclass(sound_type, GroupMessage):
+            return self.has_group(group_id)
+        members = self.__members.get(int(group_id))
+        if members is None:
+            return False
+        user_id = raw.get("user_id")
+        member = members.get(user_id) if isinstance(user_id, int) else None
+        if member is None:
+            return True
+        for field in _SENDER_FIELDS:
+            value = raw.get(field)
+            if value is None or value == "" and field != "card":
+                continue  # `hear` keeps the indexed value as well
+            if member.get(field) != value:
+                return True
+        return False
+
+    def hear(self, sound: Sound):
+        """根据提醒与群消息更新索引，由大脑在执行反应之前调用"""
+        if isinstance(sound, GroupMessage):
+            if sound.get("anonymous") or not sound.user_id:
+                return
+            sender = sound.sender
+            info = {field: sender[field] for field in _SENDER_FIELDS
+                    if sender.get(field) not in (None, "")}
+            if "card" in sender:
+                info["card"] = sender["card"]
+            self.update_member(sound.group_id, sound.user_id, **info)
+        elif isinstance(sound, GroupIncreaseNotice):
+            self.update_member(sound.group_id, sound.user_id)
+        elif isinstance(sound, GroupDecreaseNotice):
+            self_id = self.self_id or sound.get("self_id")
+            if isinstance(sound, KickMeGroupDecreaseNotice) or \
+                    sound.user_id == self_id:
+                self.drop_group(sound.group_id)
+            else:
+                self.remove_member(sound.group_id, sound.user_id)
+        elif isinstance(sound, SetGroupAdminNotice):
+            self.update_member(sound.group_id, sound.user_id, role=self.ADMIN)
+        elif isinstance(sound, UnsetGroupAdminNotice):
+            self.update_member(sound.group_id, sound.user_id,
+                               role=self.MEMBER)
+        elif isinstance(sound, GroupCardNotice):
+            self.update_member(sound.group_id, sound.user_id,
+                               card=sound.card_new or "")
+
+
+def _group_dict(group: dict) -> dict:
+    group = dict(group)
+    members = group.get("member_list")
+    if members is not None:
+        group["member_list"] = [member.to_dict() for member in members]
+    return group
+
+
+class RosterLoader:
+    """并发、增量地拉取群成员列表
+
+    - speak_nowait: 发出吼叫并立即返回 `Future` 的函数，参考 `BearMouth.speak_nowait`
+    - concurrency: 同时拉取成员列表的群数量
+    - on_progress: 每个群拉取完成 (或失败) 后调用的回调，参数为 `progress`
+    - roster: 拉取的成员列表同时载入的名单索引
+    """
+
+    def __init__(self, speak_nowait: Callable[..., futures.Future],
+                 concurrency: int = 8,
+                 on_progress: Optional[Callable[[dict], None]] = None,
+                 roster: Optional[Roster] = None):
+        if concurrency < 1:
+            raise ValueError("RosterLoader concurrency must at least 1")
+        self.__speak_nowait = speak_nowait
+        self.concurrency = concurrency
+        self.on_progress = on_progress
+        self.roster = roster
+
+        self.__lock = threading.Lock()
+        # group id -> group info with its 'member_list'
+        self.__groups: Dict[int, dict] = {}
+        # group id -> member count when its member list was pulled
+        self.__member_counts: Dict[int, int] = {}
+
+        self.__total = 0
+        self.__done = 0
+        self.__failed = 0
+        self.__skipped = 0
+
+    @property
+    def progress(self) -> dict:
+        """本次加载需要拉取的群数量、已完成、失败以及因成员数量未变化而跳过的群数量"""
+        with self.__lock:
+            return self.__progress()
+
+    def __progress(self) -> dict:
+        return {
+            "total": self.__total,
+            "done": self.__done,
+            "failed": self.__failed,
+            "skipped": self.__skipped,
+        }
+
+    @property
+    def groups(self) -> List[dict]:
+        """上一次加载得到的群列表，每个群的 `member_list` 为 `Member` 列表"""
+        with self.__lock:
+            return list(self.__groups.values())
+
+    def to_list(self) -> List[dict]:
+        """上一次加载得到的群列表的副本，`member_list` 中的成员转为字典，可以直接 `json.dumps`"""
+        with self.__lock:
+            groups = list(self.__groups.values())
+        return [_group_dict(group) for group in groups]
+
+    def members_of(self, group_id: int) -> Optional[list]:
+        with self.__lock:
+            group = self.__groups.get(int(group_id))
+        return group.get("member_list") if group is not None else None
+
+    def __speak(self, roar: Roar) -> futures.Future:
+        # the roster always wants go-cqhttp's current lists
+        return self.__speak_nowait(roar, no_cache=True)
+
+    def load(self, force: bool = False) -> Iterator[Tuple[dict, Optional[list]]]:
+        """加载群列表并拉取成员列表，每个群拉取完成后产出 (群信息, 成员列表)
+
+        返回的迭代器被迭代时才会拉取成员列表；只会产出需要重新拉取的群，
+        拉取失败的群成员列表为 None (`groups` 中保留上一次的成员列表)，下次加载时重试
+
+        - force: 为 True 时重新拉取所有群的成员列表
+        """
+        _, groups = self.__speak(GetGroupList()).result()
+        if not isinstance(groups, list):
+            raise RuntimeError(f"get_group_list failed: {groups}")
+
+        pending = []
+        with self.__lock:
+            known = self.__groups
+            self.__groups = {}
+            for group in groups:
+                group_id = int(group.get("group_id", 0))
+                if not group_id:
+                    continue
+                old = known.get(group_id)
+                if not force and old is not None and \
+                        self.__member_counts.get(group_id) == \
+                        group.get("member_count"):
+                    group["member_list"] = old.get("member_list")
+                else:
+                    group["member_list"] = old.get("member_list") \
+                        if old is not None else None
+                    pending.append(group)
+                self.__groups[group_id] = group
+            left = set(known) - set(self.__groups)
+            for group_id in set(self.__member_counts) - set(self.__groups):
+                del self.__member_counts[group_id]
+            self.__total = len(pending)
+            self.__done = self.__failed = 0
+            self.__skipped = len(self.__groups) - len(pending)
+
+        if self.roster is not None:
+            for group_id in left:
+                self.roster.drop_group(group_id)
+        return self.__pull(pending)
+
+    def __pull(self, pending: List[dict]) -> Iterator[
+        Tuple[dict, Optional[list]]
+    ]:
+        pending = list(reversed(pending))
+        running: Dict[futures.Future, dict] = {}
+        try:
+            while pending or running:
+                while pending and len(running) < self.concurrency:
+                    group = pending.pop()
+                    roar = GetGroupMemberList().set_group_id(group["group_id"])
+                    running[self.__speak(roar)] = group
+                done, _ = futures.wait(
+                    running, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    group = running.pop(future)
+                    yield group, self.__pulled(group, future)
+        finally:
+            for future in running:
+                future.cancel()
+
+    def __pulled(self, group: dict, future: futures.Future) -> Optional[list]:
+        group_id = int(group["group_id"])
+        members = None
+        try:
+            code, data = future.result()
+            if code == 0 and isinstance(data, list):
+                members = [Member(member) for member in data]
+            else:
+                logger.warning(
+                    f"get member list of group {group_id} failed: {data}")
+        except Exception:
+            logger.exception(f"get member list of group {group_id} failed")
+
+        with self.__lock:
+            if members is not None:
+                group["member_list"] = members
+                self.__member_counts[group_id] = group.get("member_count")
+                self.__done += 1
+            else:
+                self.__failed += 1
+            progress = self.__progress()
+        if members is not None and self.roster is not None:
+            self.roster.load_group(group_id, members)
+        if self.on_progress is not None:
+            try:
+                self.on_progress(progress)
+            except Exception:
+                logger.exception("roster progress callback failed")
+        return members
@@ -0,0 +1,230 @@
+# -*- coding=utf-8 -*-
+"""
+server.py
+
+  基于 asyncio 的轻量 HTTP/1.1 服务端，用于接收 go-cqhttp 上报的事件。
+
+  只实现了 go-cqhttp HTTP POST 上报所需的最小子集：
+
+  - `POST` 请求，请求体长度由 `Content-Length` 指定
+  - HTTP/1.1 keep-alive (go-cqhttp 会复用同一条连接持续上报)
+
+Expect usage::
+
+    def on_post(body: bytes) -> str:
+        ...
+        return "OK"
+
+    server = SoundServer("127.0.0.1", 5701, on_post)
+    threading.Thread(target=server.serve_forever).start()
+    ...
+    server.shutdown()
+"""
+
+import asyncio
+import inspect
+import json
+import threading
+from typing import Awaitable, Callable, Optional, Union
+
+
+class SoundServerException(Exception):
+    pass
+
+
+class SoundServer:
+    """asyncio HTTP 服务端
+
+    - on_post: 处理 POST 请求体的回调，返回值作为响应体
+        (`str`/`bytes` 原样返回，`dict`/`list` 以 json 返回)，
+        返回 awaitable 时等待其结果作为响应体，等待期间不会阻塞其他连接
+    """
+
+    REASON = {
+        200: b"OK",
+        400: b"Bad Request",
+        405: b"Method Not Allowed",
+        411: b"Length Required",
+        413: b"Payload Too Large",
+        500: b"Internal Server Error",
+    }
+
+    def __init__(self, addr: str, port: int,
+                 on_post: Callable[[bytes], Union[str, bytes, dict, None,
+                                                  Awaitable]],
+                 max_body: int = 16 * 1024 * 1024):
+        self.addr = addr
+        self.port = port
+        self.max_body = max_body
+
+        self.__on_post = on_post
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__stop: Optional[asyncio.Future] = None
+        self.__ready = threading.Event()
+        self.__error: Optional[BaseException] = None
+        self.__writers = set()
+
+    @property
+    def is_serving(self) -> bool:
+        return self.__ready.is_set() and self.__error is None
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待服务端开始监听，监听失败时抛出对应的异常"""
+        self.__ready.wait(timeout)
+        if self.__error is not None:
+            raise self.__error
+        return self.__ready.is_set()
+
+    def serve_forever(self):
+        """阻塞运行服务端，直到 `shutdown` 被调用"""
+        if self.__loop is not None:
+            raise SoundServerException(f"SoundServer<{self}> is already serving")
+
+        self.__error = None
+        self.__ready.clear()
+        loop = asyncio.new_event_loop()
+        self.__loop = loop
+        try:
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.__serve())
+        except BaseException as e:
+            self.__error = e
+            self.__ready.set()
+            raise
+        finally:
+            loop.close()
+            self.__loop = None
+
+    def shutdown(self):
+        """停止服务端，可在任意线程中调用"""
+        loop = self.__loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self.__set_stop)
+        except RuntimeError:
+            # loop already closed between the check and the call
+            pass
+
+    def __set_stop(self):
+        if self.__stop is not None and not self.__stop.done():
+            self.__stop.set_result(None)
+
+    async def __serve(self):
+        self.__stop = asyncio.get_running_loop().create_future()
+        server = await asyncio.start_server(
+            self.__handle, host=self.addr, port=self.port,
+            reuse_address=True)
+        self.__ready.set()
+        try:
+            await self.__stop
+        finally:
+            server.close()
+            await server.wait_closed()
+            # close the keep-alive connections still waiting for requests
+            for writer in list(self.__writers):
+                writer.close()
+            handlers = [task for task in asyncio.all_tasks()
+                        if task is not asyncio.current_task()]
+            if handlers:
+                _, pending = await asyncio.wait(handlers, timeout=1)
+                for task in pending:
+                    task.cancel()
+
+    async def __handle(self, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter):
+        self.__writers.add(writer)
+        try:
+            while True:
+                keep_alive = await self.__handle_one(reader, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError):
+            pass
+        finally:
+            self.__writers.discard(writer)
+            writer.close()
+
+    async def __handle_one(self, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> bool:
+        """处理一个请求，返回连接是否需要保持"""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise
+            return False  # client closed the idle connection
+
+        lines = head.split(b"\r\n")
+        try:
+            method, _, version = lines[0].split(b" ", 2)
+        except ValueError:
+            await self.__respond(writer, 400, b"", False)
+            return False
+
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get(b"connection", b"").lower()
+        if version == b"HTTP/1.1":
+            keep_alive = connection != b"close"
+        else:
+            keep_alive = connection == b"keep-alive"
+
+        if b"content-length" not in headers:
+            if b"transfer-encoding" in headers:
+                await self.__respond(writer, 411, b"", False)
+                return False
+            length = 0
+        else:
+            try:
+                length = int(headers[b"content-length"])
+            except ValueError:
+                await self.__respond(writer, 400, b"", False)
+                return False
+        if length < 0 or length > self.max_body:
+            await self.__respond(writer, 413, b"", False)
+            return False
+        body = await reader.readexactly(length) if length else b""
+
+        if method != b"POST":
+            await self.__respond(writer, 405, b"", keep_alive)
+            return keep_alive
+
+        try:
+            ret = self.__on_post(body)
+            if inspect.isawaitable(ret):
+                ret = await ret
+        except Exception:
+            await self.__respond(writer, 500, b"", keep_alive)
+            return keep_alive
+
+        await self.__respond(writer, 200, ret, keep_alive)
+        return keep_alive
+
+    async def __respond(self, writer: asyncio.StreamWriter, status: int,
+                        body, keep_alive: bool):
+        content_type = b"text/plain; charset=utf-8"
+        if body is None:
+            body = b""
+        elif isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+            content_type = b"application/json"
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+
+        writer.write(b"".join((
+            b"HTTP/1.1 %d %s\r\n" % (status, self.REASON.get(status, b"")),
+            b"Content-Type: %s\r\n" % content_type,
+            b"Content-Length: %d\r\n" % len(body),
+            b"Connection: keep-alive\r\n" if keep_alive
+            else b"Connection: close\r\n",
+            b"\r\n",
+            body,
+        )))
+        await writer.drain()
@@ -1,9 +1,10 @@
 # -*- coding=utf-8 -*-
 """
-go-cqhttp 将事件分成了三种类型：
+go-cqhttp 将事件分成了四种类型：
 - 消息
 - 提醒
 - 请求
+- 元事件
 
 CqBear 将这些事件（event）称作 Sound ，比做 bear 听到的声音。
 每个 Sound 都可能包括三个 type 用于标记和存储 go-cqhttp 上报的事件类型。
@@ -20,20 +21,173 @@ TODO:
 - [x] 添加注释
 """
 
-import sys
-from typing import List, Optional
+import collections.abc
+import re
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 from cqbear.util import allSubclasses
 
 
-class Sound(dict):
-    """消息事件基类"""
+class Field(object):
+    """声音中的字段
+
+    在类中声明 `group_id: int = Field("群号")`，相当于返回 `self.get("group_id")`
+    的只读属性，key 省略时与属性名相同
+    """
+
+    def __init__(self, doc: Optional[str] = None, key: Optional[str] = None):
+        self.__doc__ = doc
+        self.key = key
+
+    def __set_name__(self, owner: type, name: str):
+        key = self.key or name
+        if key in getattr(owner, "HOT_FIELDS", ()):
+            # hot fields already sit in a slot of the sound
+            get = attrgetter(f"_{key}")
+        else:
+            def get(data: dict):
+                return data.get(key)
+
+            # a plain property over a closure reads the key with the least
+            # overhead
+            get.__name__ = name
+        setattr(owner, name, property(get, doc=self.__doc__))
+
+
+# (FIRST_TYPE, SECOND_TYPE, THIRD_TYPE) -> sound class, filled in when the
+# classes are defined
+_sound_types: Dict[tuple, type] = {}
+# post_type -> key of its second level type, e.g. "message" -> "message_type"
+_type_keys: Dict[str, str] = {}
+# (post_type, xxx_type, sub_type) of heard events -> sound class, including
+# the fallbacks of unknown types
+_understood: Dict[tuple, type] = {}
+# unknown types come from go-cqhttp, bound them in case of a malformed flood
+_MAX_UNDERSTOOD = 4096
+
+
+def _understand(key: tuple) -> type:
+    first_type, second_type, _ = key
+    cls = _sound_types.get(key) \
+        or _sound_types.get((first_type, second_type, None)) \
+        or _sound_types.get((first_type, None, None)) \
+        or Sound
+    if len(_understood) < _MAX_UNDERSTOOD:
+        _understood[key] = cls
+    return cls
+
+
+class Sound(collections.abc.MutableMapping):
+    """消息事件基类
+
+    声音是上报事件的视图，可以像字典一样访问和修改 (`sound["group_id"]`、`sound.get("user_id")`、
+    `sound.pop("font")`、`dict(sound)`)，修改会直接作用在上报的数据上。上报的数据不会被复制，
+    `HOT_FIELDS` 中的常用字段在创建时被读取到 `__slots__` 中 (通过声音修改时同步更新)，
+    `sender`、`anonymous` 等其余字段在第一次访问时才被包装。
+
+    子类需要声明 `__slots__`，缓存包装对象的属性也要写在其中。
+    """
     FIRST_TYPE = None
     SECOND_TYPE = None
     THIRD_TYPE = None
+    # key of SECOND_TYPE in the event, "<FIRST_TYPE>_type" by default
+    SECOND_TYPE_KEY = None
+
+    HOT_FIELDS = ("post_type", "message_type", "group_id", "user_id",
+                  "message_id", "raw_message")
+
+    # `_quick` is the future of the quick operation answered in the event
+    # POST response, set by `BearEar` when quick operations are enabled
+    __slots__ = ("_data", "_quick") + tuple(f"_{f}" for f in HOT_FIELDS)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not any(tp in cls.__dict__
+                   for tp in ("FIRST_TYPE", "SECOND_TYPE", "THIRD_TYPE")):
+            return  # same type as the parent, e.g. a helper subclass
+        _sound_types[(cls.FIRST_TYPE, cls.SECOND_TYPE, cls.THIRD_TYPE)] = cls
+        if cls.FIRST_TYPE is not None:
+            _type_keys[cls.FIRST_TYPE] = \
+                cls.SECOND_TYPE_KEY or f"{cls.FIRST_TYPE}_type"
+        _understood.clear()
 
     def __init__(self, data: dict):
-        super(Sound, self).__init__(data)
+        self._data = data
+        self._quick = None
+        get = data.get
+        self._post_type = get("post_type")
+        self._message_type = get("message_type")
+        self._group_id = get("group_id")
+        self._user_id = get("user_id")
+        self._message_id = get("message_id")
+        self._raw_message = get("raw_message")
+
+    def __reduce__(self):
+        # the quick operation future only lives in the process that heard it,
+        # and the wrappers are rebuilt on demand
+        return self.__class__, (self._data,)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    # mapping adapter over the event data, `MutableMapping` fills in pop,
+    # popitem, setdefault, update and clear on top of these
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __setitem__(self, key: str, value: Any):
+        self._data[key] = value
+        if key in self.HOT_FIELDS:
+            setattr(self, f"_{key}", value)
+
+    def __delitem__(self, key: str):
+        del self._data[key]
+        if key in self.HOT_FIELDS:
+            setattr(self, f"_{key}", None)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Sound):
+            other = other._data
+        return self._data == other
+
+    __hash__ = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def keys(self):
+        return self._data.keys()
+
+    def items(self):
+        return self._data.items()
+
+    def values(self):
+        return self._data.values()
+
+    def copy(self) -> dict:
+        return self._data.copy()
+
+    def to_dict(self) -> dict:
+        """上报数据的浅拷贝，可以直接 `json.dumps`"""
+        return self._data.copy()
+
+    @property
+    def raw(self) -> dict:
+        """上报的数据本身 (不复制)，修改会作用在声音上"""
+        return self._data
+
+    post_type: str = Field("上报类型")
 
     @property
     def type_short(self):
@@ -42,49 +196,41 @@ class Sound(dict):
             t = t + f".{str(tp)}" if tp is not None else ""
         return t
 
+    time: int = Field()
+
     @property
-    def time(self) -> int:
-        return self.get(sys._getframe().f_code.co_name)
+    def conversation_key(self) -> Optional[tuple]:
+        """声音所属的会话
+
+        群内的声音为 `("group", group_id)`，其余与用户相关的声音为 `("user", user_id)`，
+        与会话无关的声音为 None。同一会话中的声音会按到达顺序被处理。"""
+        group_id = self.get("group_id")
+        if group_id:
+            return ("group", group_id)
+        user_id = self.get("user_id")
+        if user_id:
+            return ("user", user_id)
+        return None
+
 
 
 class Message(Sound):
+    __slots__ = ()
     FIRST_TYPE = "message"
 
-    def __init__(self, data: dict):
-        super(Message, self).__init__(data)
-
-    @property
-    def message_id(self) -> int:
-        """消息 ID"""
-        return self.get(sys._getframe().f_code.co_name)
+    message_type: str = Field("消息类型, `private` 或 `group`")
+    message_id: int = Field("消息 ID")
 
 
 class PrivateMessageSender(dict):
     """发送人信息"""
-    def __init__(self, data: dict):
-        super(PrivateMessageSender, self).__init__(data)
-
-    @property
-    def user_id(self) -> int:
-        """发送者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def nickname(self) -> str:
-        """昵称"""
-        return self.get(sys._getframe().f_code.co_name)
 
-    @property
-    def sex(self) -> str:
-        """
+    user_id: int = Field("发送者 QQ 号")
+    nickname: str = Field("昵称")
+    sex: str = Field("""
         性别, `male` 或 `female` 或 `unknown`
-        """
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def age(self) -> int:
-        """年龄"""
-        return self.get(sys._getframe().f_code.co_name)
+        """)
+    age: int = Field("年龄")
 
 
 class PrivateMessage(Message):
@@ -96,6 +242,7 @@ class PrivateMessage(Message):
         GroupSelfPrivateMessage,
         OtherPrivateMessage
     """
+    __slots__ = ("_sender",)
     SECOND_TYPE = "private"
 
     def __init__(self, data: dict):
@@ -123,31 +270,18 @@ class PrivateMessage(Message):
         """通讯录"""
 
     @property
-    def temp_source(self) -> int:
-        """临时会话来源
-
-        可从 `PrivateMessage.TEMP_SOURCE_TYPE` 中获取枚举"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def user_id(self) -> int:
-        """发送者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
+    def conversation_key(self) -> Optional[tuple]:
+        """私聊消息 (包括群临时会话) 的会话为 `("user", user_id)`"""
+        user_id = self.get("user_id")
+        return ("user", user_id) if user_id else None
 
-    @property
-    def message(self) -> str:
-        """消息内容"""
-        return self.get(sys._getframe().f_code.co_name)
+    temp_source: int = Field("""临时会话来源
 
-    @property
-    def raw_message(self) -> str:
-        """原始消息内容"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def font(self) -> int:
-        """字体"""
-        return self.get(sys._getframe().f_code.co_name)
+        可从 `PrivateMessage.TEMP_SOURCE_TYPE` 中获取枚举""")
+    user_id: int = Field("发送者 QQ 号")
+    message: str = Field("消息内容")
+    raw_message: str = Field("原始消息内容")
+    font: int = Field("字体")
 
     @property
     def sender(self) -> PrivateMessageSender:
@@ -158,116 +292,58 @@ class PrivateMessage(Message):
         也不保证存在的字段都是完全正确的 ( 缓存可能过期 )"""
         if self._sender is None:
             self._sender = PrivateMessageSender(
-                self.get(sys._getframe().f_code.co_name, {}))
+                self.get("sender", {}))
         return self._sender
 
 
 class FriendPrivateMessage(PrivateMessage):
     """私聊消息：好友私聊消息"""
+    __slots__ = ()
     THIRD_TYPE = "friend"
 
-    def __init__(self, data: dict):
-        super(FriendPrivateMessage, self).__init__(data)
-
 
 class GroupPrivateMessage(PrivateMessage):
     """私聊消息：群临时会话 私聊消息"""
+    __slots__ = ()
     THIRD_TYPE = "group"
 
-    def __init__(self, data: dict):
-        super(GroupPrivateMessage, self).__init__(data)
-
 
 class GroupSelfPrivateMessage(PrivateMessage):
     """私聊消息：群中自身发送私聊消息"""
+    __slots__ = ()
     THIRD_TYPE = "group_self"
 
-    def __init__(self, data: dict):
-        super(GroupSelfPrivateMessage, self).__init__(data)
-
 
 class OtherPrivateMessage(PrivateMessage):
     """私聊消息：好友私聊消息、群临时会话、群中自身发送之外的其他私聊消息"""
+    __slots__ = ()
     THIRD_TYPE = "other"
 
-    def __init__(self, data: dict):
-        super(OtherPrivateMessage, self).__init__(data)
-
 
 class GroupMessageAnonymous(dict):
     """GroupMessage 中的 anonymous
 
     注：还未实现针对匿名者的禁言 Roar"""
-    def __init__(self, data: dict):
-        super(GroupMessageAnonymous, self).__init__(data)
 
-    @property
-    def id(self) -> int:
-        """匿名用户 ID"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def name(self) -> str:
-        """匿名用户名称"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def flag(self) -> str:
-        """匿名用户 flag, 在调用禁言 API 时需要传入"""
-        return self.get(sys._getframe().f_code.co_name)
+    id: int = Field("匿名用户 ID")
+    name: str = Field("匿名用户名称")
+    flag: str = Field("匿名用户 flag, 在调用禁言 API 时需要传入")
 
 
 class GroupMessageSender(dict):
     """GroupMessage 中的 sender"""
-    def __init__(self, data: dict):
-        super(GroupMessageSender, self).__init__(data)
-
-    @property
-    def user_id(self) -> int:
-        """发送者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
 
-    @property
-    def nickname(self) -> str:
-        """昵称"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def card(self) -> str:
-        """群名片/备注"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def sex(self) -> str:
-        """
+    user_id: int = Field("发送者 QQ 号")
+    nickname: str = Field("昵称")
+    card: str = Field("群名片/备注")
+    sex: str = Field("""
         性别, `male` 或 `female` 或 `unknown`
-        """
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def age(self) -> int:
-        """年龄"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def area(self) -> str:
-        """地区"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def level(self) -> str:
-        """成员等级"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def role(self) -> str:
-        """角色, `owner` 或 `admin` 或 `member`"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def title(self) -> str:
-        """专属头衔"""
-        return self.get(sys._getframe().f_code.co_name)
+        """)
+    age: int = Field("年龄")
+    area: str = Field("地区")
+    level: str = Field("成员等级")
+    role: str = Field("角色, `owner` 或 `admin` 或 `member`")
+    title: str = Field("专属头衔")
 
 
 class GroupMessage(Message):
@@ -278,6 +354,7 @@ class GroupMessage(Message):
         AnonymousGroupMessage，
         NoticeGroupMessage
     """
+    __slots__ = ("_sender", "_is_anony", "_anony")
     SECOND_TYPE = "group"
 
     def __init__(self, data: dict):
@@ -286,21 +363,14 @@ class GroupMessage(Message):
         self._is_anony = None
         self._anony = None
 
-    @property
-    def group_id(self) -> int:
-        """群号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def user_id(self) -> int:
-        """发送者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
+    group_id: int = Field("群号")
+    user_id: int = Field("发送者 QQ 号")
 
     @property
     def anonymous(self) -> Optional[GroupMessageAnonymous]:
         """匿名信息, 如果不是匿名消息则为 None"""
         if self._is_anony is None:
-            anony = self.get(sys._getframe().f_code.co_name, {})
+            anony = self.get("anonymous", {})
             if anony is not None:
                 self._anony = GroupMessageAnonymous(anony)
                 self._is_anony = True
@@ -308,20 +378,9 @@ class GroupMessage(Message):
                 self._is_anony = False
         return self._anony
 
-    @property
-    def message(self) -> str:
-        """消息内容"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def raw_message(self) -> str:
-        """原始消息内容"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def font(self) -> int:
-        """字体"""
-        return self.get(sys._getframe().f_code.co_name)
+    message: str = Field("消息内容")
+    raw_message: str = Field("原始消息内容")
+    font: int = Field("字体")
 
     @property
     def sender(self) -> GroupMessageSender:
@@ -333,92 +392,106 @@ class GroupMessage(Message):
         尤其对于匿名消息, 此字段不具有参考价值。"""
         if self._sender is None:
             self._sender = GroupMessageSender(
-                self.get(sys._getframe().f_code.co_name, {}))
+                self.get("sender", {}))
         return self._sender
 
 
 class NormalGroupMessage(GroupMessage):
     """群消息：正常群消息(非匿名群成员发布的)"""
+    __slots__ = ()
     THIRD_TYPE = "normal"
 
-    def __init__(self, data: dict):
-        super(NormalGroupMessage, self).__init__(data)
-
 
 class AnonymousGroupMessage(GroupMessage):
     """群消息：匿名群成员发布的群消息"""
+    __slots__ = ()
     THIRD_TYPE = "anonymous"
 
-    def __init__(self, data: dict):
-        super(AnonymousGroupMessage, self).__init__(data)
-
 
 class NoticeGroupMessage(GroupMessage):
     """群消息：系统提示群消息"""
+    __slots__ = ()
     THIRD_TYPE = "notice"
 
-    def __init__(self, data: dict):
-        super(NoticeGroupMessage, self).__init__(data)
 
+class MessageSent(Sound):
+    """熊自己发出的消息
 
-class Notice(Sound):
-    FIRST_TYPE = "notice"
+    go-cqhttp 开启了上报自身消息 (`message.report-self-message`) 时上报，
+    字段与 `Message` 相同。不是 `Message` 的子类，对消息注册的反应不会听到熊自己说的话。
 
-    def __init__(self, data: dict):
-        super(Notice, self).__init__(data)
+    可以使用更为详细的
+        GroupMessageSent，
+        PrivateMessageSent
+    """
+    __slots__ = ()
+    FIRST_TYPE = "message_sent"
+    SECOND_TYPE_KEY = "message_type"
+
+    message_type: str = Field("消息类型, `private` 或 `group`")
+    message_id: int = Field("消息 ID")
+    user_id: int = Field("发送者 QQ 号, 即熊自己")
+    message: str = Field("消息内容")
+    raw_message: str = Field("原始消息内容")
+    font: int = Field("字体")
+    sender: dict = Field("发送人信息")
+
+
+class GroupMessageSent(MessageSent):
+    """熊自己发出的群消息"""
+    __slots__ = ()
+    SECOND_TYPE = "group"
 
+    group_id: int = Field("群号")
 
-class GroupUploadNoticeFile(dict):
-    """GroupUploadNotice 中的 file"""
-    def __init__(self, data: dict):
-        super(GroupUploadNoticeFile, self).__init__(data)
 
-    @property
-    def id(self) -> str:
-        """文件 ID"""
-        return self.get(sys._getframe().f_code.co_name)
+class PrivateMessageSent(MessageSent):
+    """熊自己发出的私聊消息"""
+    __slots__ = ()
+    SECOND_TYPE = "private"
 
-    @property
-    def name(self) -> str:
-        """文件名"""
-        return self.get(sys._getframe().f_code.co_name)
+    target_id: int = Field("接收者 QQ 号")
 
     @property
-    def size(self) -> int:
-        """文件大小 ( 字节数 )"""
-        return self.get(sys._getframe().f_code.co_name)
+    def conversation_key(self) -> Optional[tuple]:
+        """私聊消息的会话为 `("user", target_id)`"""
+        target_id = self.get("target_id")
+        return ("user", target_id) if target_id else None
 
-    @property
-    def busid(self) -> int:
-        """busid
-        cqbear.roar.GetGroupFileUrl 等关于群文件的 roar 会需要填入"""
-        return self.get(sys._getframe().f_code.co_name)
+
+class Notice(Sound):
+    __slots__ = ()
+    FIRST_TYPE = "notice"
+
+
+class GroupUploadNoticeFile(dict):
+    """GroupUploadNotice 中的 file"""
+
+    id: str = Field("文件 ID")
+    name: str = Field("文件名")
+    size: int = Field("文件大小 ( 字节数 )")
+    busid: int = Field("""busid
+        cqbear.roar.GetGroupFileUrl 等关于群文件的 roar 会需要填入""")
 
 
 class GroupUploadNotice(Notice):
     """群文件上传"""
+    __slots__ = ("_file",)
     SECOND_TYPE = "group_upload"
 
     def __init__(self, data: dict):
         super(GroupUploadNotice, self).__init__(data)
         self._file = None
 
-    @property
-    def group_id(self) -> int:
-        """群号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def user_id(self) -> int:
-        """发送者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
+    group_id: int = Field("群号")
+    user_id: int = Field("发送者 QQ 号")
 
     @property
     def file(self) -> GroupUploadNoticeFile:
         """文件信息"""
         if self._file is None:
             self._file = GroupUploadNoticeFile(
-                self.get(sys._getframe().f_code.co_name))
+                self.get("file"))
         return self._file
 
 
@@ -429,37 +502,24 @@ class GroupAdminNotice(Notice):
         SetGroupAdminNotice,
         UnsetGroupAdminNotice
     """
+    __slots__ = ()
     SECOND_TYPE = "group_admin"
 
-    def __init__(self, data: dict):
-        super(GroupAdminNotice, self).__init__(data)
-
-    @property
-    def group_id(self) -> int:
-        """群号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def user_id(self) -> int:
-        """管理员 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
+    group_id: int = Field("群号")
+    user_id: int = Field("管理员 QQ 号")
 
 
 class SetGroupAdminNotice(GroupAdminNotice):
     """群管理员变动：用户被设置为群管理员"""
+    __slots__ = ()
     THIRD_TYPE = "set"
 
-    def __init__(self, data: dict):
-        super(SetGroupAdminNotice, self).__init__(data)
-
 
 class UnsetGroupAdminNotice(GroupAdminNotice):
     """群管理员变动：用户被取消群管理员"""
+    __slots__ = ()
     THIRD_TYPE = "unset"
 
-    def __init__(self, data: dict):
-        super(UnsetGroupAdminNotice, self).__init__(data)
-
 
 class GroupDecreaseNotice(Notice):
     """群成员减少
@@ -469,50 +529,31 @@ class GroupDecreaseNotice(Notice):
         KickGroupDecreaseNotice,
         KickMeGroupDecreaseNotice
     """
+    __slots__ = ()
     SECOND_TYPE = "group_decrease"
 
-    def __init__(self, data: dict):
-        super(GroupDecreaseNotice, self).__init__(data)
-
-    @property
-    def group_id(self) -> int:
-        """群号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def operator_id(self) -> int:
-        """操作者 QQ 号 ( 如果是主动退群, 则和 `user_id` 相同 )"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def user_id(self) -> int:
-        """离开者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
+    group_id: int = Field("群号")
+    operator_id: int = Field("操作者 QQ 号 ( 如果是主动退群, 则和 `user_id` 相同 )")
+    user_id: int = Field("离开者 QQ 号")
 
 
 class LeaveGroupDecreaseNotice(GroupDecreaseNotice):
     """退群：用户主动退群"""
+    __slots__ = ()
     THIRD_TYPE = "leave"
 
-    def __init__(self, data: dict):
-        super(LeaveGroupDecreaseNotice, self).__init__(data)
-
 
 class KickGroupDecreaseNotice(GroupDecreaseNotice):
     """退群：成员被踢出群"""
+    __slots__ = ()
     THIRD_TYPE = "kick"
 
-    def __init__(self, data: dict):
-        super(KickGroupDecreaseNotice, self).__init__(data)
-
 
 class KickMeGroupDecreaseNotice(GroupDecreaseNotice):
     """退群：登录号被踢出群"""
+    __slots__ = ()
     THIRD_TYPE = "kick_me"
 
-    def __init__(self, data: dict):
-        super(KickMeGroupDecreaseNotice, self).__init__(data)
-
 
 class GroupIncreaseNotice(Notice):
     """群成员增加
@@ -521,42 +562,25 @@ class GroupIncreaseNotice(Notice):
         ApproveGroupIncreaseNotice，
         InviteGroupIncreaseNotice
     """
+    __slots__ = ()
     SECOND_TYPE = "group_increase"
 
-    def __init__(self, data: dict):
-        super(GroupIncreaseNotice, self).__init__(data)
-
-    @property
-    def group_id(self) -> int:
-        """群号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def operator_id(self) -> int:
-        """操作者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def user_id(self) -> int:
-        """加入者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
+    group_id: int = Field("群号")
+    operator_id: int = Field("操作者 QQ 号")
+    user_id: int = Field("加入者 QQ 号")
 
 
 class ApproveGroupIncreaseNotice(GroupIncreaseNotice):
     """加群：管理员同意后加入"""
+    __slots__ = ()
     THIRD_TYPE = "approve"
 
-    def __init__(self, data: dict):
-        super(ApproveGroupIncreaseNotice, self).__init__(data)
-
 
 class InviteGroupIncreaseNotice(GroupIncreaseNotice):
     """加群：被管理员邀请入群"""
+    __slots__ = ()
     THIRD_TYPE = "invite"
 
-    def __init__(self, data: dict):
-        super(InviteGroupIncreaseNotice, self).__init__(data)
-
 
 class GroupBanNotice(Notice):
     """群禁言事件
@@ -565,30 +589,13 @@ class GroupBanNotice(Notice):
         EnableGroupBanNotice，
         DisableGroupBanNotice
     """
+    __slots__ = ()
     SECOND_TYPE = "group_ban"
 
-    def __init__(self, data: dict):
-        super(GroupBanNotice, self).__init__(data)
-
-    @property
-    def group_id(self) -> int:
-        """群号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def operator_id(self) -> int:
-        """操作者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def user_id(self) -> int:
-        """被禁言 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def duration(self) -> int:
-        """禁言时长, 单位秒"""
-        return self.get(sys._getframe().f_code.co_name)
+    group_id: int = Field("群号")
+    operator_id: int = Field("操作者 QQ 号")
+    user_id: int = Field("被禁言 QQ 号")
+    duration: int = Field("禁言时长, 单位秒")
 
     @property
     def is_ban(self) -> bool:
@@ -600,154 +607,82 @@ class GroupBanNotice(Notice):
 
 class EnableGroupBanNotice(GroupBanNotice):
     """群禁言: 设置禁言"""
+    __slots__ = ()
     THIRD_TYPE = "ban"
 
-    def __init__(self, data: dict):
-        super(EnableGroupBanNotice, self).__init__(data)
-
 
 class DisableGroupBanNotice(GroupBanNotice):
     """群禁言: 解除禁言"""
+    __slots__ = ()
     THIRD_TYPE = "lift_ban"
 
-    def __init__(self, data: dict):
-        super(DisableGroupBanNotice, self).__init__(data)
-
 
 class FriendAddNotice(Notice):
     """好友添加"""
+    __slots__ = ()
     SECOND_TYPE = "friend_add"
 
-    def __init__(self, data: dict):
-        super(FriendAddNotice, self).__init__(data)
-
-    @property
-    def user_id(self) -> int:
-        """新添加好友 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
+    user_id: int = Field("新添加好友 QQ 号")
 
 
 class GroupRecallNotice(Notice):
     """群消息撤回"""
+    __slots__ = ()
     SECOND_TYPE = "group_recall"
 
-    def __init__(self, data: dict):
-        super(GroupRecallNotice, self).__init__(data)
-
-    @property
-    def group_id(self) -> int:
-        """群号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def user_id(self) -> int:
-        """消息发送者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def operator_id(self) -> int:
-        """操作者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def message_id(self) -> int:
-        """被撤回的消息 ID"""
-        return self.get(sys._getframe().f_code.co_name)
+    group_id: int = Field("群号")
+    user_id: int = Field("消息发送者 QQ 号")
+    operator_id: int = Field("操作者 QQ 号")
+    message_id: int = Field("被撤回的消息 ID")
 
 
 class FriendRecallNotice(Notice):
     """好友消息撤回"""
+    __slots__ = ()
     SECOND_TYPE = "friend_recall"
 
-    def __init__(self, data: dict):
-        super(FriendRecallNotice, self).__init__(data)
-
-    @property
-    def user_id(self) -> int:
-        """user_id"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def message_id(self) -> int:
-        """message_id"""
-        return self.get(sys._getframe().f_code.co_name)
+    user_id: int = Field("user_id")
+    message_id: int = Field("message_id")
 
 
 class Notify(Notice):
+    __slots__ = ()
     SECOND_TYPE = "notify"
 
-    def __init__(self, data: dict):
-        super(Notify, self).__init__(data)
-
 
 class PokeNotify(Notify):
     """戳一戳
 
     分为 好友戳一戳 以及 群内戳一戳"""
+    __slots__ = ()
     THIRD_TYPE = "poke"
 
-    def __init__(self, data: dict):
-        super(PokeNotify, self).__init__(data)
-
-    @property
-    def sender_id(self) -> int:
-        """发送者 QQ 号 群内戳一戳事件不存在此属性"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def user_id(self) -> int:
-        """发送者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def target_id(self) -> int:
-        """被戳者 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def group_id(self) -> int:
-        """群号 好友戳一戳事件不存在此属性"""
-        return self.get(sys._getframe().f_code.co_name)
+    sender_id: int = Field("发送者 QQ 号 群内戳一戳事件不存在此属性")
+    user_id: int = Field("发送者 QQ 号")
+    target_id: int = Field("被戳者 QQ 号")
+    group_id: int = Field("群号 好友戳一戳事件不存在此属性")
 
 
 class GroupLuckyKingNotify(Notify):
     """群红包运气王"""
+    __slots__ = ()
     THIRD_TYPE = "lucky_king"
 
-    def __init__(self, data: dict):
-        super(GroupLuckyKingNotify, self).__init__(data)
-
-    @property
-    def user_id(self) -> int:
-        """红包发送者id"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def target_id(self) -> int:
-        """运气王id"""
-        return self.get(sys._getframe().f_code.co_name)
+    user_id: int = Field("红包发送者id")
+    target_id: int = Field("运气王id")
 
 
 class GroupMemberHonorChangeNotify(Notify):
     """群成员荣誉变更提示"""
+    __slots__ = ()
     THIRD_TYPE = "honor"
 
-    def __init__(self, data: dict):
-        super(GroupMemberHonorChangeNotify, self).__init__(data)
-
-    @property
-    def user_id(self) -> int:
-        """成员id"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def honor_type(self) -> str:
-        """荣誉类型
+    user_id: int = Field("成员id")
+    honor_type: str = Field("""荣誉类型
 
         `talkative`龙王
         `performer`群聊之火
-        `emotion`快乐源泉"""
-        return self.get(sys._getframe().f_code.co_name)
+        `emotion`快乐源泉""")
 
 
 class GroupCardNotice(Notice):
@@ -756,114 +691,67 @@ class GroupCardNotice(Notice):
     此事件不保证时效性, 仅在收到消息时校验卡片
 
     当名片为空时 `card_xx` 字段为空字符串, 并不是昵称"""
+    __slots__ = ()
     SECOND_TYPE = "group_card"
 
-    def __init__(self, data: dict):
-        super(GroupCardNotice, self).__init__(data)
-
-    @property
-    def group_id(self) -> int:
-        """群号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def user_id(self) -> int:
-        """成员id"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def card_new(self) -> str:
-        """新名片"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def card_old(self) -> str:
-        """旧名片"""
-        return self.get(sys._getframe().f_code.co_name)
+    group_id: int = Field("群号")
+    user_id: int = Field("成员id")
+    card_new: str = Field("新名片")
+    card_old: str = Field("旧名片")
 
 
 class OfflineFileNoticeFile(dict):
     """OfflineFileNotice 中的 file"""
-    def __init__(self, data: dict):
-        super(OfflineFileNoticeFile, self).__init__(data)
 
-    @property
-    def name(self) -> str:
-        """文件名"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def size(self) -> int:
-        """文件大小"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def url(self) -> str:
-        """下载链接"""
-        return self.get(sys._getframe().f_code.co_name)
+    name: str = Field("文件名")
+    size: int = Field("文件大小")
+    url: str = Field("下载链接")
 
 
 class OfflineFileNotice(Notice):
     """接收到离线文件"""
+    __slots__ = ("_file",)
     SECOND_TYPE = "offline_file"
 
     def __init__(self, data: dict):
         super(OfflineFileNotice, self).__init__(data)
         self._file = None
 
-    @property
-    def user_id(self) -> int:
-        """发送者id"""
-        return self.get(sys._getframe().f_code.co_name)
+    user_id: int = Field("发送者id")
 
     @property
     def file(self) -> OfflineFileNoticeFile:
         """文件数据"""
         if self._file is None:
             self._file = OfflineFileNoticeFile(
-                self.get(sys._getframe().f_code.co_name))
+                self.get("file"))
         return self._file
 
 
 class ClientStatusNoticeDevice(dict):
     """ClientStatusNotice 中的 device"""
-    def __init__(self, data: dict):
-        super(ClientStatusNoticeDevice, self).__init__(data)
-
-    @property
-    def app_id(self) -> int:
-        """客户端ID"""
-        return self.get(sys._getframe().f_code.co_name)
 
-    @property
-    def device_name(self) -> str:
-        """设备名称"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def device_kind(self) -> str:
-        """设备类型"""
-        return self.get(sys._getframe().f_code.co_name)
+    app_id: int = Field("客户端ID")
+    device_name: str = Field("设备名称")
+    device_kind: str = Field("设备类型")
 
 
 class ClientStatusNotice(Notice):
+    __slots__ = ("_clients",)
     SECOND_TYPE = "client_status"
 
     def __init__(self, data: dict):
         super(ClientStatusNotice, self).__init__(data)
         self._clients = None
 
-    @property
-    def online(self) -> bool:
-        """online"""
-        return self.get(sys._getframe().f_code.co_name)
+    online: bool = Field("online")
 
     @property
     def client(self) -> List[ClientStatusNoticeDevice]:
         """客户端信息"""
         if self._clients is None:
             clients = list()
-            for dev in self.get(sys._getframe().f_code.co_name):
+            for dev in self.get("client"):
                 clients.append(ClientStatusNoticeDevice(dev))
             self._clients = clients
         return self._clients
@@ -876,74 +764,42 @@ class EssenceNotice(Notice):
         AddEssenceNotice,
         DeleteEssenceNotice
     """
+    __slots__ = ()
     SECOND_TYPE = "essence"
 
-    def __init__(self, data: dict):
-        super(EssenceNotice, self).__init__(data)
-
-    @property
-    def sender_id(self) -> int:
-        """消息发送者ID"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def operator_id(self) -> int:
-        """操作者ID"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def message_id(self) -> int:
-        """消息ID"""
-        return self.get(sys._getframe().f_code.co_name)
+    sender_id: int = Field("消息发送者ID")
+    operator_id: int = Field("操作者ID")
+    message_id: int = Field("消息ID")
 
 
 class AddEssenceNotice(EssenceNotice):
     """添加精华消息"""
+    __slots__ = ()
     THIRD_TYPE = "add"
 
-    def __init__(self, data: dict):
-        super(AddEssenceNotice, self).__init__(data)
-
 
 class DeleteEssenceNotice(EssenceNotice):
     """删除精华消息"""
+    __slots__ = ()
     THIRD_TYPE = "delete"
 
-    def __init__(self, data: dict):
-        super(DeleteEssenceNotice, self).__init__(data)
-
 
 class Request(Sound):
+    __slots__ = ()
     FIRST_TYPE = "request"
 
-    def __init__(self, data: dict):
-        super(Request, self).__init__(data)
-
 
 class FriendRequest(Request):
     """加好友请求
 
     使用 `cqbear.roar.SetFriendAddRequest` 处理此事件
     (需要传入 `FriendRequest.flag` 参数)"""
+    __slots__ = ()
     SECOND_TYPE = "friend"
 
-    def __init__(self, data: dict):
-        super(FriendRequest, self).__init__(data)
-
-    @property
-    def user_id(self) -> int:
-        """发送请求的 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def comment(self) -> int:
-        """验证信息"""
-        return self.get(sys._getframe().f_code.co_name)
-
-    @property
-    def flag(self) -> str:
-        """请求 flag, 在调用处理请求的 API 时需要传入"""
-        return self.get(sys._getframe().f_code.co_name)
+    user_id: int = Field("发送请求的 QQ 号")
+    comment: int = Field("验证信息")
+    flag: str = Field("请求 flag, 在调用处理请求的 API 时需要传入")
 
 
 class GroupRequest(Request):
@@ -951,94 +807,181 @@ class GroupRequest(Request):
 
     使用 `cqbear.roar.SetGroupAddRequest` 处理此事件
     (需要传入 `GroupRequest.flag` 参数)"""
+    __slots__ = ()
     SECOND_TYPE = "group"
 
+    group_id: int = Field("群号")
+    user_id: int = Field("发起请求的 QQ 号")
+    comment: str = Field("验证信息")
+    flag: str = Field("请求 flag, 在调用处理请求的 API 时需要传入")
+
+
+class AddGroupRequest(GroupRequest):
+    """加群请求"""
+    __slots__ = ()
+    THIRD_TYPE = "add"
+
+
+class InviteGroupRequest(GroupRequest):
+    """邀请加群请求"""
+    __slots__ = ()
+    THIRD_TYPE = "invite"
+
+
+class MetaEvent(Sound):
+    """元事件
+
+    go-cqhttp 的心跳与生命周期事件，熊通过元事件判断 go-cqhttp 是否在线，
+    参考 `cqbear.health.HealthMonitor`
+    """
+    __slots__ = ()
+    FIRST_TYPE = "meta_event"
+
+
+class HeartbeatMetaEventStatus(dict):
+    """HeartbeatMetaEvent 中的 status"""
+
+    app_initialized: bool = Field("程序是否初始化完毕")
+    app_enabled: bool = Field("程序是否可用")
+    app_good: bool = Field("程序正常")
+    online: bool = Field("是否在线")
+
+
+class HeartbeatMetaEvent(MetaEvent):
+    """心跳"""
+    __slots__ = ("_status",)
+    SECOND_TYPE = "heartbeat"
+
     def __init__(self, data: dict):
-        super(GroupRequest, self).__init__(data)
+        super(HeartbeatMetaEvent, self).__init__(data)
+        self._status = None
 
     @property
-    def group_id(self) -> int:
-        """群号"""
-        return self.get(sys._getframe().f_code.co_name)
+    def status(self) -> HeartbeatMetaEventStatus:
+        """应用程序状态"""
+        if self._status is None:
+            self._status = HeartbeatMetaEventStatus(
+                self.get("status") or {})
+        return self._status
 
-    @property
-    def user_id(self) -> int:
-        """发起请求的 QQ 号"""
-        return self.get(sys._getframe().f_code.co_name)
+    interval: int = Field("距离上一次心跳的时间，单位毫秒")
 
-    @property
-    def comment(self) -> str:
-        """验证信息"""
-        return self.get(sys._getframe().f_code.co_name)
 
-    @property
-    def flag(self) -> str:
-        """请求 flag, 在调用处理请求的 API 时需要传入"""
-        return self.get(sys._getframe().f_code.co_name)
+class LifecycleMetaEvent(MetaEvent):
+    """生命周期
 
+    可使用更加精确的
+        EnableLifecycleMetaEvent,
+        DisableLifecycleMetaEvent,
+        ConnectLifecycleMetaEvent
+    """
+    __slots__ = ()
+    SECOND_TYPE = "lifecycle"
 
-class AddGroupRequest(Request):
-    """加群请求"""
-    THIRD_TYPE = "add"
 
-    def __init__(self, data: dict):
-        super(AddGroupRequest, self).__init__(data)
+class EnableLifecycleMetaEvent(LifecycleMetaEvent):
+    """生命周期：go-cqhttp 启用"""
+    __slots__ = ()
+    THIRD_TYPE = "enable"
 
 
-class InviteGroupRequest(Request):
-    """邀请加群请求"""
-    THIRD_TYPE = "invite"
+class DisableLifecycleMetaEvent(LifecycleMetaEvent):
+    """生命周期：go-cqhttp 停用"""
+    __slots__ = ()
+    THIRD_TYPE = "disable"
 
-    def __init__(self, data: dict):
-        super(InviteGroupRequest, self).__init__(data)
 
+class ConnectLifecycleMetaEvent(LifecycleMetaEvent):
+    """生命周期：WebSocket 连接成功"""
+    __slots__ = ()
+    THIRD_TYPE = "connect"
 
-class SoundUnderstander:
-    _understand_map = {
-        "default": Sound
-    }
-
-    def __init__(self):
-        cls_lst = allSubclasses(Sound)
-        for cls in cls_lst:
-            if cls == Sound:
-                continue
-            key = self._get_key(clas=cls)
-            self._understand_map[key] = cls
 
-    def understand(self, data: dict) -> Sound:
-        key = self._get_key(data=data)
-        cls = self._understand_map.get(key, Sound)
-        return cls(data)
+# raw pattern of every field peeked by `RawSound`, compiled on first use
+_raw_patterns: Dict[str, Any] = {}
 
-    def _get_key(self, data=None, clas=None) -> str:
-        if not data and not clas:
-            return None
-        if data and clas:
+
+def _raw_pattern(key: str):
+    pattern = _raw_patterns.get(key)
+    if pattern is None:
+        # the value is optional so that a field which is not a plain string
+        # or integer stops the search at its first occurrence
+        pattern = _raw_patterns[key] = re.compile(
+            rb'"%s"\s*:\s*(?:"([^"\\]*)"|(-?\d+)(?![\d.eE])|(null)\b)?'
+            % re.escape(key.encode("utf-8")))
+    return pattern
+
+
+class RawSound(object):
+    """尚未解码的上报事件
+
+    只能通过 `get` 查看原始内容中值为简单字符串或整数的字段，字段在第一次查看时才被找出，
+    用于在解码 json 之前判断事件的类型 (`SoundUnderstander.classify`)、群号等。
+
+    查找的是字段在原始内容中第一次出现的位置：消息内容中的引号已被转义，不会被当作字段，
+    嵌套对象中的同名字段 (例如 `sender.user_id`) 可能先被找到，go-cqhttp 上报的这类字段
+    与外层的值相同。值为 null 的字段与不存在的字段一样返回 default；
+    字段存在但值不是简单的字符串、整数或 null 时 `get` 返回 default，
+    并将 `uncertain` 置为 True，此时根据字段得出的结论不可靠。
+    """
+
+    __slots__ = ("body", "uncertain", "_fields")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.uncertain = False
+        self._fields: Dict[str, Any] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        fields = self._fields
+        if key in fields:  # most keys are peeked once, KeyError would cost more
+            value = fields[key]
+        else:
+            value = fields[key] = self.__peek(key)
+        return default if value is None else value
+
+    def __peek(self, key: str) -> Any:
+        match = _raw_pattern(key).search(self.body)
+        if match is None:
             return None
+        text, number, null = match.groups()
+        if text is not None:
+            return text.decode("utf-8")
+        if number is not None:
+            return int(number)
+        if null is None:
+            self.uncertain = True
+        return None
+
+    def __repr__(self) -> str:
+        return f"RawSound({self.body[:64]!r})"
 
-        key = ""
-        first_type = None
-        second_type = None
-        third_type = None
-
-        if data is not None:
-            first_type = data.get("post_type")
-            second_type = data.get(f"{first_type}_type")
-            third_type = data.get("sub_type")
-
-        if clas is not None:
-            first_type = clas.FIRST_TYPE
-            second_type = clas.SECOND_TYPE
-            third_type = clas.THIRD_TYPE
-
-        if first_type:
-            key = key + first_type
-        if second_type:
-            key = key + f"-{second_type}"
-        if third_type:
-            key = key + f"-{third_type}"
-        return key
+
+class SoundUnderstander:
+    """根据上报事件的 (post_type, xxx_type, sub_type) 实例化对应的声音
+
+    声音类型在定义时 (`Sound.__init_subclass__`) 被登记，没有对应类型的事件使用
+    最接近的父类型，例如未知 sub_type 的群消息为 `GroupMessage`，未知的通知为 `Notify`，
+    完全未知的事件为 `Sound`，不会丢失任何事件。
+    """
+
+    def understand(self, data: dict) -> Sound:
+        return self.classify(data)(data)
+
+    @staticmethod
+    def classify(data: Union[dict, RawSound]) -> type:
+        """事件对应的声音类型，data 为上报事件或尚未解码的 `RawSound`"""
+        post_type = data.get("post_type")
+        try:
+            type_key = _type_keys.get(post_type)
+            key = (post_type, data.get(type_key) if type_key else None,
+                   data.get("sub_type"))
+            cls = _understood.get(key)
+        except TypeError:  # unhashable types in a malformed event
+            return Sound
+        if cls is None:
+            cls = _understand(key)
+        return cls
 
 
 def doc():
@@ -0,0 +1,255 @@
+# -*- coding=utf-8 -*-
+"""
+sound_queue.py
+
+  BearEar 与 BearBrain 之间传递声音的有界队列。
+
+  - 入队/出队均为 O(1)
+  - 线程安全，支持阻塞等待 (空闲时不占用 CPU)
+  - 容量有上限，排队数量超过高水位后按声音类型的溢出策略丢弃声音并计数
+
+溢出策略：
+
+  - `SoundQueue.DROP_OLDEST`: 丢弃队列中最早的可丢弃声音，保留新到的声音
+  - `SoundQueue.DROP_NEWEST`: 丢弃新到的声音
+  - `SoundQueue.KEEP`: 保留新到的声音直到队列容量上限，
+      到达容量上限后优先丢弃队列中最早的可丢弃声音
+
+默认策略为“保留请求和提醒，丢弃闲聊”：`Request` 和 `Notice` 为 `KEEP`，
+其余声音 (例如群消息) 为 `DROP_OLDEST`。
+
+Expect usage::
+
+    queue = SoundQueue(capacity=1024, high_water=800)
+    queue.set_policy(GroupMessage, SoundQueue.DROP_NEWEST)
+
+    queue.put(sound)         # -> bool, 声音被丢弃时返回 False
+    queue.get()              # 阻塞直到有声音或队列被关闭
+    queue.get(timeout=1)     # 最多等待 1 秒，超时返回 None
+    queue.get(block=False)   # 不等待，队列为空时返回 None
+    await queue.get_async()  # 在 asyncio 事件循环中等待，不占用线程
+
+    queue.depth              # 当前排队的声音数量
+    queue.shed_stats         # {声音类型: 丢弃数量}
+    queue.close()            # 唤醒所有等待中的 get
+"""
+
+import asyncio
+import collections
+import threading
+from typing import Callable, Dict, Optional
+
+from cqbear.sound import Notice, Request, Sound
+
+
+class SoundQueue:
+    """有界、线程安全的声音队列
+
+    - capacity: 队列容量上限
+    - high_water: 高水位，排队数量达到高水位后开始按溢出策略丢弃声音，
+        默认为容量的 80%
+    - policies: {声音类型: 溢出策略}，未设置的声音类型沿继承链查找策略
+    - on_shed: 声音被丢弃时的回调，参数为被丢弃的声音
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    KEEP = "keep"
+
+    def __init__(self, capacity: int = 4096, high_water: Optional[int] = None,
+                 policies: Optional[Dict[type, str]] = None,
+                 on_shed: Optional[Callable[[Sound], None]] = None):
+        if capacity <= 0:
+            raise ValueError("SoundQueue capacity must be greater than 0")
+        if high_water is None:
+            high_water = max(1, capacity * 4 // 5)
+        if not 0 < high_water <= capacity:
+            raise ValueError(
+                "SoundQueue high_water must between 1 and capacity")
+
+        self.__capacity = capacity
+        self.__high_water = high_water
+        self.__on_shed = on_shed
+
+        # every queued sound is held by a one-item list, the list is shared
+        # with `__droppable` so a sound can be shed in O(1) by emptying its
+        # holder and skipping the empty holder when it reaches the head
+        self.__sounds = collections.deque()
+        self.__droppable = collections.deque()
+        self.__depth = 0
+        self.__not_empty = threading.Condition(threading.Lock())
+        self.__async_waiters = collections.deque()
+        self.__closed = False
+
+        self.__policies: Dict[type, str] = {
+            Sound: self.DROP_OLDEST,
+            Notice: self.KEEP,
+            Request: self.KEEP,
+        }
+        self.__policy_cache: Dict[type, str] = {}
+        if policies:
+            for sound_type, policy in policies.items():
+                self.set_policy(sound_type, policy)
+
+        self.__shed: Dict[type, int] = collections.Counter()
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    @property
+    def high_water(self) -> int:
+        return self.__high_water
+
+    @property
+    def depth(self) -> int:
+        """当前排队的声音数量"""
+        return self.__depth
+
+    @property
+    def dropped(self) -> int:
+        """被丢弃的声音总数"""
+        return sum(self.__shed.values())
+
+    @property
+    def shed_stats(self) -> Dict[type, int]:
+        """各声音类型被丢弃的数量"""
+        return dict(self.__shed)
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def set_policy(self, sound_type: type, policy: str):
+        """设置某个声音类型 (及其未单独设置策略的子类) 的溢出策略"""
+        if policy not in (self.DROP_OLDEST, self.DROP_NEWEST, self.KEEP):
+            raise ValueError(f"unknown sound queue policy: {policy}")
+        with self.__not_empty:
+            self.__policies[sound_type] = policy
+            self.__policy_cache.clear()
+
+    def policy_of(self, sound_type: type) -> str:
+        policy = self.__policy_cache.get(sound_type)
+        if policy is None:
+            for cls in sound_type.__mro__:
+                if cls in self.__policies:
+                    policy = self.__policies[cls]
+                    break
+            else:
+                policy = self.DROP_OLDEST
+            self.__policy_cache[sound_type] = policy
+        return policy
+
+    def put(self, sound: Sound) -> bool:
+        """声音入队，声音被丢弃时返回 False"""
+        policy = self.policy_of(type(sound))
+        shed = None
+        with self.__not_empty:
+            if self.__depth >= self.__high_water:
+                if policy == self.DROP_NEWEST:
+                    shed = sound
+                elif policy == self.DROP_OLDEST or \
+                        self.__depth >= self.__capacity:
+                    shed = self.__shed_oldest()
+                    if shed is None and self.__depth >= self.__capacity:
+                        shed = sound
+
+            if shed is not sound:
+                holder = [sound]
+                self.__sounds.append(holder)
+                if policy != self.KEEP:
+                    self.__droppable.append(holder)
+                self.__depth += 1
+                self.__not_empty.notify()
+                if self.__async_waiters:
+                    self.__wake_async()
+            if shed is not None:
+                self.__shed[type(shed)] += 1
+
+        if shed is not None and self.__on_shed is not None:
+            self.__on_shed(shed)
+        return shed is not sound
+
+    def __shed_oldest(self) -> Optional[Sound]:
+        if not self.__droppable:
+            return None
+        holder = self.__droppable.popleft()
+        sound = holder.pop()
+        self.__depth -= 1
+        return sound
+
+    def get(self, block: bool = True,
+            timeout: Optional[float] = None) -> Optional[Sound]:
+        """取出最早入队的声音
+
+        - block: 队列为空时是否等待
+        - timeout: 最长等待时间(秒)，`None` 为一直等待
+
+        超时或队列被关闭时返回 None
+        """
+        with self.__not_empty:
+            if block:
+                self.__not_empty.wait_for(
+                    lambda: self.__depth or self.__closed, timeout)
+            return self.__pop()
+
+    async def get_async(self) -> Optional[Sound]:
+        """在 asyncio 事件循环中等待并取出最早入队的声音，队列被关闭时返回 None"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self.__not_empty:
+                sound = self.__pop()
+                if sound is not None or self.__closed:
+                    return sound
+                waiter = loop.create_future()
+                self.__async_waiters.append((loop, waiter))
+            await waiter
+
+    def __pop(self) -> Optional[Sound]:
+        while self.__sounds:
+            holder = self.__sounds.popleft()
+            if not holder:
+                continue  # shed
+            if self.__droppable and self.__droppable[0] is holder:
+                self.__droppable.popleft()
+            self.__depth -= 1
+            return holder[0]
+        return None
+
+    def __wake_async(self):
+        while self.__async_waiters:
+            loop, waiter = self.__async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake_waiter, waiter)
+            except RuntimeError:  # the waiting loop is closed
+                pass
+
+    def clear(self):
+        """清空队列，清空的声音与溢出时丢弃的声音一样计数并调用 `on_shed`"""
+        with self.__not_empty:
+            shed = [holder[0] for holder in self.__sounds if holder]
+            self.__sounds.clear()
+            self.__droppable.clear()
+            self.__depth = 0
+            for sound in shed:
+                self.__shed[type(sound)] += 1
+
+        if self.__on_shed is not None:
+            for sound in shed:
+                self.__on_shed(sound)
+
+    def close(self):
+        """关闭队列并唤醒所有等待中的 get，已入队的声音仍可被取出"""
+        with self.__not_empty:
+            self.__closed = True
+            self.__not_empty.notify_all()
+            self.__wake_async()
+
+    def open(self):
+        with self.__not_empty:
+            self.__closed = False
+
+
+def _wake_waiter(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,366 @@
+# -*- coding=utf-8 -*-
+"""
+traffic.py
+
+  熊嘴发出吼叫的流量控制。
+
+  QQ 的风控会惩罚短时间内的大量发言，`SpeakScheduler` 使用令牌桶平滑发送消息的吼叫：
+
+  - 每个发送目标 (群/私聊对象) 一个令牌桶，限制单个目标的发送速率
+  - 一个全局令牌桶，限制所有目标加起来的发送速率
+  - 超过速率的吼叫进入队列排队，由调度线程在令牌足够时发出，提交吼叫的线程不会被阻塞
+  - 高优先级的吼叫先于低优先级的吼叫发出，同一优先级的不同目标轮流发送，
+      一个刷屏的群不会饿死其他群的回复
+
+  go-cqhttp 重启或不可达时，`CircuitBreaker` 在连续失败后断开熊嘴，
+  断开期间的吼叫立即失败 (`CircuitOpenError`)，不会堆积在等待超时的线程中，
+  一段时间后放行一个探测吼叫，成功后恢复。
+
+Expect usage::
+
+    scheduler = SpeakScheduler(rate=1, burst=3, global_rate=5, global_burst=10)
+    mouth = BearMouth("127.0.0.1", 5700, scheduler=scheduler)
+
+    future = mouth.speak_nowait(roar, priority=SpeakScheduler.HIGH)
+    scheduler.stats  # {'queued': 3, 'sent': 120, 'wait_avg': 0.4, 'wait_max': 2.1}
+
+    breaker = CircuitBreaker(failure_threshold=5, recovery_timeout=10)
+    mouth = BearMouth("127.0.0.1", 5700, breaker=breaker)
+    breaker.state    # "closed" / "open" / "half_open"
+"""
+
+import collections
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import requests
+
+from cqbear.roar import Roar
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """熊嘴已断开，吼叫没有被发送"""
+    pass
+
+
+class TokenBucket:
+    """令牌桶
+
+    - rate: 每秒补充的令牌数
+    - burst: 令牌桶容量，即允许的最大突发数量
+    """
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        if rate <= 0 or burst < 1:
+            raise ValueError(
+                "TokenBucket rate must greater than 0 and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.__tokens = burst
+        self.__stamp = time.monotonic() if now is None else now
+
+    def __refill(self, now: float):
+        if now > self.__stamp:
+            self.__tokens = min(
+                self.burst, self.__tokens + (now - self.__stamp) * self.rate)
+            self.__stamp = now
+
+    def wait_time(self, now: float, tokens: float = 1) -> float:
+        """还需要等待多少秒才有足够的令牌，令牌足够时返回 0"""
+        self.__refill(now)
+        if self.__tokens >= tokens:
+            return 0.0
+        return (tokens - self.__tokens) / self.rate
+
+    def take(self, now: float, tokens: float = 1) -> bool:
+        """取出令牌，令牌不足时返回 False"""
+        if self.wait_time(now, tokens):
+            return False
+        self.__tokens -= tokens
+        return True
+
+    def is_full(self, now: float) -> bool:
+        self.__refill(now)
+        return self.__tokens >= self.burst
+
+
+class CircuitBreaker:
+    """熔断器
+
+    - failure_threshold: 连续失败多少次后断开
+    - recovery_timeout: 断开多少秒后放行一个探测请求 (半开)，
+        探测成功则恢复，失败则继续断开
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5,
+                 recovery_timeout: float = 10.0):
+        if failure_threshold < 1:
+            raise ValueError(
+                "CircuitBreaker failure_threshold must at least 1")
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self.__lock = threading.Lock()
+        self.__state = self.CLOSED
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__probing = False
+        self.__opened = 0
+        self.__rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self.__lock:
+            if self.__state == self.OPEN and self.__recovered():
+                return self.HALF_OPEN
+            return self.__state
+
+    @property
+    def stats(self) -> dict:
+        """当前状态、连续失败次数、断开次数以及断开期间被拒绝的请求数"""
+        state = self.state
+        with self.__lock:
+            return {
+                "state": state,
+                "failures": self.__failures,
+                "opened": self.__opened,
+                "rejected": self.__rejected,
+            }
+
+    def __recovered(self) -> bool:
+        return time.monotonic() - self.__opened_at >= self.recovery_timeout
+
+    def allow(self) -> bool:
+        """是否可以发出请求，半开状态下只放行一个探测请求"""
+        with self.__lock:
+            if self.__state == self.CLOSED:
+                return True
+            if self.__state == self.OPEN and self.__recovered():
+                self.__state = self.HALF_OPEN
+            if self.__state == self.HALF_OPEN and not self.__probing:
+                self.__probing = True
+                return True
+            self.__rejected += 1
+            return False
+
+    def record_success(self):
+        with self.__lock:
+            self.__state = self.CLOSED
+            self.__failures = 0
+            self.__probing = False
+
+    def record_failure(self):
+        with self.__lock:
+            self.__failures += 1
+            self.__probing = False
+            if self.__state == self.HALF_OPEN or \
+                    self.__failures >= self.failure_threshold:
+                if self.__state != self.OPEN:
+                    self.__opened += 1
+                self.__state = self.OPEN
+                self.__opened_at = time.monotonic()
+
+    def reset(self):
+        self.record_success()
+
+
+class SpeakScheduler:
+    """发送消息的吼叫调度器
+
+    - rate / burst: 每个发送目标的令牌桶速率(条/秒)与容量
+    - global_rate / global_burst: 全局令牌桶的速率(条/秒)与容量，
+        global_rate 为 `None` 时不限制全局速率
+
+    只有 `Roar.target_key` 不为 `None` 的吼叫 (发送群消息、私聊消息、合并转发等)
+    会经过调度器，参考 `BearMouth`。
+    """
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+    # buckets of idle targets are pruned once there are this many of them
+    _PRUNE_BUCKETS = 1024
+
+    def __init__(self, rate: float = 1.0, burst: float = 3,
+                 global_rate: Optional[float] = 5.0,
+                 global_burst: float = 10):
+        self.rate = rate
+        self.burst = burst
+        # validate the per-target bucket settings early
+        TokenBucket(rate, burst)
+        self.__global = TokenBucket(global_rate, global_burst) \
+            if global_rate is not None else None
+
+        self.__buckets: Dict[Hashable, TokenBucket] = {}
+        # priority -> {target: deque[(roar, future, enqueued at)]}, the
+        # target order of each priority is the round-robin order
+        self.__queues: Dict[int, "collections.OrderedDict"] = {
+            self.HIGH: collections.OrderedDict(),
+            self.NORMAL: collections.OrderedDict(),
+            self.LOW: collections.OrderedDict(),
+        }
+        self.__queued = 0
+        self.__cond = threading.Condition(threading.Lock())
+        self.__send: Optional[Callable[[Roar], Future]] = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__stopping = False
+
+        self.__sent = 0
+        self.__wait_total = 0.0
+        self.__wait_max = 0.0
+
+    @property
+    def stats(self) -> dict:
+        """排队数量、已发出数量以及吼叫在队列中的平均/最长等待时间(秒)"""
+        with self.__cond:
+            return {
+                "queued": self.__queued,
+                "sent": self.__sent,
+                "wait_avg": self.__wait_total / self.__sent
+                if self.__sent else 0.0,
+                "wait_max": self.__wait_max,
+            }
+
+    @property
+    def queued(self) -> int:
+        return self.__queued
+
+    def start(self, send: Callable[[Roar], Future]):
+        """开始调度，send 为实际发出吼叫的函数，需要立即返回 `Future`"""
+        with self.__cond:
+            self.__send = send
+            if self.__thread is not None and self.__thread.is_alive():
+                return
+            self.__stopping = False
+            self.__thread = threading.Thread(
+                target=self.__dispatch, name="cqBear_speak_scheduler",
+                daemon=True)
+            self.__thread.start()
+
+    def stop(self):
+        """停止调度，队列中还未发出的吼叫会被取消"""
+        with self.__cond:
+            self.__stopping = True
+            thread = self.__thread
+            self.__thread = None
+            pending = []
+            for queues in self.__queues.values():
+                for queue in queues.values():
+                    pending.extend(future for _, future, _ in queue)
+                queues.clear()
+            self.__queued = 0
+            self.__cond.notify_all()
+        for future in pending:
+            future.cancel()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(1)
+
+    def submit(self, roar: Roar, target: Hashable,
+               priority: int = NORMAL) -> Future:
+        """吼叫排队等待发出，返回的 `Future` 结果与 `BearMouth.speak` 的返回值相同"""
+        if priority not in self.__queues:
+            raise ValueError(f"unknown speak priority: {priority}")
+        future = Future()
+        with self.__cond:
+            if self.__send is None:
+                raise RuntimeError("SpeakScheduler is not started")
+            queues = self.__queues[priority]
+            queue = queues.get(target)
+            if queue is None:
+                queue = queues[target] = collections.deque()
+            queue.append((roar, future, time.monotonic()))
+            self.__queued += 1
+            self.__cond.notify()
+        return future
+
+    def __bucket(self, target: Hashable, now: float) -> TokenBucket:
+        bucket = self.__buckets.get(target)
+        if bucket is None:
+            if len(self.__buckets) >= self._PRUNE_BUCKETS:
+                self.__prune(now)
+            bucket = self.__buckets[target] = TokenBucket(
+                self.rate, self.burst, now)
+        return bucket
+
+    def __prune(self, now: float):
+        busy = set()
+        for queues in self.__queues.values():
+            busy.update(queues.keys())
+        for target in [target for target, bucket in self.__buckets.items()
+                       if target not in busy and bucket.is_full(now)]:
+            del self.__buckets[target]
+
+    def __pick(self, now: float) -> Tuple[Optional[tuple], Optional[float]]:
+        """取出下一个可以发出的吼叫，没有时返回 (None, 需要等待的秒数)"""
+        if not self.__queued:
+            return None, None
+        if self.__global is not None:
+            wait = self.__global.wait_time(now)
+            if wait:
+                return None, wait
+
+        min_wait = None
+        for priority in (self.HIGH, self.NORMAL, self.LOW):
+            queues = self.__queues[priority]
+            for target, queue in queues.items():
+                bucket = self.__bucket(target, now)
+                wait = bucket.wait_time(now)
+                if wait:
+                    if min_wait is None or wait < min_wait:
+                        min_wait = wait
+                    continue
+                bucket.take(now)
+                if self.__global is not None:
+                    self.__global.take(now)
+                item = queue.popleft()
+                if queue:
+                    queues.move_to_end(target)
+                else:
+                    del queues[target]
+                self.__queued -= 1
+                return item, None
+        return None, min_wait
+
+    def __dispatch(self):
+        while True:
+            with self.__cond:
+                if self.__stopping:
+                    return
+                now = time.monotonic()
+                item, wait = self.__pick(now)
+                if item is None:
+                    self.__cond.wait(wait)
+                    continue
+                roar, future, enqueued = item
+                waited = now - enqueued
+                self.__sent += 1
+                self.__wait_total += waited
+                if waited > self.__wait_max:
+                    self.__wait_max = waited
+                send = self.__send
+
+            if not future.set_running_or_notify_cancel():
+                continue  # cancelled while queued
+            try:
+                sent = send(roar)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            sent.add_done_callback(
+                lambda done, future=future: _copy_result(done, future))
+
+
+def _copy_result(source: Future, target: Future):
+    if source.cancelled():
+        target.set_exception(RuntimeError("speak cancelled"))
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
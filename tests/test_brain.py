@@ -0,0 +1,212 @@
+# -*- coding=utf-8 -*-
+import asyncio
+import functools
+import os
+import threading
+import time
+
+import pytest
+
+from cqbear.bear import BearBrain
+from cqbear.roar import SendGroupMessage
+from cqbear.sound import GroupMessage, Message, NormalGroupMessage
+from cqbear.sound_queue import SoundQueue
+
+
+def _message(group_id: int = 123, user_id: int = 10001,
+             message_id: int = 1) -> NormalGroupMessage:
+    return NormalGroupMessage({
+        "post_type": "message", "message_type": "group", "sub_type": "normal",
+        "message_id": message_id, "group_id": group_id, "user_id": user_id,
+        "message": "hi", "raw_message": "hi",
+    })
+
+
+class Heard:
+    """记录反应收到的声音，等待收到指定数量的声音"""
+
+    def __init__(self):
+        self.sounds = []
+        self.__cond = threading.Condition()
+
+    def __call__(self, bear, sound):
+        with self.__cond:
+            self.sounds.append(sound)
+            self.__cond.notify_all()
+
+    def wait(self, count: int, timeout: float = 5) -> list:
+        with self.__cond:
+            assert self.__cond.wait_for(
+                lambda: len(self.sounds) >= count, timeout)
+            return list(self.sounds)
+
+
+def _eventually(predicate, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def queue():
+    return SoundQueue()
+
+
+@pytest.fixture
+def think(queue):
+    """用 queue 的 `get` 作为 listen_cb 创建并启动大脑，测试结束时停止"""
+    brains = []
+
+    def think(react_map, speak_cb=None, **kwargs) -> BearBrain:
+        brain = BearBrain(None, functools.partial(queue.get, True, 0.2),
+                          speak_cb, react_map, {}, **kwargs)
+        brain.start_think()
+        brains.append(brain)
+        return brain
+
+    yield think
+    for brain in brains:
+        if brain.is_thinking:
+            brain.stop_think()
+
+
+def test_sounds_are_handed_from_the_queue_to_reacts(queue, think):
+    heard = Heard()
+    think({GroupMessage: [heard]})
+    for message_id in range(3):
+        queue.put(_message(message_id=message_id))
+    assert [sound.message_id for sound in heard.wait(3)] == [0, 1, 2]
+
+
+def test_stop_think_returns_while_waiting_for_sounds(think):
+    brain = think({GroupMessage: [Heard()]})
+    time.sleep(0.1)  # the think thread is blocked in queue.get
+
+    started = time.monotonic()
+    brain.stop_think()
+    assert time.monotonic() - started < 1
+    assert not brain.is_thinking
+
+
+def test_reacts_follow_the_sound_mro_and_react_changes(queue, think):
+    order = []
+    heard = Heard()
+    brain = think({
+        GroupMessage: [lambda bear, sound: order.append("group"), heard],
+        NormalGroupMessage: [lambda bear, sound: order.append("normal")],
+    })
+    queue.put(_message())
+    heard.wait(1)
+    assert order == ["normal", "group"]
+
+    brain.add_react(Message, lambda bear, sound: order.append("message"))
+    queue.put(_message())
+    heard.wait(2)
+    time.sleep(0.05)
+    assert order == ["normal", "group", "normal", "group", "message"]
+
+
+def test_worker_pool_bounds_concurrent_reacts(queue, think):
+    running = []
+    peak = []
+    lock = threading.Lock()
+    heard = Heard()
+
+    def slow(bear, sound):
+        with lock:
+            running.append(sound)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(sound)
+        heard(bear, sound)
+
+    brain = think({GroupMessage: [slow]}, workers=3)
+    for group_id in range(9):
+        queue.put(_message(group_id=group_id + 1))
+    heard.wait(9)
+    assert max(peak) == 3
+    _eventually(lambda: brain.react_stats["done"] == 9)
+    assert brain.react_stats["workers"] == 3
+
+
+def test_conversations_are_ordered_within_and_parallel_across(queue, think):
+    active = set()
+    overlapped = []
+    lock = threading.Lock()
+    heard = Heard()
+
+    def slow(bear, sound):
+        with lock:
+            assert sound.group_id not in active
+            active.add(sound.group_id)
+            overlapped.append(len(active) > 1)
+        time.sleep(0.02)
+        with lock:
+            active.discard(sound.group_id)
+        heard(bear, sound)
+
+    think({GroupMessage: [slow]}, workers=4)
+    for message_id in range(10):
+        queue.put(_message(group_id=1 + message_id % 2,
+                           message_id=message_id))
+    sounds = heard.wait(10)
+
+    for group_id in (1, 2):
+        assert [sound.message_id for sound in sounds
+                if sound.group_id == group_id] == \
+            [message_id for message_id in range(10)
+             if 1 + message_id % 2 == group_id]
+    assert any(overlapped)
+
+
+def test_asyncio_runtime_runs_async_reacts_concurrently(queue, think):
+    heard = Heard()
+
+    async def slow(bear, sound):
+        await asyncio.sleep(0.2)
+        heard(bear, sound)
+
+    brain = think({GroupMessage: [slow]}, runtime=BearBrain.ASYNCIO,
+                  async_listen_cb=queue.get_async)
+    started = time.monotonic()
+    for group_id in range(5):
+        queue.put(_message(group_id=group_id + 1))
+    heard.wait(5)
+    assert time.monotonic() - started < 0.6
+
+    brain.stop_think()
+    assert not brain.is_thinking
+
+
+def test_thread_runtime_awaits_async_reacts(queue, think):
+    heard = Heard()
+
+    async def react(bear, sound):
+        await asyncio.sleep(0)
+        heard(bear, sound)
+
+    think({GroupMessage: [react]})
+    queue.put(_message())
+    assert heard.wait(1)[0].group_id == 123
+
+
+def _echo_pid(bear, sound):
+    """在工作进程中执行，说出进程号并返回另一个吼叫"""
+    bear.speak(SendGroupMessage().set_group_id(sound.group_id)
+               .set_message(str(os.getpid())))
+    return SendGroupMessage().set_group_id(sound.group_id).set_message("done")
+
+
+@pytest.mark.parametrize("runtime", [BearBrain.THREAD, BearBrain.ASYNCIO])
+def test_process_reacts_run_elsewhere_and_roar_here(queue, think, runtime):
+    spoken = Heard()
+    brain = think({}, speak_cb=lambda roar: spoken(None, roar),
+                  runtime=runtime, processes=1)
+    brain.add_react(GroupMessage, _echo_pid, executor=BearBrain.PROCESS)
+    queue.put(_message())
+
+    pid, done = spoken.wait(2, timeout=30)
+    assert pid["group_id"] == 123 and int(pid["message"]) != os.getpid()
+    assert done["message"] == "done"
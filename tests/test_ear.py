@@ -0,0 +1,258 @@
+# -*- coding=utf-8 -*-
+import http.client
+import json
+import socket
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from cqbear.bear import BearBrain, BearEar, CqBear
+from cqbear.sound import (GroupMessage, HeartbeatMetaEvent, MetaEvent,
+                          NormalGroupMessage, PrivateMessage, RawSound)
+from cqbear.sound_queue import SoundQueue
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _group_message(group_id: int = 123, user_id: int = 10001,
+                   message_id: int = 1, **sender) -> dict:
+    return {
+        "time": 1650000000, "self_id": 10000, "post_type": "message",
+        "message_type": "group", "sub_type": "normal",
+        "message_id": message_id, "group_id": group_id, "user_id": user_id,
+        "anonymous": None, "message": "hi", "raw_message": "hi", "font": 0,
+        "sender": dict({"user_id": user_id}, **sender),
+    }
+
+
+def _private_message(user_id: int = 10001) -> dict:
+    return {"time": 1650000000, "self_id": 10000, "post_type": "message",
+            "message_type": "private", "sub_type": "friend",
+            "message_id": 1, "user_id": user_id, "message": "hi",
+            "raw_message": "hi", "font": 0, "sender": {"user_id": user_id}}
+
+
+def _heartbeat() -> dict:
+    return {"time": 1650000000, "self_id": 10000, "post_type": "meta_event",
+            "meta_event_type": "heartbeat", "interval": 5000,
+            "status": {"online": True}}
+
+
+class GoCqhttp:
+    """通过同一个 keep-alive 连接上报事件"""
+
+    def __init__(self, port: int):
+        self.connection = http.client.HTTPConnection("127.0.0.1", port,
+                                                     timeout=5)
+
+    def post(self, event) -> bytes:
+        body = event if isinstance(event, bytes) else \
+            json.dumps(event).encode("utf-8")
+        self.connection.request("POST", "/", body=body, headers={
+            "Content-Type": "application/json"})
+        response = self.connection.getresponse()
+        assert response.status == 200
+        return response.read()
+
+    def close(self):
+        self.connection.close()
+
+
+@pytest.fixture
+def listen():
+    """创建并启动耳朵，返回 (耳朵, 上报事件的 go-cqhttp)"""
+    ears, clients = [], []
+
+    def listen(**kwargs):
+        port = _free_port()
+        ear = BearEar("127.0.0.1", port, "", **kwargs)
+        ear.start_listen()
+        ears.append(ear)
+        clients.append(GoCqhttp(port))
+        return ear, clients[-1]
+
+    yield listen
+    for client in clients:
+        client.close()
+    for ear in ears:
+        ear.stop_listen()
+
+
+def test_asyncio_ear_hears_events_over_one_connection(listen):
+    ear, gocqhttp = listen()
+    for message_id in range(3):
+        assert gocqhttp.post(_group_message(message_id=message_id)) == b"OK"
+
+    sounds = [ear.wait_sound(1) for _ in range(3)]
+    assert [sound.message_id for sound in sounds] == [0, 1, 2]
+    assert ear.sound_depth == 0
+
+
+def test_ear_answers_bodies_that_are_not_events(listen):
+    ear, gocqhttp = listen()
+    assert gocqhttp.post(b"not json") == b"OK"
+    assert gocqhttp.post(b"[1, 2]") == b"OK"
+    assert ear.get_sound() is None
+    gocqhttp.post(_heartbeat())
+    assert ear.wait_sound(1)["meta_event_type"] == "heartbeat"
+
+
+def test_stopped_ear_refuses_new_connections(listen):
+    ear, gocqhttp = listen()
+    ear.stop_listen()
+    with pytest.raises(OSError):
+        gocqhttp.post(_group_message())
+
+
+def _post_later(gocqhttp: GoCqhttp, event) -> Future:
+    future = Future()
+    threading.Thread(target=lambda: future.set_result(gocqhttp.post(event)),
+                     daemon=True).start()
+    return future
+
+
+def test_quick_operations_are_answered_in_the_response(listen):
+    ear, gocqhttp = listen(quick_deadline=5)
+    response = _post_later(gocqhttp, _group_message())
+    sound = ear.wait_sound(1)
+    sound._quick.set_result({"reply": "hello", "at_sender": False})
+    assert json.loads(response.result(5)) == {"reply": "hello",
+                                              "at_sender": False}
+
+
+def test_unanswered_sounds_are_released_by_deadline_or_shedding(listen):
+    ear, gocqhttp = listen(quick_deadline=0.2)
+    started = time.monotonic()
+    assert gocqhttp.post(_group_message()) == b"OK"
+    assert 0.2 <= time.monotonic() - started < 2
+
+    ear, gocqhttp = listen(quick_deadline=30)
+    response = _post_later(gocqhttp, _group_message())
+    deadline = time.monotonic() + 5
+    while not ear.sound_depth:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    ear.clear_sound()
+    assert response.result(5) == b"OK"
+
+
+def test_sound_filter_rejects_events_before_decoding(listen):
+    asked, rejected = [], []
+
+    def only_group_1(sound_type, raw):
+        asked.append(sound_type)
+        return raw.get("group_id") == 1
+
+    ear, gocqhttp = listen(sound_filter=only_group_1,
+                           on_reject=lambda *args: rejected.append(args))
+    gocqhttp.post(_group_message(group_id=1))
+    gocqhttp.post(_group_message(group_id=2))
+
+    assert ear.wait_sound(1).group_id == 1
+    assert ear.get_sound() is None
+    assert ear.sound_rejected == 1
+    assert asked == [NormalGroupMessage, NormalGroupMessage]
+    (sound_type, raw), = rejected
+    assert sound_type is NormalGroupMessage and raw.get("group_id") == 2
+
+
+def test_uncertain_events_are_not_filtered(listen):
+    ear, gocqhttp = listen(sound_filter=lambda sound_type, raw: False)
+    body = json.dumps(_group_message()).replace(
+        '"group"', '"gr\\u006fup"').encode("utf-8")
+    gocqhttp.post(body)
+    assert isinstance(ear.wait_sound(1), NormalGroupMessage)
+    assert ear.sound_rejected == 0
+
+
+def test_always_hear_sounds_reach_on_hear_but_not_the_queue(listen):
+    heard = []
+    ear, gocqhttp = listen(sound_filter=lambda sound_type, raw: False,
+                           always_hear=(MetaEvent,), on_hear=heard.append)
+    gocqhttp.post(_heartbeat())
+    gocqhttp.post(_group_message())
+    assert [type(sound) for sound in heard] == [HeartbeatMetaEvent]
+    assert ear.get_sound() is None and ear.sound_rejected == 2
+
+
+@pytest.fixture
+def bear():
+    bear = CqBear("127.0.0.1", _free_port(), cq_addr="127.0.0.1",
+                  cq_port=_free_port(), qq=10000)
+    bear.start()
+    gocqhttp = GoCqhttp(bear.port)
+    yield bear, gocqhttp
+    gocqhttp.close()
+    bear.stop()
+
+
+def test_instinct_only_events_run_on_the_ear_without_queueing(bear):
+    bear, gocqhttp = bear
+    bear.roster.load_group(123, [{"user_id": 10001, "nickname": "bear",
+                                  "card": "", "role": "member"}])
+    for message_id in range(10):
+        gocqhttp.post(_group_message(message_id=message_id,
+                                     nickname="bear", card=""))
+    gocqhttp.post(_group_message(message_id=10, nickname="bear", card="paw"))
+    gocqhttp.post({"post_type": "notice", "notice_type": "group_increase",
+                   "sub_type": "approve", "group_id": 123, "user_id": 10002,
+                   "operator_id": 0, "self_id": 10000})
+
+    assert bear.ear_sound_rejected() == 12
+    assert bear.ear_sound_depth() == 0
+    assert bear.brain_react_stats()["done"] == 0
+    assert bear.roster.card(123, 10001) == "paw"
+    assert bear.roster.in_group(123, 10002)
+
+
+def test_subscribed_reacts_drop_other_groups_at_the_ear(bear):
+    bear, gocqhttp = bear
+    heard = []
+    done = threading.Event()
+
+    def react(bear, sound):
+        heard.append((sound.group_id, sound.user_id))
+        done.set()
+
+    bear.add_react(NormalGroupMessage, react, groups=[1])
+    bear.add_react(PrivateMessage, react, users=[7])
+    gocqhttp.post(_group_message(group_id=2))
+    gocqhttp.post(_private_message(user_id=8))
+    gocqhttp.post(_group_message(group_id=1))
+
+    assert done.wait(5)
+    assert heard == [(1, 10001)]
+    assert bear.ear_sound_rejected() == 2
+
+
+def test_brain_wants_follows_subscriptions():
+    brain = BearBrain(None, lambda: None, None, {}, {})
+    raw = RawSound(json.dumps(_group_message(group_id=2)).encode("utf-8"))
+    assert not brain.wants(NormalGroupMessage, raw)
+
+    brain.add_react(GroupMessage, lambda bear, sound: None, groups=[1])
+    assert not brain.wants(NormalGroupMessage, raw)
+    brain.add_react(NormalGroupMessage, lambda bear, sound: None, users=[10001])
+    assert brain.wants(NormalGroupMessage, raw)
+    assert not brain.wants(PrivateMessage, raw)
+
+
+def test_ear_sheds_chatter_before_notices_when_backed_up(listen):
+    ear, gocqhttp = listen(capacity=4, high_water=2)
+    for message_id in range(3):
+        gocqhttp.post(_group_message(message_id=message_id))
+    gocqhttp.post({"post_type": "notice", "notice_type": "group_increase",
+                   "sub_type": "approve", "group_id": 123, "user_id": 7})
+    ear.set_sound_policy(NormalGroupMessage, SoundQueue.DROP_NEWEST)
+    gocqhttp.post(_group_message(message_id=3))
+
+    assert ear.sound_depth == 3
+    assert ear.sound_shed_stats == {NormalGroupMessage: 2}
+    sounds = [ear.get_sound() for _ in range(3)]
+    assert [sound.get("message_id") for sound in sounds] == [1, 2, None]
@@ -0,0 +1,117 @@
+# -*- coding=utf-8 -*-
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from cqbear.health import HealthMonitor
+from cqbear.sound import (GroupMessage, HeartbeatMetaEvent,
+                          LifecycleMetaEvent, RawSound)
+
+
+@pytest.fixture
+def gocqhttp():
+    """一个只接受连接的端口，`close` 后连接被拒绝"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    yield server
+    server.close()
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _listeners(monitor: HealthMonitor) -> list:
+    changes = []
+    event = threading.Event()
+
+    def listener(online):
+        changes.append(online)
+        event.set()
+
+    monitor.subscribe(listener)
+    return changes, event
+
+
+def test_unknown_state_probes_once(gocqhttp):
+    monitor = HealthMonitor(*gocqhttp.getsockname())
+    assert monitor.state == HealthMonitor.UNKNOWN
+    assert monitor.online
+    assert monitor.online
+    assert monitor.state == HealthMonitor.UP
+    assert monitor.stats["probes"] == 1
+
+
+def test_down_reprobes_at_most_every_retry_interval(gocqhttp):
+    addr, port = gocqhttp.getsockname()
+    monitor = HealthMonitor(addr, port, retry_interval=0.2)
+    monitor.mark_down()
+    monitor.probe()  # still up, a short outage is over
+    monitor.mark_down()
+
+    assert not monitor.online  # probed a moment ago
+    time.sleep(0.25)
+    assert monitor.online
+    assert monitor.stats["probes"] == 2
+
+
+def test_down_stays_down_while_port_refuses():
+    monitor = HealthMonitor("127.0.0.1", _closed_port(), retry_interval=0)
+    assert not monitor.online
+    assert not monitor.online
+    assert monitor.state == HealthMonitor.DOWN
+    assert monitor.stats["probes"] == 2
+
+
+def test_speak_results_and_events_drive_transitions():
+    monitor = HealthMonitor("127.0.0.1", _closed_port(), retry_interval=60)
+    changes, event = _listeners(monitor)
+
+    monitor.report_speak(True)  # unknown -> up is not reported
+    monitor.report_speak(False)
+    assert event.wait(5)
+    event.clear()
+    monitor.hear(HeartbeatMetaEvent({
+        "post_type": "meta_event", "meta_event_type": "heartbeat",
+        "interval": 5000}))
+    assert event.wait(5)
+    monitor.stop()
+
+    assert changes == [False, True]
+    assert monitor.stats["heartbeat_interval"] == 5
+    assert not monitor.stats["last_seen"] > 1
+
+
+def test_rejected_raw_events_count_as_alive_except_meta_events():
+    monitor = HealthMonitor("127.0.0.1", _closed_port(), retry_interval=60)
+    monitor.mark_down()
+    body = json.dumps({"post_type": "meta_event"}).encode()
+    monitor.hear_raw(LifecycleMetaEvent, RawSound(body))
+    assert monitor.state == HealthMonitor.DOWN
+    body = json.dumps({"post_type": "message"}).encode()
+    monitor.hear_raw(GroupMessage, RawSound(body))
+    assert monitor.state == HealthMonitor.UP
+
+
+def test_probe_thread_notices_go_cqhttp_leaving(gocqhttp):
+    addr, port = gocqhttp.getsockname()
+    monitor = HealthMonitor(addr, port, probe_interval=0.05,
+                            probe_timeout=0.5)
+    changes, event = _listeners(monitor)
+    monitor.start()
+    try:
+        deadline = time.monotonic() + 5
+        while monitor.state != HealthMonitor.UP:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        gocqhttp.close()
+        assert event.wait(5)
+    finally:
+        monitor.stop()
+    assert changes == [False]
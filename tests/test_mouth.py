@@ -0,0 +1,188 @@
+# -*- coding=utf-8 -*-
+import asyncio
+import collections
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from cqbear.bear import BearMouth
+from cqbear.roar import GetGroupMemberList, Roar, SendGroupMessage
+from cqbear.traffic import CircuitBreaker, CircuitOpenError
+
+
+class FakeGoCqhttp(ThreadingHTTPServer):
+    """记录每次调用的路径与客户端端口，`statuses` 中的 http 状态码依次返回"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.calls = []
+        self.statuses = collections.deque()
+        self.delay = 0
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.calls.append((self.path, self.client_address[1]))
+            message_id = len(server.calls)
+            status = server.statuses.popleft() if server.statuses else 200
+            server.running += 1
+            server.peak = max(server.peak, server.running)
+        time.sleep(server.delay)
+        with server.lock:
+            server.running -= 1
+
+        if self.path.endswith(("_async", "_rate_limited")):
+            data = {"status": "async", "retcode": 1, "data": None}
+        else:
+            data = {"status": "ok", "retcode": 0,
+                    "data": {"message_id": message_id}}
+        body = json.dumps(data).encode() if status == 200 else b"busy"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gocqhttp():
+    server = FakeGoCqhttp()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def mouth(gocqhttp):
+    mouths = []
+
+    def mouth(**kwargs) -> BearMouth:
+        mouths.append(BearMouth(*gocqhttp.server_address, **kwargs))
+        return mouths[-1]
+
+    yield mouth
+    for opened in mouths:
+        opened.close()
+
+
+def _send(message: str = "hi") -> SendGroupMessage:
+    return SendGroupMessage().set_group_id(123).set_message(message)
+
+
+def test_speak_reuses_keep_alive_connections(gocqhttp, mouth):
+    bear_mouth = mouth()
+    for i in range(5):
+        assert bear_mouth.speak(_send(str(i))) == (0, {"message_id": i + 1})
+    assert [path for path, _ in gocqhttp.calls] == ["/send_group_msg"] * 5
+    assert len({port for _, port in gocqhttp.calls}) == 1
+
+    bear_mouth.close()
+    bear_mouth.speak(_send())
+    assert len({port for _, port in gocqhttp.calls}) == 2
+
+
+def test_speak_nowait_bounds_concurrent_calls(gocqhttp, mouth):
+    gocqhttp.delay = 0.05
+    bear_mouth = mouth(concurrency=3)
+    futures = [bear_mouth.speak_nowait(_send(str(i))) for i in range(9)]
+    assert not all(future.done() for future in futures)
+    results = [future.result(5) for future in futures]
+
+    assert sorted(data["message_id"] for _, data in results) == \
+        list(range(1, 10))
+    assert gocqhttp.peak == 3
+
+
+def test_speak_async_awaits_the_pool(gocqhttp, mouth):
+    bear_mouth = mouth()
+
+    async def speak_all():
+        return await asyncio.gather(*(bear_mouth.speak_async(_send(str(i)))
+                                      for i in range(4)))
+
+    results = asyncio.run(speak_all())
+    assert [code for code, _ in results] == [0] * 4
+    assert len(gocqhttp.calls) == 4
+
+
+def test_delivery_picks_the_endpoint(gocqhttp, mouth):
+    bear_mouth = mouth()
+    roar = _send()
+    assert bear_mouth.speak(roar, delivery=Roar.ASYNC) == (1, None)
+    assert roar.delivery == Roar.SYNC  # the override does not stick
+    assert bear_mouth.speak(_send().set_delivery(Roar.RATE_LIMITED)) == \
+        (1, None)
+    bear_mouth.speak(roar)
+
+    assert [path for path, _ in gocqhttp.calls] == [
+        "/send_group_msg_async", "/send_group_msg_rate_limited",
+        "/send_group_msg"]
+    with pytest.raises(ValueError):
+        _send().set_delivery("eventually")
+
+
+def test_only_idempotent_roars_are_retried(gocqhttp, mouth):
+    bear_mouth = mouth(retries=2, backoff=0.001)
+    gocqhttp.statuses.extend([503, 502])
+    query = GetGroupMemberList().set_group_id(123)
+    assert bear_mouth.speak(query, no_cache=True)[0] == 0
+    assert len(gocqhttp.calls) == 3
+
+    gocqhttp.statuses.append(503)
+    assert bear_mouth.speak(_send()) == (503, b"busy")
+    assert len(gocqhttp.calls) == 4
+
+
+def test_breaker_opens_after_failures_and_probes_again():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    results = []
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.2)
+    bear_mouth = BearMouth("127.0.0.1", port, retries=0, breaker=breaker,
+                           on_speak_result=results.append)
+    try:
+        for _ in range(2):
+            with pytest.raises(requests.exceptions.ConnectionError):
+                bear_mouth.speak(_send())
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            bear_mouth.speak(_send())
+        assert results == [False, False]
+
+        time.sleep(0.25)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(requests.exceptions.ConnectionError) as probe:
+            bear_mouth.speak(_send())
+        assert not isinstance(probe.value, CircuitOpenError)
+        assert breaker.stats == {"state": CircuitBreaker.OPEN,
+                                 "failures": 3, "opened": 2, "rejected": 1}
+    finally:
+        bear_mouth.close()
+
+
+def test_breaker_lets_one_probe_through_while_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
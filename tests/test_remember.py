@@ -0,0 +1,26 @@
+# -*- coding=utf-8 -*-
+import asyncio
+import logging
+
+from cqbear.remember import Remember
+
+
+def test_async_run_logs_failed_jobs(caplog):
+    remember = Remember(job_interval=0.05)
+    ran = []
+
+    async def broken():
+        ran.append(True)
+        remember.pause()
+        raise ValueError("honey is gone")
+
+    job = remember.every(1).second.to_do(broken)
+
+    with caplog.at_level(logging.ERROR, logger="cqbear.remember"):
+        asyncio.run(asyncio.wait_for(remember.async_run(), timeout=5))
+
+    assert ran == [True]
+    assert not remember.is_running
+    record, = [r for r in caplog.records if r.name == "cqbear.remember"]
+    assert record.getMessage() == f"{job} failed"
+    assert isinstance(record.exc_info[1], ValueError)
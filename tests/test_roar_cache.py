@@ -0,0 +1,171 @@
+# -*- coding=utf-8 -*-
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cqbear.bear import BearMouth
+from cqbear.roar import GetGroupMemberList, SendGroupMessage
+from cqbear.roar_cache import RoarCache
+from cqbear.sound import GroupCardNotice, GroupIncreaseNotice
+
+
+class FakeGoCqhttp(ThreadingHTTPServer):
+    """记录调用次数的 go-cqhttp，`gate` 未打开时请求会一直等待"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.card = "a"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server.calls.append(self.path)
+        card = server.card
+        server.gate.wait(5)
+        body = json.dumps({"status": "ok", "retcode": 0,
+                           "data": [{"user_id": 1, "card": card}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gocqhttp():
+    server = FakeGoCqhttp()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.gate.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def mouth(gocqhttp):
+    mouth = BearMouth(*gocqhttp.server_address, cache=RoarCache())
+    yield mouth
+    mouth.close()
+
+
+def _members(group_id: int = 123):
+    return GetGroupMemberList().set_group_id(group_id)
+
+
+def _card_notice(group_id: int = 123) -> GroupCardNotice:
+    return GroupCardNotice({"post_type": "notice", "notice_type": "group_card",
+                            "group_id": group_id, "user_id": 1,
+                            "card_new": "b", "card_old": "a"})
+
+
+def test_cache_expires_and_evicts_least_recently_used():
+    cache = RoarCache(ttl=0.1, max_entries=2)
+    roars = [_members(group_id) for group_id in (1, 2, 3)]
+    for roar in roars[:2]:
+        cache.put(cache.key_of(roar), roar, (0, [roar["group_id"]]))
+    assert cache.get(cache.key_of(roars[0])) == (0, [1])
+    cache.put(cache.key_of(roars[2]), roars[2], (0, [3]))
+
+    assert cache.get(cache.key_of(roars[1])) is None
+    assert cache.stats["evictions"] == 1
+    time.sleep(0.15)
+    assert cache.get(cache.key_of(roars[0])) is None
+
+
+def test_only_sync_query_roars_are_cached():
+    cache = RoarCache()
+    assert cache.key_of(_members()) is not None
+    assert cache.key_of(_members().set_delivery(GetGroupMemberList.ASYNC)) \
+        is None
+    assert cache.key_of(SendGroupMessage()) is None
+
+
+def test_cached_results_are_copies():
+    cache = RoarCache()
+    roar = _members()
+    cache.put(cache.key_of(roar), roar, (0, [{"card": "a"}]))
+    cache.get(cache.key_of(roar))[1][0]["card"] = "mutated"
+    assert cache.get(cache.key_of(roar)) == (0, [{"card": "a"}])
+
+
+def test_notices_invalidate_by_group():
+    cache = RoarCache()
+    for roar in (_members(123), _members(456)):
+        cache.put(cache.key_of(roar), roar, (0, []))
+    cache.hear(_card_notice(123))
+    assert cache.get(cache.key_of(_members(123))) is None
+    assert cache.get(cache.key_of(_members(456))) == (0, [])
+
+
+def test_put_after_invalidation_is_skipped():
+    cache = RoarCache()
+    roar = _members()
+    generation = cache.generation(roar)
+    cache.hear(GroupIncreaseNotice({
+        "post_type": "notice", "notice_type": "group_increase",
+        "group_id": 123, "user_id": 2}))
+    cache.put(cache.key_of(roar), roar, (0, ["stale"]), generation)
+    assert cache.get(cache.key_of(roar)) is None
+    assert cache.generation(roar) != generation
+
+
+def test_mouth_serves_repeated_queries_from_cache(gocqhttp, mouth):
+    assert mouth.speak(_members()) == (0, [{"user_id": 1, "card": "a"}])
+    assert mouth.speak(_members()) == (0, [{"user_id": 1, "card": "a"}])
+    assert len(gocqhttp.calls) == 1
+    mouth.speak(_members(), no_cache=True)
+    assert len(gocqhttp.calls) == 2
+
+
+def _wait_calls(gocqhttp: FakeGoCqhttp, count: int):
+    deadline = time.monotonic() + 5
+    while len(gocqhttp.calls) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_mouth_coalesces_concurrent_identical_queries(gocqhttp, mouth):
+    gocqhttp.gate.clear()
+    with ThreadPoolExecutor(8) as pool:
+        results = [pool.submit(mouth.speak, _members(), no_cache=True)
+                   for _ in range(8)]
+        _wait_calls(gocqhttp, 1)
+        time.sleep(0.1)
+        gocqhttp.gate.set()
+        results = [future.result(5) for future in results]
+
+    assert len(gocqhttp.calls) == 1
+    assert all(result == results[0] for result in results)
+    assert mouth.coalesce_stats == {"inflight": 0, "coalesced": 7}
+
+
+def test_invalidation_during_a_call_is_not_cached_or_shared(gocqhttp, mouth):
+    gocqhttp.gate.clear()
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(mouth.speak, _members())
+        _wait_calls(gocqhttp, 1)
+
+        gocqhttp.card = "b"
+        mouth.cache.hear(_card_notice())
+        follower = pool.submit(mouth.speak, _members())
+        _wait_calls(gocqhttp, 2)
+        gocqhttp.gate.set()
+
+        assert leader.result(5) == (0, [{"user_id": 1, "card": "a"}])
+        assert follower.result(5) == (0, [{"user_id": 1, "card": "b"}])
+
+    assert mouth.speak(_members()) == (0, [{"user_id": 1, "card": "b"}])
+    assert len(gocqhttp.calls) == 2
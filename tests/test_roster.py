@@ -0,0 +1,185 @@
+# -*- coding=utf-8 -*-
+import json
+import pickle
+from concurrent import futures
+
+import pytest
+
+from cqbear.roar import GetGroupList, GetGroupMemberList
+from cqbear.roster import Member, Roster, RosterLoader
+from cqbear.sound import RawSound, SoundUnderstander
+
+_understander = SoundUnderstander()
+
+
+def _done(result) -> futures.Future:
+    future = futures.Future()
+    future.set_result(result)
+    return future
+
+
+class FakeGoCqhttp:
+    """按群号返回成员列表的 speak_nowait"""
+
+    def __init__(self, groups: dict):
+        self.groups = groups
+        self.pulled = []
+        self.failing = set()
+
+    def speak_nowait(self, roar, no_cache=False):
+        if isinstance(roar, GetGroupList):
+            return _done((0, [
+                {"group_id": group_id, "member_count": len(members)}
+                for group_id, members in self.groups.items()
+            ]))
+        assert isinstance(roar, GetGroupMemberList)
+        group_id = roar["group_id"]
+        self.pulled.append(group_id)
+        if group_id in self.failing:
+            return _done((100, {"status": "failed", "retcode": 100}))
+        return _done((0, [dict(member) for member in self.groups[group_id]]))
+
+
+def _member(user_id: int, **info) -> dict:
+    return dict({"user_id": user_id, "nickname": f"bear{user_id}",
+                 "card": "", "role": "member"}, **info)
+
+
+def test_loader_groups_to_list_is_json_serialisable():
+    gocq = FakeGoCqhttp({123: [_member(1), _member(2, role="admin")]})
+    loader = RosterLoader(gocq.speak_nowait, roster=Roster())
+    list(loader.load())
+
+    assert all(isinstance(member, Member)
+               for member in loader.groups[0]["member_list"])
+    groups = loader.to_list()
+    assert json.loads(json.dumps(groups)) == groups
+    assert groups[0]["member_list"][1] == _member(2, role="admin")
+
+
+def test_loader_only_pulls_groups_whose_member_count_changed():
+    gocq = FakeGoCqhttp({123: [_member(1)], 456: [_member(2)]})
+    loader = RosterLoader(gocq.speak_nowait)
+    list(loader.load())
+    assert sorted(gocq.pulled) == [123, 456]
+
+    gocq.pulled.clear()
+    gocq.groups[456].append(_member(3))
+    list(loader.load())
+    assert gocq.pulled == [456]
+    assert loader.progress == {"total": 1, "done": 1, "failed": 0, "skipped": 1}
+    assert len(loader.members_of(456)) == 2
+
+
+def test_failed_groups_keep_their_old_members_and_are_retried():
+    gocq = FakeGoCqhttp({123: [_member(1)]})
+    progress = []
+    roster = Roster()
+    loader = RosterLoader(gocq.speak_nowait, on_progress=progress.append,
+                          roster=roster)
+    list(loader.load())
+
+    gocq.groups[123].append(_member(2))
+    gocq.failing.add(123)
+    pulled = list(loader.load())
+    assert [(group["group_id"], result) for group, result in pulled] == \
+        [(123, None)]
+    assert progress[-1] == {"total": 1, "done": 0, "failed": 1, "skipped": 0}
+    assert [member.user_id for member in loader.members_of(123)] == [1]
+
+    gocq.failing.clear()
+    list(loader.load())
+    assert [member.user_id for member in loader.members_of(123)] == [1, 2]
+    assert roster.in_group(123, 2)
+
+
+def _hear(roster: Roster, event: dict):
+    """按耳朵的顺序：先用原始内容询问名单，需要时才解码并交给名单"""
+    raw = RawSound(json.dumps(event).encode("utf-8"))
+    sound_type = _understander.classify(raw)
+    wanted = roster.wants(sound_type, raw)
+    if wanted:
+        roster.hear(_understander.understand(event))
+    return wanted
+
+
+def _message(group_id: int, user_id: int, **sender) -> dict:
+    return {"post_type": "message", "message_type": "group",
+            "sub_type": "normal", "group_id": group_id, "user_id": user_id,
+            "anonymous": None, "message": "hi", "raw_message": "hi",
+            "sender": dict({"user_id": user_id}, **sender)}
+
+
+def _notice(notice_type: str, group_id: int, user_id: int, **fields) -> dict:
+    return dict({"post_type": "notice", "notice_type": notice_type,
+                 "group_id": group_id, "user_id": user_id,
+                 "self_id": 10000}, **fields)
+
+
+@pytest.fixture
+def roster():
+    roster = Roster()
+    roster.load_group(123, [_member(1), _member(2, role="owner")])
+    return roster
+
+
+def test_roster_follows_notices(roster):
+    assert _hear(roster, _notice("group_increase", 123, 3,
+                                 sub_type="approve"))
+    assert roster.in_group(123, 3) and roster.groups_of(3) == {123}
+
+    _hear(roster, _notice("group_admin", 123, 3, sub_type="set"))
+    assert roster.is_admin(123, 3) and not roster.is_owner(123, 3)
+
+    _hear(roster, _notice("group_card", 123, 3, card_new="honey",
+                          card_old=""))
+    assert roster.card(123, 3) == "honey"
+
+    _hear(roster, _notice("group_decrease", 123, 1, sub_type="leave"))
+    assert not roster.in_group(123, 1) and roster.groups_of(1) == frozenset()
+
+    _hear(roster, _notice("group_decrease", 123, 10000, sub_type="kick_me"))
+    assert not roster.has_group(123)
+
+
+def test_roster_ignores_groups_it_has_not_loaded(roster):
+    assert not _hear(roster, _notice("group_increase", 456, 3,
+                                     sub_type="approve"))
+    assert not _hear(roster, _message(456, 3, card="bear"))
+    roster.update_member(456, 3, card="bear")
+    assert not roster.has_group(456)
+
+
+def test_group_messages_are_only_decoded_when_the_sender_changed(roster):
+    assert not _hear(roster, _message(123, 1, nickname="bear1", card="",
+                                      role="member"))
+    assert not _hear(roster, _message(123, 1, nickname="", level=None))
+    assert _hear(roster, _message(123, 1, nickname="bear1", card="paw"))
+    assert roster.card(123, 1) == "paw"
+    assert _hear(roster, _message(123, 1, card=""))
+    assert roster.card(123, 1) == ""
+
+    assert _hear(roster, _message(123, 9, nickname="new"))
+    assert roster.member(123, 9)["nickname"] == "new"
+
+
+def test_anonymous_messages_never_reach_the_roster(roster):
+    event = _message(123, 80000000, nickname="anonymous")
+    event.update(sub_type="anonymous", anonymous={"id": 1, "name": "?"})
+    assert not _hear(roster, event)
+    assert not roster.in_group(123, 80000000)
+
+
+def test_member_is_a_compact_mapping_with_interned_strings():
+    first = Member(_member(1, nickname="".join(["be", "ar"]), level="1"))
+    second = Member(_member(2, nickname="".join(["b", "ear"]), extra=True))
+
+    assert first.nickname is second.nickname
+    assert first["card"] == "" and first.get("title") is None
+    assert "title" not in first and "extra" in second
+    assert second.to_dict() == _member(2, nickname="bear", extra=True)
+    assert not hasattr(first, "__dict__")
+    first["card"] = "".join(["pa", "w"])
+    second.update(card="".join(["p", "aw"]))
+    assert first.card is second["card"]
+    assert pickle.loads(pickle.dumps(second)) == second
@@ -0,0 +1,117 @@
+# -*- coding=utf-8 -*-
+import json
+import pickle
+
+import pytest
+
+from cqbear.sound import (FriendPrivateMessage, FriendRequest, GroupMessage,
+                          GroupMessageSent, GroupUploadNoticeFile,
+                          HeartbeatMetaEvent, Message, NormalGroupMessage,
+                          PokeNotify, RawSound, Sound, SoundUnderstander)
+
+
+def _group_message(**fields) -> dict:
+    return dict({
+        "time": 1650000000, "self_id": 10000, "post_type": "message",
+        "message_type": "group", "sub_type": "normal", "message_id": 42,
+        "group_id": 123, "user_id": 10001, "anonymous": None,
+        "message": "hello", "raw_message": "hello", "font": 0,
+        "sender": {"user_id": 10001, "nickname": "bear", "card": "",
+                   "role": "member"},
+    }, **fields)
+
+
+def test_understand_builds_the_registered_sound_type():
+    sound = SoundUnderstander().understand(_group_message())
+    assert type(sound) is NormalGroupMessage
+    assert isinstance(sound, GroupMessage)
+    assert sound.group_id == 123 and sound.raw_message == "hello"
+
+
+def test_sound_is_a_view_over_the_event_data():
+    data = _group_message()
+    sound = NormalGroupMessage(data)
+    assert sound.raw is data
+
+    sound["group_id"] = 456
+    assert data["group_id"] == 456 and sound.group_id == 456
+    assert sound.pop("font") == 0 and "font" not in data
+
+
+def test_sound_to_dict_and_equality_with_dicts():
+    data = _group_message()
+    sound = NormalGroupMessage(data)
+
+    assert not isinstance(sound, dict)
+    assert json.loads(json.dumps(sound.to_dict())) == data
+    assert sound.to_dict() is not data
+    assert sound == data and data == sound
+    assert sound == NormalGroupMessage(_group_message())
+    assert sound != _group_message(group_id=456)
+    assert pickle.loads(pickle.dumps(sound)) == sound
+
+
+def test_raw_sound_peeks_fields_without_decoding():
+    body = json.dumps(_group_message()).encode("utf-8")
+    raw = RawSound(body)
+    assert SoundUnderstander().classify(raw) is NormalGroupMessage
+    assert raw.get("group_id") == 123
+    assert raw.get("anonymous") is None
+    assert not raw.uncertain
+
+
+def test_sound_subclasses_must_declare_slots():
+    assert not hasattr(NormalGroupMessage(_group_message()), "__dict__")
+    assert issubclass(NormalGroupMessage, Sound)
+
+
+def test_fields_read_the_event_data():
+    data = _group_message()
+    sound = NormalGroupMessage(data)
+    assert sound.time == 1650000000 and sound.font == 0
+    assert sound.sender.nickname == "bear" and sound.sender is sound.sender
+
+    sound["raw_message"] = "bye"
+    data["font"] = 1
+    del sound["group_id"]
+    assert sound.raw_message == "bye" and sound.font == 1
+    assert sound.group_id is None
+
+
+def test_fields_on_helper_dicts():
+    file = GroupUploadNoticeFile({"id": "abc", "name": "honey.txt"})
+    assert file.id == "abc" and file.name == "honey.txt"
+    assert file.size is None
+    assert GroupMessage.group_id.__doc__ == "群号"
+
+
+@pytest.mark.parametrize("event, sound_type", [
+    ({"post_type": "message", "message_type": "private",
+      "sub_type": "friend"}, FriendPrivateMessage),
+    ({"post_type": "message", "message_type": "group",
+      "sub_type": "whatever"}, GroupMessage),
+    ({"post_type": "message", "message_type": "guild"}, Message),
+    ({"post_type": "message_sent", "message_type": "group",
+      "sub_type": "normal"}, GroupMessageSent),
+    ({"post_type": "notice", "notice_type": "notify",
+      "sub_type": "poke"}, PokeNotify),
+    ({"post_type": "request", "request_type": "friend"}, FriendRequest),
+    ({"post_type": "meta_event", "meta_event_type": "heartbeat"},
+     HeartbeatMetaEvent),
+    ({"post_type": "shout"}, Sound),
+    ({}, Sound),
+])
+def test_classify_falls_back_to_the_closest_known_type(event, sound_type):
+    understander = SoundUnderstander()
+    assert understander.classify(event) is sound_type
+    assert understander.classify(RawSound(json.dumps(event).encode())) \
+        is sound_type
+    assert type(understander.understand(event)) is sound_type
+
+
+def test_malformed_events_are_plain_sounds_and_uncertain_raw():
+    event = {"post_type": "message", "message_type": ["group"]}
+    assert SoundUnderstander.classify(event) is Sound
+    raw = RawSound(json.dumps(event).encode())
+    SoundUnderstander.classify(raw)
+    assert raw.uncertain
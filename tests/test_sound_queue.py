@@ -0,0 +1,118 @@
+# -*- coding=utf-8 -*-
+import asyncio
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from cqbear.bear import _finish_quick
+from cqbear.sound import (FriendRequest, GroupIncreaseNotice,
+                          NormalGroupMessage)
+from cqbear.sound_queue import SoundQueue
+
+
+def _message(message_id: int) -> NormalGroupMessage:
+    return NormalGroupMessage({
+        "post_type": "message", "message_type": "group", "sub_type": "normal",
+        "message_id": message_id, "group_id": 123, "user_id": 10001,
+    })
+
+
+def _notice(user_id: int) -> GroupIncreaseNotice:
+    return GroupIncreaseNotice({
+        "post_type": "notice", "notice_type": "group_increase",
+        "sub_type": "approve", "group_id": 123, "user_id": user_id,
+    })
+
+
+def _ids(queue: SoundQueue) -> list:
+    sounds = []
+    while True:
+        sound = queue.get(block=False)
+        if sound is None:
+            return sounds
+        sounds.append(sound.get("message_id", sound.user_id))
+
+
+def test_drop_oldest_keeps_the_newest_messages():
+    shed = []
+    queue = SoundQueue(capacity=4, high_water=3, on_shed=shed.append)
+    assert all(queue.put(_message(i)) for i in range(5))
+    assert queue.depth == 3
+    assert [sound.message_id for sound in shed] == [0, 1]
+    assert queue.shed_stats == {NormalGroupMessage: 2}
+    assert _ids(queue) == [2, 3, 4]
+
+
+def test_drop_newest_rejects_the_sound_being_put():
+    queue = SoundQueue(capacity=4, high_water=2,
+                       policies={NormalGroupMessage: SoundQueue.DROP_NEWEST})
+    assert [queue.put(_message(i)) for i in range(4)] == \
+        [True, True, False, False]
+    assert queue.dropped == 2
+    assert _ids(queue) == [0, 1]
+
+
+def test_keep_sheds_chatter_before_notices():
+    queue = SoundQueue(capacity=3, high_water=1)
+    queue.put(_message(0))
+    queue.put(_notice(1))
+    queue.put(_notice(2))  # above high water, kept
+    assert queue.depth == 3
+    assert queue.put(_notice(3))  # at capacity, the message is shed
+    assert _ids(queue) == [1, 2, 3]
+    assert queue.shed_stats == {NormalGroupMessage: 1}
+
+
+def test_keep_sheds_itself_when_nothing_else_can_go():
+    queue = SoundQueue(capacity=2, high_water=1)
+    queue.put(_notice(1))
+    queue.put(_notice(2))
+    assert not queue.put(_notice(3))
+    assert _ids(queue) == [1, 2]
+
+
+def test_policy_is_inherited_and_overridable():
+    queue = SoundQueue()
+    assert queue.policy_of(NormalGroupMessage) == SoundQueue.DROP_OLDEST
+    assert queue.policy_of(FriendRequest) == SoundQueue.KEEP
+    queue.set_policy(NormalGroupMessage, SoundQueue.KEEP)
+    assert queue.policy_of(NormalGroupMessage) == SoundQueue.KEEP
+    with pytest.raises(ValueError):
+        queue.set_policy(NormalGroupMessage, "eat")
+
+
+def test_clear_sheds_queued_sounds_and_finishes_quick_futures():
+    queue = SoundQueue(capacity=8, on_shed=_finish_quick)
+    sounds = [_message(i) for i in range(3)]
+    for sound in sounds:
+        sound._quick = Future()
+        queue.put(sound)
+
+    queue.clear()
+
+    assert queue.depth == 0 and queue.get(block=False) is None
+    assert queue.shed_stats == {NormalGroupMessage: 3}
+    assert all(sound._quick.done() and sound._quick.result() is None
+               for sound in sounds)
+
+
+def test_get_waits_for_a_sound_and_close_wakes_it():
+    queue = SoundQueue()
+    assert queue.get(timeout=0.01) is None
+
+    threading.Timer(0.05, queue.put, (_message(7),)).start()
+    assert queue.get(timeout=5).message_id == 7
+
+    threading.Timer(0.05, queue.close).start()
+    assert queue.get() is None and queue.closed
+
+
+def test_get_async_is_woken_by_a_put_from_another_thread():
+    queue = SoundQueue()
+
+    async def main():
+        threading.Timer(0.05, queue.put, (_message(9),)).start()
+        return await asyncio.wait_for(queue.get_async(), timeout=5)
+
+    assert asyncio.run(main()).message_id == 9
@@ -0,0 +1,95 @@
+# -*- coding=utf-8 -*-
+from concurrent.futures import Future
+
+import pytest
+
+from cqbear.roar import SendGroupMessage
+from cqbear.traffic import SpeakScheduler, TokenBucket
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2, burst=3, now=0)
+    assert all(bucket.take(0) for _ in range(3))
+    assert not bucket.take(0)
+    assert bucket.wait_time(0) == pytest.approx(0.5)
+    assert bucket.take(0.5)
+    assert not bucket.is_full(0.5)
+    assert bucket.is_full(100) and bucket.wait_time(100) == 0
+
+
+def test_token_bucket_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, burst=1)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1, burst=0.5)
+
+
+class Sent:
+    def __init__(self):
+        self.roars = []
+
+    def __call__(self, roar) -> Future:
+        self.roars.append(roar)
+        future = Future()
+        future.set_result((0, {"message_id": len(self.roars)}))
+        return future
+
+
+def _roar(group_id: int, message: str) -> SendGroupMessage:
+    return SendGroupMessage().set_group_id(group_id).set_message(message)
+
+
+def test_scheduler_sends_targets_in_turn_and_by_priority():
+    # the global bucket lets one roar out every 50ms, the rest queue up
+    scheduler = SpeakScheduler(rate=1000, burst=1, global_rate=20,
+                               global_burst=1)
+    sent = Sent()
+    scheduler.start(sent)
+    try:
+        futures = [scheduler.submit(_roar(1, f"spam{i}"), ("group", 1))
+                   for i in range(3)]
+        futures.append(scheduler.submit(_roar(2, "reply"), ("group", 2)))
+        futures.append(scheduler.submit(_roar(3, "urgent"), ("group", 3),
+                                        SpeakScheduler.HIGH))
+        results = [future.result(5) for future in futures]
+    finally:
+        scheduler.stop()
+
+    assert all(code == 0 for code, _ in results)
+    assert scheduler.stats["sent"] == 5 and scheduler.queued == 0
+    messages = [roar["message"] for roar in sent.roars]
+    assert messages.index("urgent") < messages.index("spam1")
+    assert messages.index("reply") < messages.index("spam2")
+    assert [m for m in messages if m.startswith("spam")] == \
+        ["spam0", "spam1", "spam2"]
+
+
+def test_stop_cancels_queued_roars():
+    scheduler = SpeakScheduler(rate=0.01, burst=1, global_rate=None)
+    sent = Sent()
+    scheduler.start(sent)
+    futures = [scheduler.submit(_roar(1, str(i)), ("group", 1))
+               for i in range(3)]
+    futures[0].result(5)
+    scheduler.stop()
+    assert all(future.cancelled() for future in futures[1:])
+    assert len(sent.roars) == 1
+
+
+def test_scheduler_paces_a_single_target():
+    scheduler = SpeakScheduler(rate=20, burst=1, global_rate=None)
+    sent = Sent()
+    scheduler.start(sent)
+    try:
+        futures = [scheduler.submit(_roar(1, str(i)), ("group", 1))
+                   for i in range(5)]
+        for future in futures:
+            future.result(5)
+        assert scheduler.stats["wait_max"] >= 0.15
+    finally:
+        scheduler.stop()
+
+
+def test_submit_requires_a_started_scheduler():
+    with pytest.raises(RuntimeError):
+        SpeakScheduler().submit(_roar(1, "hi"), ("group", 1))